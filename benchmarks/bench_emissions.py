@@ -0,0 +1,56 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from Constants import Constants
+from emissions import emission_factor_table, co2_emissions
+
+
+def synthetic_heat(n_rows, seed=0):
+    # resample the shipped 2019 heat rows up to n_rows buildings
+    heat = pd.read_csv(root_dir / 'data/2019/vinkovci_grijanje_2019.csv')
+    rng = np.random.default_rng(seed)
+    rows = heat.iloc[rng.integers(0, len(heat), n_rows)].reset_index(drop=True)
+    rows['potrošnja_energije(MWh)'] = rng.uniform(1, 500, n_rows)
+    return rows
+
+
+def row_wise(data, co2_factors):
+    return data.apply(lambda row: row['potrošnja_energije(MWh)'] * co2_factors[row['energent']], axis=1)
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes, repeat):
+    factors = emission_factor_table(Constants(), [2019])[2019]
+    co2_factors = factors.to_dict()
+
+    print(f"{'rows':>10} {'apply (s)':>12} {'columnar (s)':>14} {'speedup':>10}")
+    for n_rows in sizes:
+        data = synthetic_heat(n_rows)
+        apply_time, expected = timed(row_wise, data, co2_factors, repeat=1)
+        columnar_time, result = timed(co2_emissions, data, factors, repeat=repeat)
+        assert result.equals(expected)
+        print(f"{n_rows:>10} {apply_time:>12.3f} {columnar_time:>14.4f} {apply_time / columnar_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark row-wise vs columnar CO2 emission computation.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
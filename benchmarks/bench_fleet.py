@@ -0,0 +1,51 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from Constants import Constants
+from fleet import FLEET_2011, aggregate_masses, fleet_energy
+
+
+def synthetic_cohorts(n_cohorts, seed=0):
+    """Cohorts of the 2011 vehicle types and fuels split by age, with km per year falling with age."""
+    rng = np.random.default_rng(seed)
+    pairs = [(vehicle, fuel) for vehicle, fuels in FLEET_2011.items() for fuel in fuels]
+    n_ages = -(-n_cohorts // len(pairs))
+    vehicles, fuels = zip(*pairs)
+    ages = np.arange(n_ages)
+    cohorts = pd.DataFrame({
+        'vrsta_prijevoza': np.repeat(vehicles, n_ages),
+        'gorivo': np.repeat(fuels, n_ages),
+        'starost': np.tile(ages, len(pairs)),
+        'broj': rng.integers(1, 500, n_ages * len(pairs)),
+    })
+    cohorts['km_per_year'] = 20000 * 0.97 ** cohorts['starost']
+    return cohorts.iloc[:n_cohorts]
+
+
+def main(sizes, repeat):
+    constants = Constants()
+    print(f"{'cohorts':>10} {'time (ms)':>10} {'cohorts/s':>14}")
+    for n_cohorts in sizes:
+        cohorts = synthetic_cohorts(n_cohorts)
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            aggregate_masses(fleet_energy(cohorts, constants))
+            best = min(best, time.perf_counter() - start)
+        print(f'{n_cohorts:>10} {best * 1000:>10.1f} {n_cohorts / best:>14.0f}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the fleet fuel model on synthetic age cohorts.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
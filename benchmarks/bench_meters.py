@@ -0,0 +1,90 @@
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from meters import aggregate_meters, load_lookup
+
+CATEGORIES = [
+    ('zgrade javne namjene', 'školstvo'),
+    ('zgrade javne namjene', 'uprava i uredi gradskih tvrtki'),
+    ('zgrade javne namjene', 'kulturne ustanove'),
+    ('stambeni objekti', 'stambeni sektor'),
+    ('zgrade komercijalnog i uslužnog karaktera', 'komercijalni sektor'),
+]
+
+
+def write_lookup(path, n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = rng.integers(0, len(CATEGORIES), n_points)
+    pd.DataFrame({
+        'mjerno_mjesto': np.arange(n_points),
+        'nadkategorija': [CATEGORIES[c][0] for c in categories],
+        'kategorija': [CATEGORIES[c][1] for c in categories],
+    }).to_csv(path, index=False)
+
+
+def write_readings(path, n_rows, n_points, seed=0, block=1_000_000):
+    """Synthetic 15 minute readings of 2019, points cycle within every interval and a few are not in the lookup."""
+    rng = np.random.default_rng(seed)
+    header = True
+    for start in range(0, n_rows, block):
+        rows = np.arange(start, min(start + block, n_rows))
+        times = pd.Timestamp(2019, 1, 1) + pd.to_timedelta((rows // n_points) % (365 * 96) * 15, unit='min')
+        pd.DataFrame({
+            'mjerno_mjesto': rows % (n_points + 10),
+            'vrijeme': times.strftime('%Y-%m-%d %H:%M'),
+            'kwh': rng.gamma(2.0, 0.15, len(rows)).round(3),
+        }).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def child(path, lookup_path, chunksize, profile):
+    # runs in a fresh interpreter so the peak RSS belongs to one aggregation
+    start = time.perf_counter()
+    totals = aggregate_meters(path, load_lookup(lookup_path), year=2019, profile=profile, chunksize=chunksize)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'rows': totals.rows_read, 'seconds': seconds,
+                      'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main(sizes, n_points, chunksize):
+    print(f"{'rows':>10} {'profile':>8} {'time (s)':>10} {'rows/s':>12} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        lookup_path = Path(directory) / 'lookup.csv'
+        write_lookup(lookup_path, n_points)
+        for n_rows in sizes:
+            path = Path(directory) / f'readings_{n_rows}.csv'
+            write_readings(path, n_rows, n_points)
+            for profile in (False, True):
+                command = [sys.executable, __file__, '--child', str(path), str(lookup_path),
+                           '--chunksize', str(chunksize)] + (['--profile'] if profile else [])
+                result = subprocess.run(command, capture_output=True, text=True, check=True)
+                stats = json.loads(result.stdout.splitlines()[-1])
+                print(f"{n_rows:>10} {str(profile):>8} {stats['seconds']:>10.2f} "
+                      f"{stats['rows'] / stats['seconds']:>12.0f} {stats['max_rss_mb']:>14.1f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Throughput and peak memory of the smart meter aggregation.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 4_000_000])
+    parser.add_argument('--points', type=int, default=20_000, help='Metering points in the lookup table.')
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    parser.add_argument('--child', type=Path, nargs=2, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--profile', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(*args.child, args.chunksize, args.profile)
+    else:
+        main(args.sizes, args.points, args.chunksize)
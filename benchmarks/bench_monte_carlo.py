@@ -0,0 +1,37 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from Constants import Constants
+from inventory import load_inputs
+from monte_carlo import InventoryModel, load_distributions, run_monte_carlo
+
+
+def main(sizes, year, repeat):
+    constants = Constants()
+    model = InventoryModel.from_inputs(constants, year, *load_inputs(constants, year), level='kategorija')
+    distributions = load_distributions()
+    print(f'{year}: {len(model.base)} terms, {len(model.parameters)} constants, '
+          f'{len(model.sectors)} sectors x {len(model.fuels)} fuels')
+
+    print(f"{'samples':>10} {'time (s)':>10} {'samples/s':>14}")
+    for n_samples in sizes:
+        best = float('inf')
+        for seed in range(repeat):
+            start = time.perf_counter()
+            run_monte_carlo(model, distributions, n_samples, constants, seed)
+            best = min(best, time.perf_counter() - start)
+        print(f'{n_samples:>10} {best:>10.3f} {n_samples / best:>14.0f}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized Monte Carlo inventory.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--year', type=int, default=2019, choices=[2011, 2019])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.year, args.repeat)
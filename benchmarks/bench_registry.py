@@ -0,0 +1,70 @@
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from registry import ingest_registry
+
+MUNICIPALITIES = ['VINKOVCI', 'VUKOVAR', 'OSIJEK', 'ŽUPANJA', 'ZAGREB']
+CATEGORIES = ['M1', 'M1', 'M1', 'M1', 'N1', 'N2', 'L3', 'L1', 'M3', 'T1']
+FUELS = ['BENZIN', 'DIZEL', 'DIZEL', 'BENZIN-PLIN', 'ELEKTRIČNI', 'HIBRID', 'PLUG-IN HIBRID', 'METAN']
+
+
+def write_registry(path, n_rows, seed=0, block=1_000_000):
+    """Synthetic per vehicle registry, written in blocks so the generator's memory is bounded too."""
+    rng = np.random.default_rng(seed)
+    header = True
+    for start in range(0, n_rows, block):
+        size = min(block, n_rows - start)
+        pd.DataFrame({
+            'opcina': np.array(MUNICIPALITIES)[rng.integers(0, len(MUNICIPALITIES), size)],
+            'kategorija': np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), size)],
+            'gorivo': np.array(FUELS)[rng.integers(0, len(FUELS), size)],
+            'km': rng.normal(13000, 4000, size).round(),
+        }).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def child(path, chunksize):
+    # runs in a fresh interpreter so the peak RSS belongs to one ingestion
+    start = time.perf_counter()
+    counts = ingest_registry(path, 'VINKOVCI', chunksize=chunksize)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'rows': counts.rows_read, 'seconds': seconds,
+                      'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main(sizes, chunksize):
+    print(f"{'rows':>10} {'size (MB)':>10} {'time (s)':>10} {'rows/s':>12} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in sizes:
+            path = Path(directory) / f'registry_{n_rows}.csv'
+            write_registry(path, n_rows)
+            result = subprocess.run([sys.executable, __file__, '--child', str(path), '--chunksize', str(chunksize)],
+                                    capture_output=True, text=True, check=True)
+            stats = json.loads(result.stdout.splitlines()[-1])
+            print(f"{n_rows:>10} {path.stat().st_size / 2 ** 20:>10.1f} {stats['seconds']:>10.2f} "
+                  f"{stats['rows'] / stats['seconds']:>12.0f} {stats['max_rss_mb']:>14.1f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Throughput and peak memory of the streaming registry ingestion.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500_000, 2_000_000, 8_000_000])
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--child', type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child, args.chunksize)
+    else:
+        main(args.sizes, args.chunksize)
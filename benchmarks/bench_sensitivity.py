@@ -0,0 +1,60 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from monte_carlo import InventoryModel, Distribution, FACTOR_PARAMETERS
+from sensitivity import inventory_output_model, tornado, sobol
+
+
+def synthetic_model(n_parameters, n_terms, n_sectors, seed=0):
+    """Inventory model with n_parameters constants, every term depends on 1-4 of them."""
+    rng = np.random.default_rng(seed)
+    names = [f'parameter_{k}' for k in range(n_parameters)]
+    fuels = list(FACTOR_PARAMETERS)
+    constants = SimpleNamespace(**{name: rng.uniform(0.5, 2) for name in names},
+                                **{factor: rng.uniform(0.1, 0.3) for factor in FACTOR_PARAMETERS.values()})
+
+    terms = []
+    for _ in range(n_terms):
+        used = rng.choice(names, size=rng.integers(1, 5), replace=False)
+        terms.append((f'sector_{rng.integers(n_sectors)}', fuels[rng.integers(len(fuels))], rng.uniform(10, 1000),
+                      {name: int(rng.integers(1, 3)) for name in used}, 1.0))
+    model = InventoryModel.from_terms(constants, 2019, terms)
+    distributions = {name: Distribution('normal', {'loc': 1, 'scale': 0.1}, relative=True)
+                     for name in model.parameters}
+    return model, constants, distributions
+
+
+def main(n_parameters, sizes, n_terms, n_sectors):
+    model, constants, distributions = synthetic_model(n_parameters, n_terms, n_sectors)
+    output_model = inventory_output_model(model)
+    print(f'{len(model.parameters)} parameters ({n_parameters} + emission factors), {len(model.base)} terms, '
+          f'{len(output_model.outputs)} outputs')
+
+    start = time.perf_counter()
+    tornado(output_model)
+    print(f'tornado: {time.perf_counter() - start:.3f} s')
+
+    print(f"{'samples':>10} {'evaluations':>12} {'sobol (s)':>10}")
+    for n_samples in sizes:
+        start = time.perf_counter()
+        sobol(output_model, distributions, n_samples, constants, seed=0)
+        elapsed = time.perf_counter() - start
+        print(f'{n_samples:>10} {n_samples * (len(model.parameters) + 2):>12} {elapsed:>10.2f}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark batched tornado and Sobol sensitivity analysis.')
+    parser.add_argument('--parameters', type=int, default=50)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--terms', type=int, default=200)
+    parser.add_argument('--sectors', type=int, default=10)
+    args = parser.parse_args()
+    main(args.parameters, args.sizes, args.terms, args.sectors)
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+from Constants import Constants
+from inventory import Inventory, correct_transport_2011, engine_efficiency_fit, lighting, load_inputs
+from scenarios import ProjectionBaseline, evaluate_scenarios, load_scenarios
+from synthetic import synthetic_inputs, synthetic_transport_2011, write_municipalities
+
+RESULTS = root_dir / 'benchmarks' / 'results'
+
+
+def case_inventory(constants, n_rows):
+    heat, ele, trans = synthetic_inputs(n_rows)
+    light = lighting(constants, 2019)
+    return lambda: Inventory(constants, 2019).compute_inventory(heat, ele, trans, light)
+
+
+def case_transport_correction(constants, n_rows):
+    trans = synthetic_transport_2011(n_rows)
+    return lambda: correct_transport_2011(trans, constants)
+
+
+def case_projection(constants, n_scenarios):
+    inventories = {year: Inventory(constants, year).compute_inventory(*load_inputs(constants, year))
+                   for year in (2011, 2019)}
+    baseline = ProjectionBaseline.from_inventories(inventories[2011], inventories[2019],
+                                                   load_inputs(constants, 2019)[2], constants,
+                                                   engine_efficiency_fit()[2](2030))
+    base = load_scenarios()[-1]
+    ev_share = np.random.default_rng(0).uniform(0, 0.5, n_scenarios)
+    scenarios = [replace(base, name=str(i), ev_share=share) for i, share in enumerate(ev_share)]
+    return lambda: evaluate_scenarios(baseline, scenarios)
+
+
+def case_trend_fit(constants, n_points):
+    from numpy.polynomial import Polynomial
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(1990, 2050, n_points)
+    y = 0.08 - 0.0005 * (x - 1990) + rng.normal(0, 0.002, n_points)
+    return lambda: Polynomial.fit(x, y, 3)
+
+
+def case_jrc_trends(constants, n_countries):
+    from jrc_data import EmissionFactorTable, fit_trends
+
+    rng = np.random.default_rng(0)
+    years = np.arange(1990, 2021)
+    slopes = rng.uniform(0.005, 0.015, (n_countries, 1))
+    values = 0.5 - slopes * (years - 1990) + rng.normal(0, 0.02, (n_countries, len(years)))
+    table = EmissionFactorTable(np.char.mod('country %d', np.arange(n_countries)), years, values)
+    return lambda: fit_trends(table, 3)
+
+
+def case_forecast(constants, n_series):
+    from forecast import select_models
+
+    rng = np.random.default_rng(0)
+    years = np.arange(1990, 2021)
+    slopes = rng.uniform(0.005, 0.015, (n_series, 1))
+    values = 0.5 - slopes * (years - 1990) + rng.normal(0, 0.02, (n_series, len(years)))
+    return lambda: select_models(years, values)
+
+
+def case_rendering(constants, n_figures):
+    import matplotlib
+    matplotlib.use('Agg')
+    from rendering import ChartJob, render_jobs
+
+    results = Inventory(constants, 2019).compute_inventory(*load_inputs(constants, 2019))
+    inventory = Inventory(constants, 2019)
+    directory = tempfile.mkdtemp()
+    charts = inventory.inventory_charts(results)
+    jobs = [ChartJob(getattr(inventory, chart), (data.copy(),), Path(directory) / f'{i}_{file_name}', options)
+            for i, (file_name, chart, data, options) in zip(range(n_figures), charts * (n_figures // len(charts) + 1))]
+    return lambda: render_jobs(jobs, cache=False)
+
+
+def case_batch(constants, n_municipalities, rows=1_000):
+    from batch import load_manifest, run_batch
+
+    manifest = write_municipalities(tempfile.mkdtemp(), n_municipalities, rows)
+    jobs = load_manifest(manifest)
+    return lambda: run_batch(jobs, n_jobs=0)
+
+
+# case -> (setup returning the timed callable, default sizes, unit of the size), --sizes replaces the sizes of the
+# cases that scale with input rows, --figures and --municipalities those of rendering and batch
+CASES = {
+    'inventory': (case_inventory, [1_000, 10_000, 100_000, 1_000_000], 'rows'),
+    'transport_correction': (case_transport_correction, [1_000, 10_000, 100_000, 1_000_000], 'rows'),
+    'projection': (case_projection, [1_000, 10_000, 100_000], 'scenarios'),
+    'trend_fit': (case_trend_fit, [1_000, 100_000, 1_000_000], 'points'),
+    'jrc_trends': (case_jrc_trends, [30, 1_000, 100_000], 'countries'),
+    'forecast': (case_forecast, [30, 300, 3_000], 'series'),
+    'rendering': (case_rendering, [1, 5], 'figures'),
+    'batch': (case_batch, [10, 50], 'municipalities'),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root_dir, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_case(name, size, repeat, constants):
+    setup, _, unit = CASES[name]
+    function = setup(constants, size)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'case': name, 'size': size, 'unit': unit, 'repeat': repeat, 'best_s': min(times),
+            'median_s': float(np.median(times)), 'per_s': size / min(times)}
+
+
+def previous_results(directory, exclude=None):
+    """The latest stored results file other than exclude."""
+    paths = sorted(path for path in Path(directory).glob('*.json') if path != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(results, baseline, threshold):
+    """Rows of results against a baseline run, regressions are cases more than threshold times slower."""
+    best = {(row['case'], row['size']): row['best_s'] for row in baseline['results']}
+    lines, regressions = [], []
+    for row in results['results']:
+        key = (row['case'], row['size'])
+        if key not in best:
+            continue
+        ratio = row['best_s'] / best[key]
+        flag = 'REGRESSION' if ratio > threshold else ''
+        if flag:
+            regressions.append(key)
+        lines.append(f"{row['case']:<22} {row['size']:>10} {best[key]:>12.4f} {row['best_s']:>12.4f} "
+                     f"{ratio:>8.2f} {flag}")
+    header = f"{'case':<22} {'size':>10} {'before (s)':>12} {'now (s)':>12} {'ratio':>8}"
+    return '\n'.join([header] + lines), regressions
+
+
+def main(cases, sizes, repeat, output_dir, baseline_path, threshold, save):
+    """sizes maps a case to its sizes, cases missing from it run their default sizes."""
+    constants = Constants()
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'results': [],
+    }
+
+    print(f"{'case':<22} {'size':>10} {'unit':>14} {'best (s)':>10} {'median (s)':>11} {'per s':>14}")
+    for name in cases:
+        for size in sizes.get(name) or CASES[name][1]:
+            row = run_case(name, size, repeat, constants)
+            results['results'].append(row)
+            print(f"{name:<22} {size:>10} {row['unit']:>14} {row['best_s']:>10.4f} {row['median_s']:>11.4f} "
+                  f"{row['per_s']:>14.0f}")
+
+    path = None
+    if save:
+        output_dir.mkdir(exist_ok=True, parents=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        path = output_dir / f"{stamp}_{results['commit'][:8]}.json"
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'results written to {path}')
+
+    baseline_path = baseline_path or previous_results(output_dir, exclude=path)
+    if baseline_path is None:
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    table, regressions = compare(results, baseline, threshold)
+    print(f"\ncompared with {Path(baseline_path).name} ({baseline['commit'][:8]}):\n{table}")
+    return len(regressions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark suite of the inventory, projection, fit and rendering '
+                                                 'code on synthetic inputs, results are stored per commit.')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=None,
+                        help='Rows, scenarios, points, countries or series of the inventory, transport correction, '
+                             'projection, fit and forecast cases instead of their defaults, e.g. 10000000 for 10^7 '
+                             'rows.')
+    parser.add_argument('--figures', type=int, nargs='+', default=None, help='Figures of the rendering case.')
+    parser.add_argument('--municipalities', type=int, nargs='+', default=None,
+                        help='Municipalities of the batch case, 1000 rows each.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', type=Path, default=RESULTS, help='Directory of the stored results.')
+    parser.add_argument('--compare', type=Path, default=None,
+                        help='Results file to compare with, the latest stored one by default.')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Slowdown ratio above which a case counts as a regression.')
+    parser.add_argument('--no-save', action='store_true', help='Do not store the results of this run.')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions.')
+    args = parser.parse_args()
+    sizes = {name: args.sizes for name, (_, _, unit) in CASES.items()
+             if unit in ('rows', 'scenarios', 'points', 'countries', 'series')}
+    sizes.update(rendering=args.figures, batch=args.municipalities)
+    n_regressions = main(args.cases, sizes, args.repeat, args.output, args.compare, args.threshold, not args.no_save)
+    raise SystemExit(1 if n_regressions and args.fail_on_regression else 0)
@@ -0,0 +1,57 @@
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+root_dir = Path(__file__).parents[1]
+
+# modules that must not be loaded just by importing the CLI modules
+HEAVY_MODULES = ('matplotlib', 'seaborn', 'sklearn', 'scipy')
+
+
+def import_times(module):
+    """Runs `python -X importtime -c 'import module'` in a fresh interpreter and parses its report.
+
+    Returns {imported module: (self us, cumulative us)}.
+    """
+    env = dict(os.environ, PYTHONPATH=str(root_dir / 'src'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=root_dir / 'src', env=env, capture_output=True, text=True, check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(modules, repeat, top):
+    failed = False
+    for module in modules:
+        runs = [import_times(module) for _ in range(repeat)]
+        best = min(runs, key=lambda times: times[module][1])
+        total_ms = best[module][1] / 1000
+
+        print(f'{module}: {total_ms:.1f} ms (best of {repeat})')
+        slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)[1:top + 1]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f'    {name:<40} {cumulative_us / 1000:8.1f} ms cumulative {self_us / 1000:8.1f} ms self')
+
+        loaded = [name for name in HEAVY_MODULES if name in best]
+        if loaded:
+            failed = True
+            print(f'    heavy modules loaded at import: {", ".join(loaded)}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time of the CLI modules, measured with python -X importtime.')
+    parser.add_argument('--modules', nargs='+', default=['inventory', 'supplementary_plots'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports listed per module.')
+    args = parser.parse_args()
+    sys.exit(main(args.modules, args.repeat, args.top))
@@ -0,0 +1,123 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(root_dir / 'src'))
+
+# (nadkategorija, kategorija) of the shipped inputs, synthetic categories are numbered copies of them
+CATEGORIES = [
+    ('zgrade javne namjene', 'školstvo'),
+    ('zgrade javne namjene', 'uprava i uredi gradskih tvrtki'),
+    ('zgrade javne namjene', 'kulturne ustanove'),
+    ('stambeni objekti', 'stambeni sektor'),
+    ('zgrade komercijalnog i uslužnog karaktera', 'komercijalne i uslužne djelatnosti'),
+    ('ostalo', 'ostalo'),
+]
+HEAT_FUELS = ['prirodni plin', 'lož ulje', 'ogrjevno drvo', 'električna energija']
+VEHICLES = ['osobna vozila', 'teretna i radna vozila', 'mopedi i motocikli', 'autobusni']
+MUNICIPALITY = 'Općina {}'
+
+
+def _categories(n_rows, rng):
+    base = rng.integers(0, len(CATEGORIES), n_rows)
+    return (np.array([c[0] for c in CATEGORIES])[base],
+            np.char.add(np.array([c[1] for c in CATEGORIES])[base], np.char.mod(' %d', np.arange(n_rows))))
+
+
+def synthetic_heat(n_rows, seed=0):
+    """vinkovci_grijanje shaped table, one row per category and fuel like the shipped file, every fuel present."""
+    rng = np.random.default_rng(seed)
+    n_categories = -(-n_rows // len(HEAT_FUELS))
+    nadkategorija, kategorija = _categories(n_categories, rng)
+    energy = rng.gamma(1.5, 200_000, n_categories * len(HEAT_FUELS))
+    heat = pd.DataFrame({
+        'nadkategorija': np.repeat(nadkategorija, len(HEAT_FUELS)),
+        'kategorija': np.repeat(kategorija, len(HEAT_FUELS)),
+        'broj zgrada': rng.integers(1, 50, len(energy)),
+        'energent': np.tile(HEAT_FUELS, n_categories),
+        'potrošnja_plina_m3/lož_ulja_l': energy / 10,
+        'potrošnja_energije(kWh)': energy,
+        'izvor': 'sintetički',
+    })
+    return heat.iloc[:max(n_rows, len(HEAT_FUELS))].reset_index(drop=True)
+
+
+def synthetic_electricity(n_rows, seed=0):
+    """vinkovci_struja shaped table, one row per category."""
+    rng = np.random.default_rng(seed + 1)
+    nadkategorija, kategorija = _categories(n_rows, rng)
+    return pd.DataFrame({
+        'nadkategorija': nadkategorija,
+        'kategorija': kategorija,
+        'broj zgrada': rng.integers(1, 50, n_rows),
+        'energent': 'električna energija',
+        'potrošnja_energije(kWh)': rng.gamma(1.5, 100_000, n_rows),
+        'izvor': 'sintetički',
+    })
+
+
+def synthetic_transport(n_rows, seed=0):
+    """privatna_vozila shaped table with the fuel masses of the 2019 format, one row per vehicle type."""
+    rng = np.random.default_rng(seed + 2)
+    n_rows = max(n_rows, len(VEHICLES))
+    vehicles = np.array(VEHICLES)[np.arange(n_rows) % len(VEHICLES)]
+    # the first rows keep the shipped names, the rest are numbered
+    numbered = np.char.add(vehicles, np.char.mod(' %d', np.arange(n_rows)))
+    names = np.where(np.arange(n_rows) < len(VEHICLES), vehicles, numbered)
+    return pd.DataFrame({
+        'vrsta_prijevoza': names,
+        'broj': rng.integers(1, 20_000, n_rows),
+        'procijenjena_potrošena_masa_benzina(t)': rng.gamma(2, 500, n_rows),
+        'procijenjena_potrošena_masa_dizela(t)': rng.gamma(2, 1000, n_rows),
+        'procijenjena_potrošena_masa_unp(t)': rng.gamma(2, 50, n_rows),
+    })
+
+
+def synthetic_transport_2011(n_rows, seed=0):
+    """privatna_vozila_2011 shaped table, the shipped vehicle types repeated to n_rows."""
+    trans = pd.read_csv(root_dir / 'data' / '2011' / 'privatna_vozila_2011.csv')
+    rng = np.random.default_rng(seed + 3)
+    rows = trans.iloc[np.arange(n_rows) % len(trans)].reset_index(drop=True)
+    rows['broj'] = rng.integers(1, 20_000, n_rows)
+    return rows
+
+
+def synthetic_inputs(n_rows, seed=0):
+    """Heat, electricity and transport of one municipality, transport has a hundredth of the rows."""
+    return (synthetic_heat(n_rows, seed), synthetic_electricity(n_rows, seed),
+            synthetic_transport(max(n_rows // 100, len(VEHICLES)), seed))
+
+
+def write_municipalities(directory, n_municipalities, n_rows, year=2019, seed=0):
+    """Input files of n_municipalities and a batch.py manifest for them, returns the manifest path."""
+    directory = Path(directory)
+    directory.mkdir(exist_ok=True, parents=True)
+    jobs = []
+    for i in range(n_municipalities):
+        heat, ele, trans = synthetic_inputs(n_rows, seed + i)
+        files = {}
+        for kind, table in (('heat', heat), ('electricity', ele), ('transport', trans)):
+            files[kind] = f'{kind}_{i}_{year}.csv'
+            table.to_csv(directory / files[kind], index=False)
+        jobs.append({'municipality': MUNICIPALITY.format(i), 'year': year, **files, 'population': 20_000,
+                     'lighting_mwh': 1_000.0})
+    manifest = directory / 'manifest.json'
+    with open(manifest, 'w') as f:
+        json.dump({'jobs': jobs}, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write synthetic inventory inputs and a batch manifest.')
+    parser.add_argument('directory', type=Path)
+    parser.add_argument('--rows', type=int, default=10_000, help='Heat and electricity rows per municipality.')
+    parser.add_argument('--municipalities', type=int, default=10)
+    parser.add_argument('--year', type=int, default=2019)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(write_municipalities(args.directory, args.municipalities, args.rows, args.year, args.seed))
@@ -1,11 +1,14 @@
 from dataclasses import dataclass, field
-from pathlib import Path
 
-import pandas as pd
+# prefix of the electricity emission factors that are read from the JRC table, e.g. co2_electricity_mwh_ton_2019
+ELECTRICITY_FACTOR_PREFIX = 'co2_electricity_mwh_ton_'
 
 
 @dataclass
 class Constants:
+    # country whose JRC electricity emission factors are used
+    country: str = "Croatia"
+
     # population
     population_2011 = 35312
     population_2021 = 30842
@@ -26,8 +29,7 @@ class Constants:
     co2_wood_mwh_ton = 0
     co2_heatoil_mwh_ton = 0.264
 
-    co2_electricity_mwh_ton_2011: float
-    co2_electricity_mwh_ton_2019: float
+    # co2_electricity_mwh_ton_<year> for years covered by the JRC table are resolved on first access, see __getattr__
     co2_electricity_mwh_ton_2030 = 0.09  # source - strategija energetskog razvoja, Hrvoje Požar whitebook, 37.5% smanjenje
 
     # heatoil data
@@ -71,12 +73,27 @@ class Constants:
 
     lpg_petrol_index = 1.16
 
-    def __init__(self):
-        current_script_path = Path(__file__)
-        parent_dir = current_script_path.parents[1]
-        file_path = parent_dir / "data" / "public_data/JRC-COM-NEEFE_1990-2020.xlsx"
+    def declared(self):
+        """Constants declared on the class and the country, without the electricity factors resolved on access."""
+        values = {name: value for name, value in vars(type(self)).items()
+                  if not name.startswith('_') and isinstance(value, (int, float, str))}
+        return {**values, 'country': self.country}
+
+    def electricity_emission_factor(self, year):
+        from jrc_data import load_emission_factors
+
+        return load_emission_factors().factor(self.country, year)
+
+    def __getattr__(self, name):
+        # only called for missing attributes, electricity factors are looked up once and memoized on the instance
+        year = name[len(ELECTRICITY_FACTOR_PREFIX):]
+        if not (name.startswith(ELECTRICITY_FACTOR_PREFIX) and year.isdigit()):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        try:
+            value = self.electricity_emission_factor(int(year))
+        except KeyError as e:
+            raise AttributeError(f"No {self.country} electricity emission factor for {year}") from e
 
-        df = pd.read_excel(file_path, sheet_name=1, skiprows=1, engine='openpyxl')
-        # set the value for Croatia for the year 2011 and 2019
-        self.co2_electricity_mwh_ton_2011 = df.loc[df["Unnamed: 0"] == "Croatia", 2011].values[0]
-        self.co2_electricity_mwh_ton_2019 = df.loc[df["Unnamed: 0"] == "Croatia", 2019].values[0]
+        setattr(self, name, value)
+        return value
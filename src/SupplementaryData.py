@@ -1,5 +1,4 @@
 from dataclasses import dataclass
-import pandas as pd
 import numpy as np
 
 
@@ -253,35 +252,78 @@ class SupplementaryData:
     }
 
 
+def items_table(data, columns):
+    import pandas as pd
+    return pd.DataFrame(list(data.items()), columns=columns)
+
+
+def index_table(data, columns):
+    import pandas as pd
+    return pd.DataFrame.from_dict(data, orient='index', columns=columns)
+
+
+def transposed_table(data):
+    import pandas as pd
+    return pd.DataFrame(data).T
+
+
+class LazyTable:
+    """DataFrame built from SupplementaryData on first access and cached on the instance until released."""
+
+    def __init__(self, build, *args):
+        self.build = build
+        self.args = args
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        table = self.build(*self.args)
+        instance.__dict__[self.name] = table
+        return table
+
+
 class SupplementaryDataConverted:
-    land_structure = pd.DataFrame(list(SupplementaryData.land_structure.items()), columns=['Područje', 'Value'])
-    land_building_share = pd.DataFrame(list(SupplementaryData.land_building_share.items()),
-                                       columns=['Područje', 'Value'])
-    arable_land_structure = pd.DataFrame(list(SupplementaryData.arable_land_structure.items()),
-                                         columns=['Vrsta građevinskog područja', 'Value'])
-    arable_land_use = pd.DataFrame(list(SupplementaryData.arable_land_use.items()), columns=['Vrsta uporabe', 'Value'])
-    water_shortages = pd.DataFrame.from_dict(SupplementaryData.water_shortages, orient='index',
-                                             columns=['Prosječna godina', 'Sušna godina'])
-    hummus_per_county = pd.DataFrame(list(SupplementaryData.hummus_per_county.items()), columns=['Županija', 'Value'])
-    agri_employment_age = pd.DataFrame.from_dict(SupplementaryData.agri_employment_age, orient='index',
-                                                 columns=['Županija', 'Vinkovci'])
-    employment_vinkovci = pd.DataFrame(list(SupplementaryData.employment_vinkovci.items()),
-                                       columns=['Employment Type', 'Value'])
-    bdp_index_region = pd.DataFrame(list(SupplementaryData.bdp_index_region.items()), columns=['Region', 'Value'])
-    agri_education = pd.DataFrame.from_dict(SupplementaryData.agri_education, orient='index',
-                                            columns=['Županija', 'Vinkovci'])
-    turism_seasonality = pd.DataFrame(SupplementaryData.turism_seasonality).T
-    precipitation = pd.DataFrame(SupplementaryData.precipitation).T
-    arrivals_sleepovers = pd.DataFrame.from_dict(SupplementaryData.arrivals_sleepovers, orient='index',
-                                                 columns=['Dolasci', 'Noćenja'])
-    employment_tourism = pd.DataFrame(list(SupplementaryData.employment_tourism.items()), columns=['Year', 'Value'])
-    tourists_per_capita = pd.DataFrame.from_dict(SupplementaryData.tourists_per_capita, orient='index',
-                                                 columns=['Broj turista', 'Noćenja'])
-    water_requirements = pd.DataFrame(list(SupplementaryData.water_requirements_2021.items()),
-                                      columns=['Month', 'Value'])
-    damages_plumbing = pd.DataFrame.from_dict(SupplementaryData.damages_plumbing, orient='index',
-                                              columns=['Grad Vinkovci', 'Ostala područja'])
-    water_loss = pd.DataFrame(list(SupplementaryData.water_loss.items()), columns=['Year', 'Value'])
-    water_capacity = pd.DataFrame(SupplementaryData.water_capacity).T
-    water_samples = pd.DataFrame(SupplementaryData.water_samples).T
-    use_of_land = pd.DataFrame(list(SupplementaryData.use_of_land.items()), columns=['Namjena površine', 'Value'])
+    land_structure = LazyTable(items_table, SupplementaryData.land_structure, ['Područje', 'Value'])
+    land_building_share = LazyTable(items_table, SupplementaryData.land_building_share, ['Područje', 'Value'])
+    arable_land_structure = LazyTable(items_table, SupplementaryData.arable_land_structure,
+                                      ['Vrsta građevinskog područja', 'Value'])
+    arable_land_use = LazyTable(items_table, SupplementaryData.arable_land_use, ['Vrsta uporabe', 'Value'])
+    water_shortages = LazyTable(index_table, SupplementaryData.water_shortages, ['Prosječna godina', 'Sušna godina'])
+    hummus_per_county = LazyTable(items_table, SupplementaryData.hummus_per_county, ['Županija', 'Value'])
+    agri_employment_age = LazyTable(index_table, SupplementaryData.agri_employment_age, ['Županija', 'Vinkovci'])
+    employment_vinkovci = LazyTable(items_table, SupplementaryData.employment_vinkovci, ['Employment Type', 'Value'])
+    bdp_index_region = LazyTable(items_table, SupplementaryData.bdp_index_region, ['Region', 'Value'])
+    agri_education = LazyTable(index_table, SupplementaryData.agri_education, ['Županija', 'Vinkovci'])
+    turism_seasonality = LazyTable(transposed_table, SupplementaryData.turism_seasonality)
+    precipitation = LazyTable(transposed_table, SupplementaryData.precipitation)
+    arrivals_sleepovers = LazyTable(index_table, SupplementaryData.arrivals_sleepovers, ['Dolasci', 'Noćenja'])
+    employment_tourism = LazyTable(items_table, SupplementaryData.employment_tourism, ['Year', 'Value'])
+    tourists_per_capita = LazyTable(index_table, SupplementaryData.tourists_per_capita, ['Broj turista', 'Noćenja'])
+    water_requirements = LazyTable(items_table, SupplementaryData.water_requirements_2021, ['Month', 'Value'])
+    damages_plumbing = LazyTable(index_table, SupplementaryData.damages_plumbing,
+                                 ['Grad Vinkovci', 'Ostala područja'])
+    water_loss = LazyTable(items_table, SupplementaryData.water_loss, ['Year', 'Value'])
+    water_capacity = LazyTable(transposed_table, SupplementaryData.water_capacity)
+    water_samples = LazyTable(transposed_table, SupplementaryData.water_samples)
+    use_of_land = LazyTable(items_table, SupplementaryData.use_of_land, ['Namjena površine', 'Value'])
+
+    @classmethod
+    def table_names(cls):
+        """Names of all tables, listing them does not build any table."""
+        return [name for name, value in vars(cls).items() if isinstance(value, LazyTable)]
+
+    def get(self, name):
+        if name not in self.table_names():
+            raise KeyError(f"Unknown supplementary table '{name}'")
+        return getattr(self, name)
+
+    def built_tables(self):
+        return [name for name in self.table_names() if name in vars(self)]
+
+    def release(self, name=None):
+        """Drops a cached table (every table if name is None), it is built again on the next access."""
+        for table_name in ([name] if name is not None else self.table_names()):
+            vars(self).pop(table_name, None)
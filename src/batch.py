@@ -0,0 +1,178 @@
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from Constants import Constants
+from inventory import Inventory, load_electricity, load_heat, load_transport, lighting
+from rendering import available_cpus
+
+root_dir = Path(__file__).parents[1]
+
+MANIFEST = root_dir / 'data' / 'batch' / 'vinkovci.json'
+
+
+@dataclass
+class InventoryJob:
+    """Inventory of one municipality and year, input files in the vinkovci_grijanje / struja / privatna_vozila format.
+
+    lighting_mwh is the public lighting consumption; its CO2 is computed with the year's electricity factor unless
+    lighting_co2 is given. Inputs of 2011 are in the 2011 format, see inventory.load_heat and load_transport.
+    """
+    municipality: str
+    year: int
+    heat: Path
+    electricity: Path
+    transport: Path
+    lighting_mwh: float
+    population: int = None
+    lighting_co2: float = None
+    country: str = 'Croatia'
+
+    @classmethod
+    def from_dict(cls, definition, base_dir):
+        # input paths are relative to the manifest
+        definition = dict(definition)
+        for key in ('heat', 'electricity', 'transport'):
+            definition[key] = Path(base_dir) / definition[key]
+        return cls(**definition)
+
+    @property
+    def name(self):
+        return f'{self.municipality} {self.year}'
+
+
+def load_manifest(path=MANIFEST):
+    """Jobs of a JSON manifest, values under "defaults" apply to every job that does not set them."""
+    with open(path) as f:
+        manifest = json.load(f)
+    defaults = manifest.get('defaults', {})
+    return [InventoryJob.from_dict({**defaults, **job}, Path(path).parent) for job in manifest['jobs']]
+
+
+def run_job(job):
+    """Runs one job, failures are returned with their traceback instead of raised so the batch goes on."""
+    start = time.perf_counter()
+    try:
+        constants = Constants(country=job.country)
+        light = lighting(constants, job.year, job.lighting_mwh)
+        if job.lighting_co2 is not None:
+            light[2] = job.lighting_co2
+        results = Inventory(constants, job.year).compute_inventory(
+            load_heat(job.year, job.heat),
+            load_electricity(job.year, job.electricity),
+            load_transport(constants, job.year, job.transport),
+            light,
+        )
+        return {'job': job, 'results': results, 'error': None, 'seconds': time.perf_counter() - start}
+    except Exception:
+        return {'job': job, 'results': None, 'error': traceback.format_exc(), 'seconds': time.perf_counter() - start}
+
+
+def _run_pool(jobs, n_jobs):
+    """Outcomes of the jobs on a pool of n_jobs processes and the indices of the jobs lost to a worker that died."""
+    outcomes = []
+    broken = []
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs))) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for i, (job, future) in enumerate(zip(jobs, futures)):
+            try:
+                outcomes.append(future.result())
+            except Exception as error:
+                if isinstance(error, BrokenProcessPool):
+                    broken.append(i)
+                outcomes.append({'job': job, 'results': None, 'error': traceback.format_exc(), 'seconds': float('nan')})
+    return outcomes, broken
+
+
+def run_batch(jobs, n_jobs=0):
+    """Outcomes of the jobs in manifest order, run in a process pool when n_jobs > 1 (0 uses every core)."""
+    if n_jobs == 0:
+        n_jobs = available_cpus()
+    if n_jobs == 1 or len(jobs) <= 1:
+        return [run_job(job) for job in jobs]
+
+    # a worker that dies breaks the pool and fails every job still pending on it, these go to a fresh pool as long
+    # as jobs keep finishing, once a pool breaks before any job finished each job runs in a pool of its own so only
+    # the job that kills its worker is lost
+    outcomes = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    while pending:
+        pool_outcomes, broken = _run_pool([jobs[i] for i in pending], n_jobs)
+        for i, outcome in zip(pending, pool_outcomes):
+            outcomes[i] = outcome
+        lost = [pending[i] for i in broken]
+        if len(lost) > 1 and len(lost) == len(pending):
+            for i in lost:
+                outcomes[i] = _run_pool([jobs[i]], 1)[0][0]
+            break
+        pending = lost if len(lost) < len(pending) else []
+    return outcomes
+
+
+def consolidate(outcomes):
+    """Tidy rows of every successful job with opcina and godina, and one summary row per job."""
+    tidy = []
+    summary = []
+    for outcome in outcomes:
+        job = outcome['job']
+        row = {'opcina': job.municipality, 'godina': job.year, 'status': 'ok' if outcome['error'] is None else 'failed',
+               'sekunde': outcome['seconds']}
+        if outcome['error'] is None:
+            total = outcome['results']['tidy']
+            tidy.append(total.assign(opcina=job.municipality, godina=job.year))
+            row['potrošnja_energije(MWh)'] = total['potrošnja_energije(MWh)'].sum()
+            row['Emisije CO2 (t)'] = total['Emisije CO2 (t)'].sum()
+            if job.population:
+                row['Emisije CO2 (t) po stanovniku'] = row['Emisije CO2 (t)'] / job.population
+        else:
+            row['greška'] = outcome['error'].strip().splitlines()[-1]
+        summary.append(row)
+
+    tidy = pd.concat(tidy, ignore_index=True) if tidy else pd.DataFrame()
+    return tidy, pd.DataFrame(summary)
+
+
+def main(manifest, n_jobs, output, store):
+    jobs = load_manifest(manifest)
+    start = time.perf_counter()
+    outcomes = run_batch(jobs, n_jobs)
+    seconds = time.perf_counter() - start
+    tidy, summary = consolidate(outcomes)
+
+    output.mkdir(exist_ok=True, parents=True)
+    tidy.to_csv(output / 'inventory.csv', index=False)
+    summary.to_csv(output / 'jobs.csv', index=False)
+    if store is not None:
+        from results_store import write_results
+
+        for outcome in outcomes:
+            if outcome['error'] is None:
+                job = outcome['job']
+                write_results(outcome['results'], job.municipality, job.year, root=store,
+                              metadata={'manifest': str(manifest), 'population': job.population})
+
+    print(summary.drop(columns=['greška'], errors='ignore').to_string(index=False, float_format='{:.2f}'.format))
+    failed = [outcome for outcome in outcomes if outcome['error'] is not None]
+    for outcome in failed:
+        print(f"\n{outcome['job'].name} failed:\n{outcome['error']}")
+    print(f'{len(jobs) - len(failed)} of {len(jobs)} jobs done in {seconds:.2f} s')
+    return len(failed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SECAP inventories of many municipalities and years.')
+    parser.add_argument('manifest', type=Path, nargs='?', default=MANIFEST,
+                        help='JSON file with a "jobs" list of municipality, year, inputs, population and lighting.')
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='Number of processes, 0 uses every core.')
+    parser.add_argument('-o', '--output', type=Path, default=root_dir / 'output' / 'batch',
+                        help='Directory for the consolidated inventory.csv and the per job jobs.csv.')
+    parser.add_argument('--store', type=Path, default=None, help='Also write every job to this result store.')
+    args = parser.parse_args()
+    raise SystemExit(1 if main(args.manifest, args.jobs, args.output, args.store) else 0)
@@ -0,0 +1,37 @@
+import pandas as pd
+
+
+def fuel_emission_factors(constants):
+    # year independent emission factors (t CO2 / MWh)
+    return {
+        "Dizel": constants.co2_diesel_mwh_ton,
+        "Benzin": constants.co2_petrol_mwh_ton,
+        "UNP": constants.co2_lpg_mwh_ton,
+        "prirodni plin": constants.co2_natgas_mwh_ton,
+        "ogrjevno drvo": constants.co2_wood_mwh_ton,
+        "lož ulje": constants.co2_heatoil_mwh_ton,  # Corresponds to heat oil
+    }
+
+
+def emission_factor_table(constants, years):
+    """Emission factors (t CO2 / MWh) indexed by energent with one column per year.
+
+    Electricity is the only year dependent factor, years without a known electricity factor are left as NaN.
+    """
+    fuel_factors = fuel_emission_factors(constants)
+    table = pd.DataFrame({year: pd.Series(fuel_factors, dtype=float) for year in years})
+    table.loc['električna energija'] = [
+        getattr(constants, f'co2_electricity_mwh_ton_{year}', float('nan')) for year in years
+    ]
+    table.index.name = 'energent'
+    table.columns.name = 'godina'
+    return table
+
+
+def co2_emissions(data, factors, energy_column='potrošnja_energije(MWh)', energent_column='energent'):
+    """Emissions (t CO2) for every row of data, factors is a Series of emission factors indexed by energent."""
+    row_factors = data[energent_column].map(factors)
+    missing = row_factors.isna()
+    if missing.any():
+        raise KeyError(f"No emission factor for: {sorted(data.loc[missing, energent_column].unique())}")
+    return data[energy_column] * row_factors
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# fuel mass column and calorific value constant of every transport fuel in the privatna_vozila tables
+MASS_COLUMNS = {
+    'Benzin': 'procijenjena_potrošena_masa_benzina(t)',
+    'UNP': 'procijenjena_potrošena_masa_unp(t)',
+    'Dizel': 'procijenjena_potrošena_masa_dizela(t)',
+}
+TON_MWH = {'Benzin': 'petrol_ton_mwh', 'UNP': 'lpg_ton_mwh', 'Dizel': 'diesel_ton_mwh'}
+
+# fuel of the vehicle count columns of the privatna_vozila tables, electric and hybrid vehicles have no fuel model
+COUNT_FUELS = {'benzin': 'Benzin', 'benzin-lpg': 'UNP', 'dizel': 'Dizel'}
+
+# factors of the fuel mass of a cohort, multiplied with the number of vehicles in this order
+PARAMETER_COLUMNS = ('km_per_year', 'specific_consumption', 'consumption_index', 'litre_to_ton')
+
+# constants of the 2011 private vehicle fuel masses per vehicle type and fuel, see correct_transport_2011
+FLEET_2011 = {
+    'osobna vozila': {
+        'Benzin': {'km_per_year': 'petrol_km_per_year', 'specific_consumption': 'specific_consumption_petrol_2000',
+                   'litre_to_ton': 'petrol_litre_to_ton'},
+        'UNP': {'km_per_year': 'unp_km_per_year', 'specific_consumption': 'specific_consumption_petrol_2000',
+                'consumption_index': 'lpg_petrol_index', 'litre_to_ton': 'lpg_litre_to_ton'},
+        'Dizel': {'km_per_year': 'diesel_km_per_year', 'specific_consumption': 'specific_consumption_diesel_2000',
+                  'litre_to_ton': 'diesel_litre_to_ton'},
+    },
+    'teretna i radna vozila': {
+        'Benzin': {'km_per_year': 'heavy_km_per_year', 'specific_consumption': 'specific_consumption_petrol_2000',
+                   'litre_to_ton': 'petrol_litre_to_ton'},
+        'Dizel': {'km_per_year': 'heavy_km_per_year', 'specific_consumption': 'specific_consumption_diesel_2000',
+                  'litre_to_ton': 'diesel_litre_to_ton'},
+    },
+    'mopedi i motocikli': {
+        'Benzin': {'km_per_year': 'bikes_km_per_year', 'specific_consumption': 'specific_consumption_petrol_2000',
+                   'litre_to_ton': 'petrol_litre_to_ton'},
+    },
+}
+
+
+def fleet_parameters(fleet, constants):
+    """Vehicle type x fuel table of the PARAMETER_COLUMNS values of a fleet definition, unset factors are 1."""
+    rows = [(vehicle, fuel, *(getattr(constants, names[column]) if column in names else 1.0
+                              for column in PARAMETER_COLUMNS))
+            for vehicle, fuels in fleet.items() for fuel, names in fuels.items()]
+    return pd.DataFrame(rows, columns=['vrsta_prijevoza', 'gorivo', *PARAMETER_COLUMNS])
+
+
+def fleet_energy(cohorts, constants, fleet=FLEET_2011):
+    """Fuel mass (t) and energy (MWh) of every cohort.
+
+    cohorts has one row per vehicle type, fuel and e.g. age with the columns vrsta_prijevoza, gorivo and broj.
+    Parameter columns already in the table, such as km per year by age, take precedence over the fleet definition.
+    Cohorts without parameters get NaN.
+    """
+    parameters = fleet_parameters(fleet, constants)
+    own = [column for column in PARAMETER_COLUMNS if column in cohorts]
+    table = cohorts.merge(parameters.drop(columns=own), on=['vrsta_prijevoza', 'gorivo'], how='left')
+
+    mass = table['broj'].to_numpy(dtype=float)
+    for column in PARAMETER_COLUMNS:
+        mass = mass * table[column].to_numpy(dtype=float)
+    ton_mwh = table['gorivo'].map({fuel: getattr(constants, name) for fuel, name in TON_MWH.items()})
+
+    result = cohorts.copy()
+    result['masa(t)'] = mass
+    result['MWh'] = mass * ton_mwh.to_numpy(dtype=float)
+    return result
+
+
+def aggregate_masses(result):
+    """Vehicle type x fuel mass column table of fleet_energy's result, in the privatna_vozila format."""
+    masses = result.pivot_table(index='vrsta_prijevoza', columns='gorivo', values='masa(t)', aggfunc='sum', sort=False)
+    return masses.rename(columns=MASS_COLUMNS)
+
+
+def counts_to_cohorts(table):
+    """Cohorts of a privatna_vozila table with vehicle counts per fuel column, e.g. the 2019 table."""
+    columns = [column for column in COUNT_FUELS if column in table]
+    cohorts = table[['vrsta_prijevoza', *columns]].melt(id_vars='vrsta_prijevoza', var_name='gorivo',
+                                                        value_name='broj')
+    cohorts['gorivo'] = cohorts['gorivo'].map(COUNT_FUELS)
+    return cohorts.loc[cohorts['broj'].fillna(0) > 0].reset_index(drop=True)
+
+
+def reported_cohorts(trans, constants, fleet=FLEET_2011):
+    """Cohorts of a privatna_vozila table that has fuel masses but no counts per fuel, e.g. the 2011 table.
+
+    The vehicles of a type are split by the reported mass of each fuel of the fleet, petrol and LPG masses divided by
+    how much more petrol than diesel is spent per km.
+    """
+    fuels = list(MASS_COLUMNS)
+    vehicles = trans.loc[trans['vrsta_prijevoza'].isin(list(fleet))].set_index('vrsta_prijevoza')
+    in_fleet = np.array([[fuel in fleet[vehicle] for fuel in fuels] for vehicle in vehicles.index])
+
+    consumption = {'Benzin': constants.specific_consumption_petrol_2000,
+                   'UNP': constants.specific_consumption_petrol_2000,
+                   'Dizel': constants.specific_consumption_diesel_2000}
+    relative = np.array([consumption[fuel] / constants.specific_consumption_diesel_2000 for fuel in fuels])
+    masses = vehicles[[MASS_COLUMNS[fuel] for fuel in fuels]].to_numpy(dtype=float)
+    adjusted = np.where(in_fleet, np.nan_to_num(masses) / relative, 0.0)
+    # summed in the order petrol, LPG, diesel
+    total = adjusted[:, 0] + adjusted[:, 1] + adjusted[:, 2]
+    counts = adjusted / total[:, None] * vehicles['broj'].to_numpy(dtype=float)[:, None]
+
+    # only the fuels a vehicle type reports are recalculated
+    rows, columns = np.nonzero(in_fleet & ~np.isnan(masses))
+    return pd.DataFrame({
+        'vrsta_prijevoza': vehicles.index[rows],
+        'gorivo': np.array(fuels)[columns],
+        'broj': counts[rows, columns],
+    })
@@ -0,0 +1,339 @@
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+# relative cutoff of the eigenvalues of the normal equations, near collinear variants get the minimum norm solution
+RCOND = 1e-10
+
+
+def _polynomial(t, degree):
+    return np.polynomial.polynomial.polyvander(t, degree)
+
+
+def _exponential(t, rate):
+    # c + a exp(-rate (t + 1)), a decay (or growth) towards the level c
+    return np.stack([np.ones_like(t), np.exp(-rate * (t + 1))], axis=-1)
+
+
+def _logistic(t, steepness, midpoint):
+    # c + a / (1 + exp(steepness (t - midpoint))), a step from c + a down to the plateau c
+    return np.stack([np.ones_like(t), 1 / (1 + np.exp(steepness * (t - midpoint)))], axis=-1)
+
+
+def _piecewise(t, knot):
+    # a + b t + c max(0, t - knot), a line whose slope changes at the knot
+    return np.stack([np.ones_like(t), t, np.maximum(t - knot, 0)], axis=-1)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """A trend model that is linear in its coefficients once its shape parameters are fixed.
+
+    Candidates of one family only differ in the shape parameters, e.g. the rate of an exponential decay, which are
+    fitted by taking the variant with the lowest training error. Time is the window [-1, 1] the years are mapped to.
+    """
+    family: str
+    basis: object
+    params: tuple = ()
+
+    def design(self, t):
+        return self.basis(np.asarray(t, dtype=float), *self.params)
+
+
+def default_candidates(degrees=(1, 2, 3)):
+    """Polynomials of the given degrees, exponential decay, logistic plateau and piecewise linear trends."""
+    candidates = [Candidate(f'polynomial {degree}', _polynomial, (degree,)) for degree in degrees]
+    candidates += [Candidate('exponential', _exponential, (rate,)) for rate in np.geomspace(0.25, 8, 12)]
+    candidates += [Candidate('logistic', _logistic, (steepness, midpoint))
+                   for steepness in (2, 4, 8, 16, 32) for midpoint in np.linspace(-0.75, 1.5, 10)]
+    candidates += [Candidate('piecewise linear', _piecewise, (knot,)) for knot in np.linspace(-0.6, 0.8, 8)]
+    return candidates
+
+
+def _window(years, domain):
+    return (2 * np.asarray(years, dtype=float) - (domain[0] + domain[1])) / (domain[1] - domain[0])
+
+
+def _design(candidates, t):
+    """(candidates, points, columns) designs, zero padded to the widest candidate."""
+    designs = [candidate.design(t) for candidate in candidates]
+    design = np.zeros((len(designs), len(t), max(d.shape[1] for d in designs)))
+    for v, d in enumerate(designs):
+        design[v, :, :d.shape[1]] = d
+    return design
+
+
+def rolling_origin_folds(n_points, min_train, horizon=None):
+    """(train, test) masks of shape (folds, n_points); fold k trains on the first min_train + k points and tests on
+    the horizon points after them, all remaining points when horizon is None."""
+    if not 0 < min_train < n_points:
+        raise ValueError(f'min_train has to be between 1 and {n_points - 1}, got {min_train}')
+    origins = np.arange(min_train, n_points)[:, None]
+    index = np.arange(n_points)
+    end = n_points if horizon is None else origins + horizon
+    return index < origins, (index >= origins) & (index < end)
+
+
+def _evaluate(design, family_of, n_families, values, train, test):
+    """Backtest RMSE, chosen variant, coefficients and in-sample R² per series and family of a chunk of series.
+
+    The last fold of train is the fit on every point, which is the one returned.
+    """
+    n_series = len(values)
+    observed = ~np.isnan(values)
+    y = np.where(observed, values, 0.0)
+    weights = (train[None] & observed[:, None]).astype(float)
+    tested = (test[None] & observed[:, None]).astype(float)
+
+    # normal equations of every series x fold x variant, solved in one batch; the matrices only depend on which
+    # points are observed, so they are inverted once per pattern of missing values
+    patterns, pattern_of = np.unique(observed, axis=0, return_inverse=True)
+    pattern_weights = (train[None] & patterns[:, None]).astype(float)
+    gram = np.einsum('pfn,vni,vnj->pfvij', pattern_weights, design, design, optimize=True)
+    inverse = np.linalg.pinv(gram, rcond=RCOND, hermitian=True)
+    moment = np.einsum('sfn,vni,sn->sfvi', weights, design, y, optimize=True)
+    coefficients = np.einsum('sfvij,sfvj->sfvi', inverse[pattern_of.ravel()], moment)
+    squared = (y[:, None, None] - np.einsum('vni,sfvi->sfvn', design, coefficients, optimize=True)) ** 2
+    train_sse = np.einsum('sfvn,sfn->sfv', squared, weights)
+    test_sse = np.einsum('sfvn,sfn->sfv', squared, tested)
+    n_tested = tested[:, :-1].sum(axis=(1, 2))
+
+    mean = np.nanmean(np.where(observed, values, np.nan), axis=1)
+    ss_tot = np.nansum(np.where(observed, (values - mean[:, None]) ** 2, np.nan), axis=1)
+    series = np.arange(n_series)
+
+    scores = np.full((n_series, n_families), np.nan)
+    variants = np.zeros((n_series, n_families), dtype=int)
+    fits = np.zeros((n_series, n_families, design.shape[2]))
+    r2 = np.full((n_series, n_families), np.nan)
+    for k in range(n_families):
+        members = np.flatnonzero(family_of == k)
+        chosen = members[np.argmin(train_sse[:, :, members], axis=2)]
+        fold_sse = np.take_along_axis(test_sse, chosen[..., None], axis=2)[..., 0]
+        sse = train_sse[series, -1, chosen[:, -1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores[:, k] = np.sqrt(fold_sse[:, :-1].sum(axis=1) / n_tested)
+            r2[:, k] = np.where(ss_tot > 0, 1 - sse / ss_tot, np.where(sse == 0, 1.0, 0.0))
+        variants[:, k] = chosen[:, -1]
+        fits[:, k] = coefficients[series, -1, chosen[:, -1]]
+    return scores, variants, fits, r2
+
+
+@dataclass(frozen=True, eq=False)
+class ModelSelection:
+    """Backtest of every candidate family on every series and the fit of each family on all points.
+
+    scores are the out-of-sample RMSE of the rolling-origin folds (series, families), best the family with the lowest
+    one; variants and coefficients describe the fit of each family on every point of the series. Predictions of
+    nonnegative series are floored at zero.
+    """
+    names: np.ndarray
+    families: tuple
+    candidates: tuple
+    domain: np.ndarray
+    scores: np.ndarray
+    variants: np.ndarray
+    coefficients: np.ndarray
+    r2: np.ndarray
+    nonnegative: np.ndarray = None
+
+    @property
+    def best(self):
+        return np.argmin(np.where(np.isnan(self.scores), np.inf, self.scores), axis=1)
+
+    def series_index(self, name):
+        matches = np.flatnonzero(self.names == name)
+        if len(matches) == 0:
+            raise KeyError(f"Series '{name}' is not in the model selection")
+        return int(matches[0])
+
+    def predict(self, years, family=None, series=None, clip=True):
+        """(series, years) predictions of the best family of every series, or of the given family.
+
+        series are indices of the series to predict, all by default. clip floors the nonnegative series at zero.
+        """
+        series = np.arange(len(self.names)) if series is None else np.asarray(series)
+        family = self.best[series] if family is None else self.families.index(family)
+        design = _design(self.candidates, _window(np.atleast_1d(years), self.domain))
+        variants = self.variants[series, family]
+        predictions = np.einsum('snp,sp->sn', design[variants], self.coefficients[series, family])
+        if clip and self.nonnegative is not None:
+            predictions = np.where(self.nonnegative[series, None], np.maximum(predictions, 0), predictions)
+        return predictions
+
+    def trend(self, name, family=None):
+        return Trend(self, self.series_index(name), family)
+
+    def to_frame(self, years=(2030,)):
+        """Backtest RMSE of every family, the best family, its R², its predictions of the given years and whether any
+        of them was floored at zero."""
+        import pandas as pd
+
+        series = np.arange(len(self.names))
+        frame = pd.DataFrame(self.scores, index=pd.Index(self.names, name='series'), columns=list(self.families))
+        frame['best'] = np.array(self.families)[self.best]
+        frame['R2'] = self.r2[series, self.best]
+        predictions = self.predict(years)
+        for year, values in zip(years, predictions.T):
+            frame[year] = values
+        frame['clipped'] = np.any(predictions != self.predict(years, clip=False), axis=1)
+        return frame
+
+
+@dataclass(frozen=True, eq=False)
+class Trend:
+    """Trend of one series of a model selection, called with years like a numpy Polynomial."""
+    selection: ModelSelection
+    index: int
+    family: str = None
+
+    @property
+    def name(self):
+        return self.family or self.selection.families[self.selection.best[self.index]]
+
+    @property
+    def rmse(self):
+        return self.selection.scores[self.index, self.selection.families.index(self.name)]
+
+    @property
+    def r2(self):
+        return self.selection.r2[self.index, self.selection.families.index(self.name)]
+
+    def __call__(self, years):
+        values = self.selection.predict(years, self.name, [self.index])[0]
+        return values[0] if np.ndim(years) == 0 else values
+
+
+@dataclass(frozen=True, eq=False)
+class PredictionInterval:
+    """Bootstrap predictions (resamples, years) of target years around the point prediction of a trend."""
+    years: np.ndarray
+    point: np.ndarray
+    samples: np.ndarray
+    level: float
+
+    @property
+    def percentiles(self):
+        return 50 * (1 - self.level), 50 * (1 + self.level)
+
+    @property
+    def low(self):
+        return np.percentile(self.samples, self.percentiles[0], axis=0)
+
+    @property
+    def high(self):
+        return np.percentile(self.samples, self.percentiles[1], axis=0)
+
+
+def trend_design(trend):
+    """Function of years returning the design matrix of a numpy Polynomial or a backtested Trend."""
+    if isinstance(trend, Trend):
+        selection = trend.selection
+        family = selection.families.index(trend.name)
+        candidate = selection.candidates[selection.variants[trend.index, family]]
+        return lambda years: candidate.design(_window(years, selection.domain))
+    offset, scale = trend.mapparms()
+    return lambda years: np.polynomial.polynomial.polyvander(offset + scale * np.asarray(years, dtype=float),
+                                                             trend.degree())
+
+
+def bootstrap_interval(trend, years, values, target_years, n_resamples=5000, level=0.9, seed=0):
+    """Residual bootstrap prediction interval of a trend fitted to values, NaN values are left out.
+
+    Every resample adds resampled residuals to the fitted values and refits the trend, all resamples are solved by
+    one lstsq call against the shared design; a resampled residual is added to their predictions so the interval
+    covers the scatter of single years, not only the uncertainty of the trend. Shape parameters of backtested
+    trends, e.g. the midpoint of a logistic, stay fixed.
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    observed = ~np.isnan(values)
+    years, values = years[observed], values[observed]
+    design = trend_design(trend)
+    fit_design, target_design = design(years), design(np.atleast_1d(target_years))
+
+    coefficients = np.linalg.lstsq(fit_design, values, rcond=None)[0]
+    fitted = fit_design @ coefficients
+    # residuals are shrunk by the fit, inflate them back to the error variance
+    n_points, n_coefficients = fit_design.shape
+    residuals = (values - fitted) * np.sqrt(n_points / max(n_points - n_coefficients, 1))
+
+    rng = np.random.default_rng(seed)
+    resampled = fitted + residuals[rng.integers(0, n_points, (n_resamples, n_points))]
+    refitted = np.linalg.lstsq(fit_design, resampled.T, rcond=None)[0]
+    samples = (target_design @ refitted).T + residuals[rng.integers(0, n_points, (n_resamples, len(target_design)))]
+    point = np.atleast_1d(trend(np.atleast_1d(target_years)))
+    return PredictionInterval(np.atleast_1d(target_years), point, samples, level)
+
+
+def _exclude_negative(design, variants, coefficients, scores, nonnegative):
+    """Scores without the families whose fits go below zero on the points of design, on the non-negative series that
+    have a family staying above it."""
+    predictions = np.einsum('sfnp,sfp->sfn', design[variants], coefficients)
+    negative = nonnegative[:, None] & (predictions.min(axis=2) < 0)
+    negative &= ~negative.all(axis=1, keepdims=True)
+    return np.where(negative, np.nan, scores)
+
+
+def select_models(years, values, names=None, candidates=None, min_train=None, horizon=5, chunk=64, until=None,
+                  nonnegative=None):
+    """Rolling-origin backtest of the candidates on every series of values (series, years), NaN marks missing values.
+
+    Every fold refits all candidates on the points before its origin and scores them on the horizon points after it,
+    the variant of a family is the one with the lowest training error of the fold. min_train defaults to half of the
+    points, at least the widest candidate + 2. Series are evaluated chunk at a time to bound memory.
+    A family whose fit goes below zero in a year up to until (the last year by default) gets no score on a
+    nonnegative series, by default every series without negative values, unless no family stays above zero; the
+    predictions of such a series are floored at zero.
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    names = np.arange(len(values)) if names is None else np.asarray(names)
+    candidates = tuple(candidates or default_candidates())
+    families = tuple(dict.fromkeys(candidate.family for candidate in candidates))
+    family_of = np.array([families.index(candidate.family) for candidate in candidates])
+
+    domain = np.array([years.min(), years.max()])
+    design = _design(candidates, _window(years, domain))
+    if min_train is None:
+        min_train = max(design.shape[2] + 2, len(years) // 2)
+    train, test = rolling_origin_folds(len(years), min_train, horizon)
+    # an extra fold with every point is the final fit
+    train = np.vstack([train, np.ones(len(years), dtype=bool)])
+    test = np.vstack([test, np.zeros(len(years), dtype=bool)])
+
+    parts = [_evaluate(design, family_of, len(families), values[start:start + chunk], train, test)
+             for start in range(0, len(values), chunk)]
+    scores, variants, coefficients, r2 = (np.concatenate(part) for part in zip(*parts))
+
+    nonnegative = ~np.any(values < 0, axis=1) if nonnegative is None else np.broadcast_to(nonnegative, len(values))
+    until = years.max() if until is None else max(until, years.max())
+    grid = _design(candidates, _window(np.arange(years.min(), until + 1), domain))
+    scores = _exclude_negative(grid, variants, coefficients, scores, nonnegative)
+    return ModelSelection(names, families, candidates, domain, scores, variants, coefficients, r2, nonnegative)
+
+
+def forecast(years, values, target_years, **kwargs):
+    """Predictions of target_years by the best backtested model of one series, and the model selection."""
+    selection = select_models(years, values, **kwargs)
+    return selection.predict(target_years)[0], selection
+
+
+if __name__ == '__main__':
+    from jrc_data import load_emission_factors
+
+    parser = argparse.ArgumentParser(description='Backtested trend models of the JRC electricity emission factors.')
+    parser.add_argument('--countries', nargs='+', default=None, help='Countries to print, all by default.')
+    parser.add_argument('--years', type=int, nargs='+', default=[2030])
+    parser.add_argument('--horizon', type=int, default=5, help='Years after the origin every fold is scored on.')
+    parser.add_argument('--min-train', type=int, default=None, help='Years of the first training window.')
+    args = parser.parse_args()
+
+    table = load_emission_factors()
+    selection = select_models(table.years, table.values, table.countries, min_train=args.min_train,
+                              horizon=args.horizon, until=max(args.years))
+    frame = selection.to_frame(args.years)
+    if args.countries is not None:
+        frame = frame.loc[args.countries]
+    print(frame.to_string(float_format='{:.4f}'.format))
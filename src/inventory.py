@@ -1,17 +1,27 @@
-import matplotlib
+import argparse
 import numpy as np
-import seaborn as sns
 import pandas as pd
 from pathlib import Path
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FuncFormatter
-from numpy.polynomial import Polynomial
 from Constants import Constants
 from SupplementaryData import SupplementaryData
-from sklearn.metrics import r2_score
+from emissions import emission_factor_table, co2_emissions
+from rendering import ChartJob, render_jobs
+from profiling import profiled
+from fleet import FLEET_2011, aggregate_masses, fleet_energy, reported_cohorts
+from jrc_data import load_emission_factors, load_trend_fits
+from forecast import bootstrap_interval, select_models
+from scenarios import SCENARIOS_2030, ProjectionBaseline, evaluate_scenarios, load_scenarios, scenario_files
 
 root_dir = Path(__file__).parents[1]
 
+# pivots returned by Inventory.base_inventory
+INVENTORY_KEYS = (
+    'heat', 'heat_co2', 'electricity', 'electricity_co2', 'transport', 'transport_co2', 'total', 'total_co2'
+)
+
+# fixed keeps the published cubic / quadratic trends, backtest the model with the lowest rolling-origin error
+TREND_MODELS = ('fixed', 'backtest')
+
 
 def custom_formatter(x, pos):
     return '{:,.0f}'.format(x).replace(',', ' ').replace('.', ',').replace(' ', '.')
@@ -43,7 +53,46 @@ def percent_difference(df1, df2):
     return percent_diff
 
 
-def electricity_emission_factor_2030():
+def r2_score(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    ss_res = np.sum((y_true - y_pred) ** 2)
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    if ss_tot == 0:
+        # constant target, same convention as scikit-learn
+        return 1.0 if ss_res == 0 else 0.0
+    return 1 - ss_res / ss_tot
+
+
+def annotate_trend(ax, p, r2, fontsize):
+    if not hasattr(p, 'rmse'):
+        ax.annotate(f'R^2 = {r2:.3f}'.replace('.', ','), xy=(0.75, 0.90), xycoords='axes fraction', fontsize=fontsize)
+        return
+    # backtested trends also name their model and its out-of-sample error
+    ax.annotate(f'{p.name}\nR^2 = {r2:.3f}\nRMSE = {p.rmse:.4f}'.replace('.', ','), xy=(0.75, 0.95),
+                xycoords='axes fraction', fontsize=fontsize, va='top')
+
+
+@profiled(category='fit')
+def electricity_emission_factor_fit(model='fixed'):
+    emission_factors = load_emission_factors()
+    x = emission_factors.years.astype(int)
+    y = emission_factors.series('Croatia').astype(float)
+
+    if model == 'backtest':
+        p = select_models(x, y, ['Croatia'], until=2030).trend('Croatia')
+    else:
+        # cubic trend of Croatia out of the fits of every country in the sheet
+        p = load_trend_fits(degree=3).polynomial('Croatia')
+    return x, y, p
+
+
+def electricity_emission_factor_figure(x, y, p, interval=None):
+    """Trend p of the emission factors y of the years x, interval is the (low, high) 2030 prediction interval."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.ticker import FuncFormatter
+
     sns.set_theme()
     sns.set_style()
     SMALL_SIZE = 10
@@ -51,8 +100,6 @@ def electricity_emission_factor_2030():
 
     color_palette = sns.color_palette()
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-
     plt.rc('font', size=MEDIUM_SIZE)  # controls default text sizes
     plt.rc('axes', titlesize=MEDIUM_SIZE)  # fontsize of the axes title
     plt.rc('axes', labelsize=MEDIUM_SIZE)  # fontsize of the x and y labels
@@ -60,29 +107,26 @@ def electricity_emission_factor_2030():
     plt.rc('ytick', labelsize=MEDIUM_SIZE)  # fontsize of the tick labels
     plt.rc('legend', fontsize=MEDIUM_SIZE)  # legend fontsize
 
-    file_path = Path(root_dir / "data" / "public_data/JRC-COM-NEEFE_1990-2020.xlsx")
-    df = pd.read_excel(file_path, sheet_name=1, skiprows=1, engine='openpyxl')
-    emission_factors = df.loc[df['Unnamed: 0'] == 'Croatia'].drop(columns='Unnamed: 0').melt()
-    x = emission_factors['variable'].values.astype(int)
-    y = emission_factors['value'].values.astype(float)
+    fig, ax = plt.subplots(figsize=(10, 6))
 
-    p = Polynomial.fit(x, y, 3)
     predicted_2030 = p(2030)
 
     x_dense = np.linspace(min(x), 2030, 400)
     y_dense = p(x_dense)
 
     y_pred = p(x)
-    r2 = r2_score(y_pred, y)
+    r2 = r2_score(y, y_pred)
 
     sns.scatterplot(x=x, y=y, ax=ax, color=color_palette[0])
     ax.plot(x_dense, y_dense, color=color_palette[3])
     ax.scatter(2030, predicted_2030, color=color_palette[2], marker='x', s=100, label='Predviđanje za 2030')
+    if interval is not None:
+        # bootstrap prediction interval of 2030
+        ax.errorbar(2030, predicted_2030, yerr=[[predicted_2030 - interval[0]], [interval[1] - predicted_2030]],
+                    fmt='none', ecolor=color_palette[2], capsize=6)
     ax.annotate(f'{predicted_2030:.3f}'.replace('.', ','), (2030, predicted_2030), textcoords="offset points",
-                xytext=(0, 10),
-                ha='center')
-    ax.annotate(f'R^2 = {r2:.3f}'.replace('.',','), xy=(0.75, 0.90), xycoords='axes fraction',
-                fontsize=MEDIUM_SIZE)
+                xytext=(-12, 0), ha='right', va='center')
+    annotate_trend(ax, p, r2, MEDIUM_SIZE)
 
     # Set x and y labels
     ax.set_xlabel('Godina')
@@ -90,10 +134,51 @@ def electricity_emission_factor_2030():
 
     ax.yaxis.set_major_formatter(FuncFormatter(custom_formatter))
 
-    return predicted_2030, fig
+    return fig
+
+
+def electricity_emission_factor_2030(model='fixed', n_resamples=5000, level=0.9):
+    x, y, p = electricity_emission_factor_fit(model)
+    interval = None
+    if n_resamples:
+        bounds = bootstrap_interval(p, x, y, [2030], n_resamples, level)
+        interval = float(bounds.low[0]), float(bounds.high[0])
+    return p(2030), electricity_emission_factor_figure(x, y, p, interval)
+
+
+def engine_efficiency_interval(model='fixed', year=2030, n_resamples=5000, level=0.9, seed=0, fit=None):
+    """Bootstrap prediction interval of the engine efficiency trend, fit is the result of engine_efficiency_fit."""
+    x, y, p = fit or engine_efficiency_fit(model)
+    if model != 'backtest':
+        # the fixed quadratic is fitted without the last two points
+        x, y = x[:-2], y[:-2]
+    return bootstrap_interval(p, x, y, [year], n_resamples, level, seed)
 
 
-def engine_efficiency_projection():
+@profiled(category='fit')
+def engine_efficiency_fit(model='fixed'):
+    from numpy.polynomial import Polynomial
+
+    data = SupplementaryData.engine_efficiency_trends
+
+    x = np.array(list(data.keys())).astype(int)
+    y = np.array(list(data.values())).astype(float)
+
+    if model == 'backtest':
+        # every point is kept, a plateau is one of the candidate models
+        p = select_models(x, y, ['engine efficiency'], until=2030).trend('engine efficiency')
+    else:
+        # drop last two elements due to increase, plateau is modified through polynomial func
+        p = Polynomial.fit(x[:-2], y[:-2], 2)
+    return x, y, p
+
+
+def engine_efficiency_figure(x, y, p, interval=None):
+    """Trend p of the specific consumption y of the years x, interval is the (low, high) 2030 prediction interval."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.ticker import FuncFormatter
+
     sns.set_theme()
     sns.set_style()
     SMALL_SIZE = 10
@@ -101,8 +186,6 @@ def engine_efficiency_projection():
 
     color_palette = sns.color_palette()
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-
     plt.rc('font', size=MEDIUM_SIZE)  # controls default text sizes
     plt.rc('axes', titlesize=MEDIUM_SIZE)  # fontsize of the axes title
     plt.rc('axes', labelsize=MEDIUM_SIZE)  # fontsize of the x and y labels
@@ -110,29 +193,26 @@ def engine_efficiency_projection():
     plt.rc('ytick', labelsize=MEDIUM_SIZE)  # fontsize of the tick labels
     plt.rc('legend', fontsize=MEDIUM_SIZE)  # legend fontsize
 
-    data = SupplementaryData.engine_efficiency_trends
-
-    x = np.array(list(data.keys())).astype(int)
-    y = np.array(list(data.values())).astype(float)
+    fig, ax = plt.subplots(figsize=(10, 6))
 
-    # drop last two elements due to increase, plateau is modified through polynomial func
-    p = Polynomial.fit(x[:-2], y[:-2], 2)
     predicted_2030 = p(2030)
 
     x_dense = np.linspace(min(x), 2030, 400)
     y_dense = p(x_dense)
 
     y_pred = p(x)
-    r2 = r2_score(y_pred, y)
+    r2 = r2_score(y, y_pred)
 
     sns.scatterplot(x=x, y=y, ax=ax, color=color_palette[0])
     ax.plot(x_dense, y_dense, color=color_palette[3])
     ax.scatter(2030, predicted_2030, color=color_palette[2], marker='x', s=100, label='Predviđanje za 2030')
+    if interval is not None:
+        # bootstrap prediction interval of 2030
+        ax.errorbar(2030, predicted_2030, yerr=[[predicted_2030 - interval[0]], [interval[1] - predicted_2030]],
+                    fmt='none', ecolor=color_palette[2], capsize=6)
     ax.annotate(f'{predicted_2030:.3f}'.replace('.', ','), (2030, predicted_2030), textcoords="offset points",
-                xytext=(0, 10),
-                ha='center')
-    ax.annotate(f'R^2 = {r2:.3f}'.replace('.', ','), xy=(0.75, 0.90), xycoords='axes fraction',
-                fontsize=MEDIUM_SIZE)
+                xytext=(-12, 0), ha='right', va='center')
+    annotate_trend(ax, p, r2, MEDIUM_SIZE)
 
     # Set x and y labels
     ax.set_xlabel('Godina')
@@ -140,51 +220,133 @@ def engine_efficiency_projection():
 
     ax.yaxis.set_major_formatter(FuncFormatter(custom_formatter_engine))
 
-    return predicted_2030, fig
+    return fig
 
 
-class Inventory:
-    def __init__(self, constants, year):
-        color_palette = sns.color_palette()
+def engine_efficiency_projection(model='fixed', n_resamples=5000, level=0.9):
+    fit = engine_efficiency_fit(model)
+    interval = None
+    if n_resamples:
+        bounds = engine_efficiency_interval(model, 2030, n_resamples, level, fit=fit)
+        interval = float(bounds.low[0]), float(bounds.high[0])
+    return fit[2](2030), engine_efficiency_figure(*fit, interval)
 
-        pd.set_option('display.float_format', lambda x: '%.1f' % x)
-        self.constants = constants
 
-        self.co2_factors = {
-            "Dizel": constants.co2_diesel_mwh_ton,
-            "Benzin": constants.co2_petrol_mwh_ton,
-            "UNP": constants.co2_lpg_mwh_ton,
-            "prirodni plin": constants.co2_natgas_mwh_ton,
-            "ogrjevno drvo": constants.co2_wood_mwh_ton,
-            "lož ulje": constants.co2_heatoil_mwh_ton  # Corresponds to heat oil
-        }
-        if year == 2011:
-            self.co2_factors["električna energija"] = constants.co2_electricity_mwh_ton_2011
-        elif year == 2019:
-            self.co2_factors["električna energija"] = constants.co2_electricity_mwh_ton_2019
+def correct_transport_2011(trans, constants):
+    """Private vehicle fuel masses of 2011 recalculated from the fleet the same way as in 2019."""
+    trans = trans.copy()
 
-        self.colors = {
-            'lož ulje': color_palette[1],
-            'električna energija': color_palette[0],
-            'prirodni plin': color_palette[3],
-            'ogrjevno drvo': color_palette[5],
-            'Dizel': color_palette[8],
-            'Benzin': color_palette[9],
-            'UNP': color_palette[6],
+    # fuel consumption is 2011 is too low, split the vehicles by the reported fuels and recalculate the masses
+    masses = aggregate_masses(fleet_energy(reported_cohorts(trans, constants), constants, FLEET_2011))
+    for column in masses:
+        vehicles = masses[column].dropna()
+        rows = trans['vrsta_prijevoza'].isin(vehicles.index)
+        trans.loc[rows, column] = trans.loc[rows, 'vrsta_prijevoza'].map(vehicles)
 
-            'stambeni objekti': color_palette[0],
-            'zgrade komercijalnog i uslužnog karaktera': color_palette[1],
-            'zgrade javne namjene': color_palette[2],
+    return trans
 
-            'teretna i radna vozila': color_palette[6],
-            'osobna vozila': color_palette[7],
-            'ostalo': color_palette[8],
-            'autobusni': color_palette[9],
-            'mopedi i motocikli': color_palette[4],
 
-        }
+def _group_2011_kategorija(frame, keys):
+    frame = frame.copy()
+    frame['kategorija'] = frame['kategorija'].replace('objekti i uredi gradskih tvrtki',
+                                                      'uprava i uredi gradskih tvrtki')
+    frame['kategorija'] = frame['kategorija'].replace('uprava', 'uprava i uredi gradskih tvrtki')
+    return frame.groupby(keys, as_index=False).sum()
+
+
+def group_2011_categories(heat, ele):
+    # group heat and electricity to fit 2019 format
+    heat = _group_2011_kategorija(heat, ['nadkategorija', 'kategorija', 'energent'])
+    ele = _group_2011_kategorija(ele, ['nadkategorija', 'kategorija'])
+    return heat, ele
+
+
+# input tables of an inventory year in data/<year>/
+INPUT_FILES = {
+    'heat': 'vinkovci_grijanje_{year}.csv',
+    'electricity': 'vinkovci_struja_{year}.csv',
+    'transport': 'privatna_vozila_{year}.csv',
+}
+
+# public lighting MWh of the inventory years, 2011 CO2 is the reported one
+LIGHTING_MWH = {2011: 2922.5, 2019: 2008.656}
+LIGHTING_CO2_2011 = 678.0
+
+
+def input_file(kind, year):
+    return root_dir / 'data' / str(year) / INPUT_FILES[kind].format(year=year)
+
+
+def load_heat(year, path=None):
+    heat = pd.read_csv(path or input_file('heat', year))
+    if year == 2011:
+        heat = _group_2011_kategorija(heat, ['nadkategorija', 'kategorija', 'energent'])
+    return heat
+
+
+def load_electricity(year, path=None):
+    ele = pd.read_csv(path or input_file('electricity', year))
+    if year == 2011:
+        ele = _group_2011_kategorija(ele, ['nadkategorija', 'kategorija'])
+    return ele
+
+
+def load_transport(constants, year, path=None):
+    trans = pd.read_csv(path or input_file('transport', year))
+    if year == 2011:
+        trans = correct_transport_2011(trans, constants)
+    return trans
+
+
+def lighting(constants, year, mwh=None):
+    """[energent, MWh, t CO2, sektor] row of public lighting, 2011 keeps the reported CO2."""
+    mwh = LIGHTING_MWH[year] if mwh is None else mwh
+    if year == 2011 and mwh == LIGHTING_MWH[2011]:
+        return ['električna energija', mwh, LIGHTING_CO2_2011, 'javna rasvjeta']
+    return ['električna energija', mwh, mwh * getattr(constants, f'co2_electricity_mwh_ton_{year}'), 'javna rasvjeta']
+
+
+def load_inputs(constants, year):
+    """Heat, electricity, private vehicle and public lighting inputs of an inventory year in the 2019 format."""
+    if year not in LIGHTING_MWH:
+        raise ValueError(f"No inventory input data for {year}")
+    return load_heat(year), load_electricity(year), load_transport(constants, year), lighting(constants, year)
+
+
+def inventory_results(heat, ele, trans, total):
+    """compute_inventory layout of the (data, tables) pairs of the heat, electricity, transport and total inventory."""
+    (heat, heat_tables), (ele, ele_tables) = heat, ele
+    (trans_melted, trans_tables), (total, total_tables) = trans, total
+    return {
+        **heat_tables,
+        **ele_tables,
+        **trans_tables,
+        **total_tables,
+        'tidy': total,
+        'heat_data': heat,
+        'electricity_data': ele,
+        'transport_data': trans_melted,
+    }
+
+
+class Inventory:
+    def __init__(self, constants, year):
+        pd.set_option('display.float_format', lambda x: '%.1f' % x)
+        self.constants = constants
+
+        # emission factors indexed by energent, mapped onto whole columns at once
+        self.emission_factors = emission_factor_table(constants, [year])[year].dropna()
+        self.co2_factors = self.emission_factors.to_dict()
+
+    def chart_state(self):
+        # the colors are set by the plot methods themselves
+        return {'constants': self.constants.declared()}
 
     def stacked_bar(self, data, title):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib.ticker import FuncFormatter
+
         sns.set_theme()
         sns.set_style()
         SMALL_SIZE = 10
@@ -250,6 +412,11 @@ class Inventory:
         return fig
 
     def compare_stacked_bar(self, data1, data2, year1, year2, title):
+        import matplotlib.patches
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib.ticker import FuncFormatter
+
         sns.set_theme()
         sns.set_style()
         SMALL_SIZE = 10
@@ -355,6 +522,11 @@ class Inventory:
         return fig
 
     def rasvjeta_bar(self, data1, data2, year1, year2, title):
+        import matplotlib.patches
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib.ticker import FuncFormatter
+
         sns.set_theme()
         sns.set_style()
         SMALL_SIZE = 10
@@ -407,6 +579,10 @@ class Inventory:
         return fig
 
     def projection_bar(self, data, title):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib.ticker import FuncFormatter
+
         # Styling and fonts settings as provided
         sns.set_theme()
         sns.set_style("whitegrid")
@@ -437,24 +613,33 @@ class Inventory:
         for bar in bars.patches:
             heights.append(bar.get_y() + bar.get_height() / 2)
 
-        # Calculate the total heights of the bars for 2019 and 2030
-        total_height_2019 = data[data['Godina'] == 2019][0].sum()
-        total_height_2030 = data[data['Godina'] == 2030][0].sum()
+        # Calculate the total heights of the bars for the first and the last year, e.g. 2019 and 2030
+        first_year, last_year = data_pivot.index.min(), data_pivot.index.max()
+        total_height_first = data[data['Godina'] == first_year][0].sum()
+        total_height_last = data[data['Godina'] == last_year][0].sum()
 
         # Drawing the horizontal lines
-        ax.axhline(y=total_height_2019, xmin=0.305, xmax=0.86, color=color_palette[4], linestyle='--')
-        ax.axhline(y=total_height_2030, xmin=0.305, xmax=0.86, color=color_palette[4], linestyle='--')
+        ax.axhline(y=total_height_first, xmin=0.305, xmax=0.86, color=color_palette[4], linestyle='--')
+        ax.axhline(y=total_height_last, xmin=0.305, xmax=0.86, color=color_palette[4], linestyle='--')
 
         # Calculating the percentage change
-        if total_height_2019 != 0:
-            percent_change = ((total_height_2030 - total_height_2019) / total_height_2019) * 100
+        if total_height_first != 0:
+            percent_change = ((total_height_last - total_height_first) / total_height_first) * 100
         else:
-            percent_change = 100  # if the 2019 bar's height is 0, then it's a full increase, so consider it 100%
+            percent_change = 100  # if the first bar's height is 0, then it's a full increase, so consider it 100%
 
-        diff_position = (total_height_2030 + total_height_2019) / 2
-        ax.text(1 / 2, diff_position + abs(total_height_2030 - total_height_2019) / 20, f'{percent_change:.2f}%',
+        diff_position = (total_height_last + total_height_first) / 2
+        ax.text(1 / 2, diff_position + abs(total_height_last - total_height_first) / 20, f'{percent_change:.2f}%',
                 horizontalalignment='center', verticalalignment='center', fontsize=14, color=color_palette[4])
 
+        # prediction interval of the last year total, see scenarios.ScenarioResults.projection_frame
+        if 'donja granica' in data:
+            last = data[data['Godina'] == last_year]
+            ax.errorbar(len(data_pivot) - 1, total_height_last,
+                        yerr=[[total_height_last - last['donja granica'].sum()],
+                              [last['gornja granica'].sum() - total_height_last]],
+                        fmt='none', ecolor='black', capsize=8)
+
         ax.grid(axis='y', linestyle='--', alpha=0.7)
         ax.set_ylabel(title)
 
@@ -468,6 +653,9 @@ class Inventory:
         return fig
 
     def pie(self, data):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         sns.set_theme()
         sns.set_style()
         SMALL_SIZE = 10
@@ -527,108 +715,43 @@ class Inventory:
 
         return fig
 
-    def base_inventory(self, output_dir, heat, ele, trans, light):
-        output_dir.mkdir(exist_ok=True)
-
-        """heat data"""
-
+    def heat_inventory(self, heat):
+        heat = heat.copy()
         heat['potrošnja_energije(MWh)'] = heat['potrošnja_energije(kWh)'] / 1000
-        heat['Emisije CO2 (t)'] = heat.apply(
-            lambda row: row['potrošnja_energije(MWh)'] * self.co2_factors[row['energent']],
-            axis=1
-        )
-        # tablica_1 = heat.pivot_table(
-        #     index=['nadkategorija', 'kategorija', 'broj zgrada', 'ukupna_grijana_površina',
-        #            'specifična_potrošnja_energije(kWh/m2)'],
-        #     columns='energent',
-        #     values='potrošnja_energije(MWh)',
-        #     aggfunc='sum',
-        #     fill_value=0
-        # ).groupby('kategorija').sum()
-        # tablica_1_co2 = heat.pivot_table(
-        #     index=['nadkategorija', 'kategorija', 'broj zgrada', 'ukupna_grijana_površina',
-        #            'specifična_potrošnja_energije(kWh/m2)'],
-        #     columns='energent',
-        #     values='Emisije CO2 (t)',
-        #     aggfunc='sum',
-        #     fill_value=0
-        # ).groupby('kategorija').sum()
-
-        # stacked bar for heat by sector and fuel
+        heat['Emisije CO2 (t)'] = co2_emissions(heat, self.emission_factors)
+
+        # heat by sector and fuel
         heat_pivot = heat.pivot(index='kategorija', columns='energent', values='potrošnja_energije(MWh)').fillna(0)
         order = ['prirodni plin', 'lož ulje', 'ogrjevno drvo', 'električna energija']
         heat_pivot = heat_pivot[order]
         heat_pivot['Total'] = heat_pivot.sum(axis=1)
         heat_pivot = heat_pivot.sort_values(by='Total', ascending=True).drop(columns=['Total'])
 
-        heat_by_sector = self.stacked_bar(heat_pivot, title='Potrošnja energije (MWh)')
-        heat_by_sector.savefig(output_dir / 'potrošnja_toplinske.png', dpi=300, bbox_inches='tight')
-
-        # stacked bar for heat CO2 by sector and fuel
+        # heat CO2 by sector and fuel
         heat_co2_pivot = heat.pivot(index='kategorija', columns='energent', values='Emisije CO2 (t)').fillna(0)
         order = ['prirodni plin', 'lož ulje', 'ogrjevno drvo', 'električna energija']
         heat_co2_pivot = heat_co2_pivot[order]
         heat_co2_pivot['Total'] = heat_co2_pivot.sum(axis=1)
         heat_co2_pivot = heat_co2_pivot.sort_values(by='Total', ascending=True).drop(columns=['Total'])
 
-        heat_co2_by_sector = heat_co2_pivot.drop(columns=['ogrjevno drvo'])
-        heat_co2_by_sector = self.stacked_bar(heat_co2_by_sector, title='Emisije CO2 (t)')
-        heat_co2_by_sector.savefig(output_dir / 'emisije_co2_toplinske.png', dpi=300, bbox_inches='tight')
-
-        # heat pie by fuel
-        heat_pie_1 = heat.groupby('energent')['potrošnja_energije(MWh)'].sum()
-        heat_pie_1_fig = self.pie(heat_pie_1)
-        heat_pie_1_fig.savefig(output_dir / 'potrošnja_toplinske_energent.png', dpi=300, bbox_inches='tight')
-
-        # heat co2 pie by source
-        heat_co2_pie_1 = heat.groupby('energent')['Emisije CO2 (t)'].sum().drop('ogrjevno drvo')
-        heat_co2_pie_1_fig = self.pie(heat_co2_pie_1)
-        heat_co2_pie_1_fig.savefig(output_dir / 'emisije_co2_toplinske_energent.png', dpi=300, bbox_inches='tight')
-
-        # heat pie by consumer
-        heat_pie_2 = heat.groupby('nadkategorija')['potrošnja_energije(MWh)'].sum()
-        heat_pie_2_fig = self.pie(heat_pie_2)
-        heat_pie_2_fig.savefig(output_dir / 'potrošnja_toplinske_sektor.png', dpi=300, bbox_inches='tight')
-
-        # heat pie by
-        heat_co2_pie_2 = heat.groupby('nadkategorija')['Emisije CO2 (t)'].sum()
-        heat_co2_pie_2_fig = self.pie(heat_co2_pie_2)
-        heat_co2_pie_2_fig.savefig(output_dir / 'emisije_co2_toplinske_sektor.png', dpi=300, bbox_inches='tight')
-
-        """electricity data"""
+        return heat, {'heat': heat_pivot, 'heat_co2': heat_co2_pivot}
 
+    def electricity_inventory(self, ele):
+        ele = ele.copy()
         ele['potrošnja_energije(MWh)'] = ele['potrošnja_energije(kWh)'] / 1000
         ele['Emisije CO2 (t)'] = ele['potrošnja_energije(MWh)'] * self.co2_factors['električna energija']
 
-        tablica_2 = ele.groupby('kategorija').sum()
-
         # total electricity consumption
         ele_bar = ele.groupby('kategorija')['potrošnja_energije(MWh)'].sum()
-        ele_bar = ele_bar.sort_values(ascending=True).drop(columns=['Total'])
-        ele_bar_fig = self.stacked_bar(ele_bar, title='Potrošnja energije (MWh)')
-        ele_bar_fig.savefig(output_dir / 'potrošnja_električne.png', dpi=300, bbox_inches='tight')
+        ele_bar = ele_bar.sort_values(ascending=True)
 
         # electricity co2 emissions
         ele_co2_bar = ele.groupby('kategorija')['Emisije CO2 (t)'].sum()
         ele_co2_bar = ele_co2_bar.sort_values(ascending=True)
-        ele_co2_bar_fig = self.stacked_bar(ele_co2_bar, title='Emisije CO2 (t)')
-        ele_co2_bar_fig.savefig(output_dir / 'emisije_co2_električne.png', dpi=300, bbox_inches='tight')
 
-        # pie charts
+        return ele, {'electricity': ele_bar, 'electricity_co2': ele_co2_bar}
 
-        ele_pie_1 = ele.groupby('nadkategorija')['potrošnja_energije(MWh)'].sum()
-        if 'ostalo' in ele_pie_1.index:
-            ele_pie_1 = ele_pie_1.drop('ostalo')
-        ele_pie_1_fig = self.pie(ele_pie_1)
-        ele_pie_1_fig.savefig(output_dir / 'potrošnja_električne_sektor.png', dpi=300, bbox_inches='tight')
-
-        ele_co2_pie_1 = ele.groupby('nadkategorija')['Emisije CO2 (t)'].sum()
-        if 'ostalo' in ele_co2_pie_1.index:
-            ele_co2_pie_1 = ele_co2_pie_1.drop('ostalo')
-        ele_co2_pie_1_fig = self.pie(ele_co2_pie_1)
-        ele_co2_pie_1_fig.savefig(output_dir / 'emisije_co2_električne_sektor.png', dpi=300, bbox_inches='tight')
-
-        """transport data"""
+    def transport_inventory(self, trans):
         trans = trans.loc[trans['vrsta_prijevoza'] != 'taxi']
         trans = trans.fillna(0)
         trans['Dizel'] = trans['procijenjena_potrošena_masa_dizela(t)'] * self.constants.diesel_ton_mwh
@@ -641,26 +764,11 @@ class Inventory:
         trans_pivot['Total'] = trans_pivot.sum(axis=1)
         trans_pivot = trans_pivot.sort_values(by='Total', ascending=True).drop(columns=['Total'])
 
-        trans_pivot_fig = self.stacked_bar(trans_pivot, title='Potrošnja energije (MWh)')
-        trans_pivot_fig.savefig(output_dir / 'potrošnja_energije_transport.png', dpi=300, bbox_inches='tight')
-
-        trans_pie_1 = trans_pivot.sum(axis=1)
-        trans_pie_1['ostalo'] = trans_pie_1['mopedi i motocikli'] + trans_pie_1['autobusni']
-        trans_pie_1 = trans_pie_1.drop(['mopedi i motocikli', 'autobusni'])
-        trans_pie_1_fig = self.pie(trans_pie_1)
-        trans_pie_1_fig.savefig(output_dir / 'potrošnja_energije_transport_vrsta.png', dpi=300, bbox_inches='tight')
-
         trans_melted = trans_pivot.reset_index().melt(id_vars=['vrsta_prijevoza'],
                                                       value_vars=['Dizel', 'Benzin', 'UNP'],
                                                       var_name='energent',
                                                       value_name='potrošnja_energije(MWh)')
-
-        trans_pie_2 = trans_melted.groupby('energent')['potrošnja_energije(MWh)'].sum()
-        trans_pie_2_fig = self.pie(trans_pie_2)
-        trans_pie_2_fig.savefig(output_dir / 'potrošnja_energije_transport_gorivo.png', dpi=300, bbox_inches='tight')
-
-        trans_melted['Emisije CO2 (t)'] = trans_melted.apply(
-            lambda row: row['potrošnja_energije(MWh)'] * self.co2_factors[row['energent']], axis=1)
+        trans_melted['Emisije CO2 (t)'] = co2_emissions(trans_melted, self.emission_factors)
 
         trans_co2_melted = trans_melted.pivot(index='vrsta_prijevoza', columns='energent',
                                               values='Emisije CO2 (t)').fillna(0)
@@ -669,28 +777,13 @@ class Inventory:
         trans_co2_melted['Total'] = trans_co2_melted.sum(axis=1)
         trans_co2_melted = trans_co2_melted.sort_values(by='Total', ascending=True).drop(columns=['Total'])
 
-        trans_co2_fig = self.stacked_bar(trans_co2_melted, title='Emisije CO2 (t)')
-        trans_co2_fig.savefig(output_dir / 'transport_co2.png', dpi=300, bbox_inches='tight')
-
-        trans_co2_vrsta_vozila = trans_co2_melted.sum(axis=1)
-        trans_co2_vrsta_vozila_fig = self.pie(trans_co2_vrsta_vozila)
-        trans_co2_vrsta_vozila_fig.savefig(output_dir / 'transport_co2_vrsta.png', dpi=300, bbox_inches='tight')
-
-        trans_co2_gorivo = trans_co2_melted.sum()
-        trans_co2_gorivo_fig = self.pie(trans_co2_gorivo)
-        trans_co2_gorivo_fig.savefig(output_dir / 'transport_co2_gorivo.png', dpi=300, bbox_inches='tight')
-
-        """total emissions"""
-        ele['energent'] = 'električna energija'
-
-        trans_melted['sektor'] = 'promet'
-        ele['sektor'] = 'zgradarstvo'
-        heat['sektor'] = 'zgradarstvo'
+        return trans_melted, {'transport': trans_pivot, 'transport_co2': trans_co2_melted}
 
+    def total_inventory(self, heat, ele, trans_melted, light):
         columns = ['energent', 'potrošnja_energije(MWh)', 'Emisije CO2 (t)', 'sektor']
-        heat = heat[columns]
-        ele = ele[columns]
-        trans_melted = trans_melted[columns]
+        ele = ele.assign(energent='električna energija', sektor='zgradarstvo')[columns]
+        heat = heat.assign(sektor='zgradarstvo')[columns]
+        trans_melted = trans_melted.assign(sektor='promet')[columns]
 
         heat = heat.loc[heat['energent'] != 'električna energija']
 
@@ -698,336 +791,461 @@ class Inventory:
 
         # for 2011
         total.loc[len(total)] = light
-        ukupna_potrošnja = total.groupby(['energent', 'sektor'])['potrošnja_energije(MWh)'].sum()
-        ukupne_emisije_co2 = total.groupby(['energent', 'sektor'])['Emisije CO2 (t)'].sum()
 
         total_bar = total.groupby(['sektor', 'energent']).agg({'potrošnja_energije(MWh)': 'sum'}).reset_index()
         total_bar = total_bar.pivot(index='sektor', columns='energent', values='potrošnja_energije(MWh)').fillna(0)
         order = ['električna energija', 'Dizel', 'UNP', 'Benzin', 'lož ulje', 'ogrjevno drvo', 'prirodni plin']
         total_bar = total_bar[order]
 
-        total_fig = self.stacked_bar(total_bar, title='Potrošnja energije (MWh)')
-        total_fig.savefig(output_dir / 'ukupna_potrošnja.png', dpi=300, bbox_inches='tight')
-
-        total_pie_1 = total.groupby('sektor')['potrošnja_energije(MWh)'].sum()
-        total_pie_1_fig = self.pie(total_pie_1)
-        total_pie_1_fig.savefig(output_dir / 'ukupna_potrošnja_po_sektoru.png', dpi=300, bbox_inches='tight')
-
-        total_pie_2 = total.groupby('energent')['potrošnja_energije(MWh)'].sum()
-        total_pie_2_fig = self.pie(total_pie_2)
-        total_pie_2_fig.savefig(output_dir / 'ukupna_potrošnja_po_energentu.png', dpi=300, bbox_inches='tight')
-
         # co2 chart
         total_co2_bar = total.groupby(['sektor', 'energent']).agg({'Emisije CO2 (t)': 'sum'}).reset_index()
         total_co2_bar = total_co2_bar.pivot(index='sektor', columns='energent', values='Emisije CO2 (t)').fillna(0)
         order = ['električna energija', 'Dizel', 'UNP', 'Benzin', 'lož ulje', 'prirodni plin']
         total_co2_bar = total_co2_bar[order]
 
-        total_co2_fig = self.stacked_bar(total_co2_bar, title='Emisije CO2 (t)')
-        total_co2_fig.savefig(output_dir / 'ukupne_emisije_co2.png', dpi=300, bbox_inches='tight')
-
-        total_co2_pie_1 = total.groupby('sektor')['Emisije CO2 (t)'].sum()
-        total_co2_pie_1_fig = self.pie(total_co2_pie_1)
-        total_co2_pie_1_fig.savefig(output_dir / 'ukupne_emisije_po_sektoru.png', dpi=300, bbox_inches='tight')
-
-        total_co2_pie_2 = total.groupby('energent')['Emisije CO2 (t)'].sum()
-        total_co2_pie_2 = total_co2_pie_2.drop('ogrjevno drvo')
-        total_co2_pie_2_fig = self.pie(total_co2_pie_2)
-        total_co2_pie_2_fig.savefig(output_dir / 'ukupne_emisije_po_energentu.png', dpi=300, bbox_inches='tight')
-
-        return {
-            'heat': heat_pivot,
-            'heat_co2': heat_co2_pivot,
-            'electricity': ele_bar,
-            'electricity_co2': ele_co2_bar,
-            'transport': trans_pivot,
-            'transport_co2': trans_co2_melted,
-            'total': total_bar,
-            'total_co2': total_co2_bar,
-        }
+        return total, {'total': total_bar, 'total_co2': total_co2_bar}
+
+    def compute_inventory(self, heat, ele, trans, light):
+        """Inventory tables without any plotting.
+
+        Returns the same pivots as base_inventory together with the tidy 'tidy' total frame and the row level
+        'heat_data', 'electricity_data' and 'transport_data' frames that render_inventory needs for the pie charts.
+        """
+        heat = self.heat_inventory(heat)
+        ele = self.electricity_inventory(ele)
+        trans = self.transport_inventory(trans)
+        total = self.total_inventory(heat[0], ele[0], trans[0], light)
+        return inventory_results(heat, ele, trans, total)
+
+    def inventory_charts(self, results):
+        """List of (file name, chart method, data, options) for every base inventory chart."""
+        heat = results['heat_data']
+        ele = results['electricity_data']
+        trans_melted = results['transport_data']
+        total = results['tidy']
+
+        # transport pie by vehicle type, mopeds and buses are shown together
+        trans_pie_1 = results['transport'].sum(axis=1)
+        trans_pie_1['ostalo'] = trans_pie_1['mopedi i motocikli'] + trans_pie_1['autobusni']
+        trans_pie_1 = trans_pie_1.drop(['mopedi i motocikli', 'autobusni'])
+
+        ele_pie_1 = ele.groupby('nadkategorija')['potrošnja_energije(MWh)'].sum()
+        ele_co2_pie_1 = ele.groupby('nadkategorija')['Emisije CO2 (t)'].sum()
+        if 'ostalo' in ele_pie_1.index:
+            ele_pie_1 = ele_pie_1.drop('ostalo')
+            ele_co2_pie_1 = ele_co2_pie_1.drop('ostalo')
+
+        energy_title = {'title': 'Potrošnja energije (MWh)'}
+        co2_title = {'title': 'Emisije CO2 (t)'}
+
+        return [
+            # heat
+            ('potrošnja_toplinske.png', 'stacked_bar', results['heat'], energy_title),
+            ('emisije_co2_toplinske.png', 'stacked_bar', results['heat_co2'].drop(columns=['ogrjevno drvo']),
+             co2_title),
+            ('potrošnja_toplinske_energent.png', 'pie', heat.groupby('energent')['potrošnja_energije(MWh)'].sum(), {}),
+            ('emisije_co2_toplinske_energent.png', 'pie',
+             heat.groupby('energent')['Emisije CO2 (t)'].sum().drop('ogrjevno drvo'), {}),
+            ('potrošnja_toplinske_sektor.png', 'pie', heat.groupby('nadkategorija')['potrošnja_energije(MWh)'].sum(),
+             {}),
+            ('emisije_co2_toplinske_sektor.png', 'pie', heat.groupby('nadkategorija')['Emisije CO2 (t)'].sum(), {}),
+
+            # electricity
+            ('potrošnja_električne.png', 'stacked_bar', results['electricity'], energy_title),
+            ('emisije_co2_električne.png', 'stacked_bar', results['electricity_co2'], co2_title),
+            ('potrošnja_električne_sektor.png', 'pie', ele_pie_1, {}),
+            ('emisije_co2_električne_sektor.png', 'pie', ele_co2_pie_1, {}),
+
+            # transport
+            ('potrošnja_energije_transport.png', 'stacked_bar', results['transport'], energy_title),
+            ('potrošnja_energije_transport_vrsta.png', 'pie', trans_pie_1, {}),
+            ('potrošnja_energije_transport_gorivo.png', 'pie',
+             trans_melted.groupby('energent')['potrošnja_energije(MWh)'].sum(), {}),
+            ('transport_co2.png', 'stacked_bar', results['transport_co2'], co2_title),
+            ('transport_co2_vrsta.png', 'pie', results['transport_co2'].sum(axis=1), {}),
+            ('transport_co2_gorivo.png', 'pie', results['transport_co2'].sum(), {}),
+
+            # total
+            ('ukupna_potrošnja.png', 'stacked_bar', results['total'], energy_title),
+            ('ukupna_potrošnja_po_sektoru.png', 'pie', total.groupby('sektor')['potrošnja_energije(MWh)'].sum(), {}),
+            ('ukupna_potrošnja_po_energentu.png', 'pie', total.groupby('energent')['potrošnja_energije(MWh)'].sum(),
+             {}),
+            ('ukupne_emisije_co2.png', 'stacked_bar', results['total_co2'], co2_title),
+            ('ukupne_emisije_po_sektoru.png', 'pie', total.groupby('sektor')['Emisije CO2 (t)'].sum(), {}),
+            ('ukupne_emisije_po_energentu.png', 'pie',
+             total.groupby('energent')['Emisije CO2 (t)'].sum().drop('ogrjevno drvo'), {}),
+        ]
+
+    def chart_jobs(self, results, output_dir):
+        return [
+            ChartJob(getattr(self, chart), (data.copy(),), output_dir / file_name, options)
+            for file_name, chart, data, options in self.inventory_charts(results)
+        ]
+
+    def render_inventory(self, results, output_dir, n_jobs=1):
+        """Draws and saves every base inventory chart from the output of compute_inventory."""
+        render_jobs(self.chart_jobs(results, output_dir), n_jobs)
+
+    def base_inventory(self, output_dir, heat, ele, trans, light, n_jobs=1):
+        results = self.compute_inventory(heat, ele, trans, light)
+        self.render_inventory(results, output_dir, n_jobs)
+
+        return {key: results[key] for key in INVENTORY_KEYS}
+
+
+# stage cache of the inventory pipeline, see inventory_pipeline
+INVENTORY_YEARS = (2011, 2019)
+PIPELINE_CACHE = root_dir / 'output' / '.pipeline_cache'
+
+
+def heat_factors_stage(years, weather=None, reference_years=(1991, 2020), stations=None):
+    if weather is None:
+        return {year: 1.0 for year in years}
+
+    from weather import degree_days, load_temperatures, normalization_factors
+    return normalization_factors(degree_days(load_temperatures(weather)), years, reference_years, stations)
+
+
+def heat_stage(constants, heat, heat_factors, year, normalize):
+    if normalize:
+        from weather import normalize_heat
+        heat = normalize_heat(heat, heat_factors[year])
+    return Inventory(constants, year).heat_inventory(heat)
+
+
+def electricity_stage(constants, electricity, year):
+    return Inventory(constants, year).electricity_inventory(electricity)
+
+
+def transport_stage(constants, transport, year):
+    return Inventory(constants, year).transport_inventory(transport)
+
+
+def total_stage(constants, heat, electricity, transport, year):
+    total = Inventory(constants, year).total_inventory(heat[0], electricity[0], transport[0], lighting(constants, year))
+    return inventory_results(heat, electricity, transport, total)
+
+
+def street_lighting_stage(inventory_2011, inventory_2019):
+    """Javna rasvjeta MWh and t CO2 rows of both years, indexed by godina, the input of Inventory.rasvjeta_bar."""
+    frames = {}
+    for key in ('total', 'total_co2'):
+        for year, inventory in ((2011, inventory_2011), (2019, inventory_2019)):
+            frame = inventory[key].drop(['promet', 'zgradarstvo'])[['električna energija']]
+            frame['godina'] = year
+            frames[key, year] = frame.set_index('godina')
+    return frames
+
+
+def engine_efficiency_stage(year=2030, model='fixed'):
+    _, _, engine_efficiency_trend = engine_efficiency_fit(model)
+    return engine_efficiency_trend(year)
+
+
+def engine_efficiency_interval_stage(year=2030, model='fixed', n_resamples=5000, level=0.9):
+    """(low, high) bootstrap prediction interval of the engine efficiency of the year."""
+    interval = engine_efficiency_interval(model, year, n_resamples, level)
+    return float(interval.low[0]), float(interval.high[0])
+
+
+def projection_stage(inventory_2011, inventory_2019, transport_2019, constants, engine_efficiency, path,
+                     engine_efficiency_interval=None):
+    # electricity 2030 emission index from strategija prilagodbe, see Constants.co2_electricity_mwh_ton_2030
+    baseline = ProjectionBaseline.from_inventories(inventory_2011, inventory_2019, transport_2019, constants,
+                                                   engine_efficiency,
+                                                   engine_efficiency_interval=engine_efficiency_interval)
+    return baseline, evaluate_scenarios(baseline, load_scenarios(path))
+
+
+def store_stage(heat_factors, municipality, root, projection=None, **totals):
+    """Writes the total_<year> results and the 2030 scenarios of the run to the result store."""
+    from results_store import write_results
+
+    run_metadata = {'heat_factors': {str(year): factor for year, factor in heat_factors.items()}}
+    runs = [write_results(results, municipality, int(name.split('_')[-1]), root=root, metadata=run_metadata)
+            for name, results in totals.items()]
+    if projection is not None:
+        baseline, scenarios = projection
+        for scenario in scenarios.names:
+            runs.append(write_results({'projection': scenarios.to_frame().loc[scenario]}, municipality,
+                                      baseline.target_year, scenario, root=root, metadata=run_metadata))
+    return runs
+
+
+def inventory_pipeline(years=INVENTORY_YEARS, weather=None, reference_years=(1991, 2020), stations=None, store=None,
+                       municipality='Vinkovci', cache_dir=PIPELINE_CACHE, trend_model='fixed', n_resamples=5000,
+                       interval_level=0.9, scenarios_path=SCENARIOS_2030):
+    """Stages of the inventory years, the 2011 / 2019 comparison and the 2030 projection, see pipeline.Pipeline.
+
+    Every year has its own input and inventory stage per table, so a changed input file only reruns the stages of
+    that table and everything that depends on it. The comparison and projection stages need both 2011 and 2019.
+    Without a store the results are not written. trend_model is the engine efficiency trend, see TREND_MODELS, whose
+    bootstrap prediction interval of n_resamples at interval_level is carried into the projection; 0 resamples
+    leave the interval out. scenarios_path is the scenario definition file of the projection.
+    """
+    import emissions
+    import fleet
+    import forecast
+    import jrc_data
+    import scenarios
+    from pipeline import Pipeline, Stage
+    from weather import degree_days, normalization_factors, normalize_heat
+
+    stages = [
+        Stage('constants', Constants, files=(jrc_data.JRC_WORKBOOK,), code=(jrc_data,), cache=False),
+        Stage('heat_factors', heat_factors_stage, files=() if weather is None else (weather,),
+              params={'years': list(INVENTORY_YEARS), 'weather': weather, 'reference_years': list(reference_years),
+                      'stations': stations},
+              code=(degree_days, normalization_factors)),
+    ]
+    for year in years:
+        constants = {'constants': 'constants'}
+        stages += [
+            Stage(f'heat_input_{year}', load_heat, files=(input_file('heat', year),), params={'year': year},
+                  code=(_group_2011_kategorija,)),
+            Stage(f'electricity_input_{year}', load_electricity, files=(input_file('electricity', year),),
+                  params={'year': year}, code=(_group_2011_kategorija,)),
+            Stage(f'transport_input_{year}', load_transport, constants, files=(input_file('transport', year),),
+                  params={'year': year}, code=(correct_transport_2011, fleet)),
+            Stage(f'heat_{year}', heat_stage,
+                  {**constants, 'heat': f'heat_input_{year}', 'heat_factors': 'heat_factors'},
+                  params={'year': year, 'normalize': weather is not None},
+                  code=(Inventory.__init__, Inventory.heat_inventory, normalize_heat, emissions)),
+            Stage(f'electricity_{year}', electricity_stage, {**constants, 'electricity': f'electricity_input_{year}'},
+                  params={'year': year}, code=(Inventory.__init__, Inventory.electricity_inventory, emissions)),
+            Stage(f'transport_{year}', transport_stage, {**constants, 'transport': f'transport_input_{year}'},
+                  params={'year': year}, code=(Inventory.__init__, Inventory.transport_inventory, emissions)),
+            Stage(f'total_{year}', total_stage,
+                  {**constants, 'heat': f'heat_{year}', 'electricity': f'electricity_{year}',
+                   'transport': f'transport_{year}'},
+                  params={'year': year},
+                  code=(Inventory.__init__, Inventory.total_inventory, inventory_results, lighting)),
+        ]
+
+    if 2011 in years and 2019 in years:
+        stages += [
+            Stage('street_lighting', street_lighting_stage,
+                  {'inventory_2011': 'total_2011', 'inventory_2019': 'total_2019'}),
+            Stage('engine_efficiency', engine_efficiency_stage, params={'model': trend_model},
+                  code=(engine_efficiency_fit, SupplementaryData, forecast)),
+        ]
+        projection_inputs = {'inventory_2011': 'total_2011', 'inventory_2019': 'total_2019',
+                             'transport_2019': 'transport_input_2019', 'constants': 'constants',
+                             'engine_efficiency': 'engine_efficiency'}
+        if n_resamples:
+            stages.append(Stage('engine_efficiency_interval', engine_efficiency_interval_stage,
+                                params={'model': trend_model, 'n_resamples': n_resamples, 'level': interval_level},
+                                code=(engine_efficiency_interval, engine_efficiency_fit, SupplementaryData, forecast)))
+            projection_inputs['engine_efficiency_interval'] = 'engine_efficiency_interval'
+        stages.append(Stage('projection', projection_stage, projection_inputs,
+                            files=tuple(scenario_files(scenarios_path)), params={'path': scenarios_path},
+                            code=(scenarios,)))
+    if store is not None:
+        inputs = {f'total_{year}': f'total_{year}' for year in years}
+        if 'projection' in [stage.name for stage in stages]:
+            inputs['projection'] = 'projection'
+        stages.append(Stage('store', store_stage, {**inputs, 'heat_factors': 'heat_factors'},
+                            params={'municipality': municipality, 'root': store}, cache=False))
+    return Pipeline(stages, cache_dir)
+
+
+def run_summary(values, plan, timings, output, rendered, n_figures, seconds):
+    """JSON serializable summary of an inventory run: stages, totals per year and sector, 2030 scenarios and figures."""
+    summary = {
+        'output': str(output),
+        'seconds': round(seconds, 3),
+        'stages': {name: {'status': 'run' if reason else 'cached', 'reason': reason,
+                          'seconds': round(timings[name], 4) if name in timings else None}
+                   for name, reason in plan},
+        'totals': {},
+        'figures': {'jobs': n_figures, 'rendered': len(rendered)},
+    }
+    for name, results in values.items():
+        if name.startswith('total_'):
+            summary['totals'][name[len('total_'):]] = {
+                'potrošnja_energije(MWh)': results['total'].sum(axis=1).to_dict(),
+                'Emisije CO2 (t)': results['total_co2'].sum(axis=1).to_dict(),
+            }
+    if 'projection' in values:
+        _, scenarios_2030 = values['projection']
+        totals = scenarios_2030.to_frame().groupby(level='scenarij', sort=False).sum()
+        summary['scenarios'] = totals.to_dict(orient='index')
+    if 'engine_efficiency' in values:
+        summary['engine_efficiency_2030'] = {'value': values['engine_efficiency']}
+        if 'engine_efficiency_interval' in values:
+            summary['engine_efficiency_2030']['interval'] = list(values['engine_efficiency_interval'])
+    return summary
 
 
 if __name__ == "__main__":
-    constants = Constants()
+    import sys
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(
+        description='SECAP energy consumption and CO2 emission inventory. Figures and tables are written under '
+                    '--output, a JSON summary of the run is printed on stdout and every other message on stderr.')
+    parser.add_argument('--years', type=int, nargs='+', choices=INVENTORY_YEARS, default=list(INVENTORY_YEARS),
+                        help='Inventory years, the 2011 / 2019 comparison and the 2030 projection need both.')
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help='Run only these pipeline stages and what they depend on, e.g. total_2019, see --explain.')
+    parser.add_argument('-o', '--output', type=Path, default=root_dir / 'output',
+                        help='Directory of the figures, the stage cache and the result store.')
+    parser.add_argument('--no-plots', action='store_true', help='Do not render figures.')
+    parser.add_argument('--dpi', type=int, default=300, help='Resolution of the figures.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes used to render figures, 0 uses every core.')
+    parser.add_argument('--force', action='store_true',
+                        help='Render every figure even if the figure cache says it is up to date.')
+    parser.add_argument('--weather', type=Path, default=None,
+                        help='Daily temperature CSV, heat is normalized to the reference climate with degree days.')
+    parser.add_argument('--stations', nargs='+', default=None, help='Weather stations to average, all by default.')
+    parser.add_argument('--reference-years', type=int, nargs=2, default=[1991, 2020],
+                        help='Years whose mean degree days are the reference climate.')
+    parser.add_argument('--store', type=Path, default=None,
+                        help='Partitioned Parquet result store the tables of the run are written to, '
+                             '<output>/results by default.')
+    parser.add_argument('--municipality', default='Vinkovci', help='Municipality the results are stored under.')
+    parser.add_argument('--explain', action='store_true',
+                        help='Print which pipeline stages would run and why, without running them.')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Write wall / CPU time, peak memory and rows of every stage and figure to this JSON file '
+                             '(Chrome trace format).')
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help='Profile without tracemalloc, which slows the run down, peak RSS is still recorded.')
+    parser.add_argument('--trend-model', choices=TREND_MODELS, default='fixed',
+                        help='Engine efficiency trend of the 2030 projection: fixed is the quadratic of the published '
+                             'plan, backtest the model with the lowest rolling-origin error, see forecast.py.')
+    parser.add_argument('--scenarios', type=Path, default=SCENARIOS_2030,
+                        help='2030 scenario definitions, e.g. ../data/scenarios/2030_grid.json for the grid of '
+                             'COM_expedited variants.')
+    parser.add_argument('--resamples', type=int, default=5000,
+                        help='Bootstrap resamples of the engine efficiency prediction interval, 0 leaves it out.')
+    parser.add_argument('--interval-level', type=float, default=0.9,
+                        help='Coverage of the prediction intervals of the 2030 projection.')
+    args = parser.parse_args()
+
+    output = args.output
+    pipeline = inventory_pipeline(sorted(set(args.years)), args.weather, args.reference_years, args.stations,
+                                  args.store or output / 'results', args.municipality, output / '.pipeline_cache',
+                                  args.trend_model, args.resamples, args.interval_level, args.scenarios)
+    unknown = sorted(set(args.stages or []) - set(pipeline.stages))
+    if unknown:
+        parser.error(f"unknown stages {', '.join(unknown)}, choose from {', '.join(pipeline.stages)}")
+    targets = args.stages or list(pipeline.stages)
+    if args.explain:
+        print(pipeline.explain(targets))
+        raise SystemExit
+
+    # stdout only gets the JSON summary
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    if args.profile is not None:
+        import profiling
+        profiling.enable(trace_memory=not args.no_trace_memory)
+
+    start = time.perf_counter()
+    plan = pipeline.plan(targets)
+    values = pipeline.run(['constants'] + targets)
+    constants = values['constants']
+    if args.weather is not None and 'heat_factors' in values:
+        print('heat normalized to the {}-{} climate: '.format(*args.reference_years) +
+              ', '.join(f'{year} x {factor:.4f}' for year, factor in values['heat_factors'].items()))
+
+    # figures are collected as chart jobs and rendered together at the end
+    chart_jobs = []
+
     # 2011
-    output_dir = root_dir / 'output/2011/'
-    output_dir.mkdir(exist_ok=True, parents=True)
-
-    heat = pd.read_csv(root_dir / 'data/2011/vinkovci_grijanje_2011.csv')
-    ele = pd.read_csv(root_dir / 'data/2011/vinkovci_struja_2011.csv')
-    trans = pd.read_csv(root_dir / 'data/2011/privatna_vozila_2011.csv')
-    light = ['električna energija', 2922.5, 678.0, 'javna rasvjeta']
-
-    # fuel consumption is 2011 is too low, adjust to the same calculation as in 2019
-    km_per_vehicle = 12542  # same km per year per vehicle
-    factor = constants.specific_consumption_petrol_2000 / constants.specific_consumption_diesel_2000  # how much more petrol is spent
-    # adjust the fuel to get proportions
-    petrol_adj = trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila'][
-                     'procijenjena_potrošena_masa_benzina(t)'] / factor
-    lpg_adj = trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila']['procijenjena_potrošena_masa_unp(t)'] / factor
-    diesel_adj = trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila']['procijenjena_potrošena_masa_dizela(t)']
-    total = petrol_adj + lpg_adj + diesel_adj
-
-    prop_petrol = petrol_adj / total
-    prop_lpg = lpg_adj / total
-    prop_diesel = diesel_adj / total
-
-    # calculate tons of fuel
-    diesel_spent = prop_diesel * trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila'][
-        'broj'] * constants.diesel_km_per_year * constants.specific_consumption_diesel_2000 * constants.diesel_litre_to_ton
-    petrol_spent = prop_petrol * trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila'][
-        'broj'] * constants.petrol_km_per_year * constants.specific_consumption_petrol_2000 * constants.petrol_litre_to_ton
-    lpg_spent = prop_lpg * trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila'][
-        'broj'] * constants.unp_km_per_year * constants.specific_consumption_petrol_2000 * constants.lpg_petrol_index * constants.lpg_litre_to_ton
-
-    # fix values for cars
-    trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila', 'procijenjena_potrošena_masa_benzina(t)'] = petrol_spent
-    trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila', 'procijenjena_potrošena_masa_dizela(t)'] = diesel_spent
-    trans.loc[trans['vrsta_prijevoza'] == 'osobna vozila', 'procijenjena_potrošena_masa_unp(t)'] = lpg_spent
-
-    # fix values for trucks
-    petrol_adj = trans.loc[trans['vrsta_prijevoza'] == 'teretna i radna vozila'][
-                     'procijenjena_potrošena_masa_benzina(t)'] / factor
-    diesel_adj = trans.loc[trans['vrsta_prijevoza'] == 'teretna i radna vozila'][
-        'procijenjena_potrošena_masa_dizela(t)']
-    total = petrol_adj + diesel_adj
-
-    prop_petrol = petrol_adj / total
-    prop_diesel = diesel_adj / total
-
-    diesel_spent = prop_diesel * trans.loc[trans['vrsta_prijevoza'] == 'teretna i radna vozila'][
-        'broj'] * constants.heavy_km_per_year * constants.specific_consumption_diesel_2000 * constants.diesel_litre_to_ton
-    petrol_spent = prop_petrol * trans.loc[trans['vrsta_prijevoza'] == 'teretna i radna vozila'][
-        'broj'] * constants.heavy_km_per_year * constants.specific_consumption_petrol_2000 * constants.petrol_litre_to_ton
-
-    trans.loc[
-        trans['vrsta_prijevoza'] == 'teretna i radna vozila', 'procijenjena_potrošena_masa_benzina(t)'] = petrol_spent
-    trans.loc[
-        trans['vrsta_prijevoza'] == 'teretna i radna vozila', 'procijenjena_potrošena_masa_dizela(t)'] = diesel_spent
-
-    # fix values for bikes
-    petrol_spent = trans.loc[trans['vrsta_prijevoza'] == 'mopedi i motocikli'][
-                       'broj'] * constants.bikes_km_per_year * constants.specific_consumption_petrol_2000 * constants.petrol_litre_to_ton
-    trans.loc[
-        trans['vrsta_prijevoza'] == 'mopedi i motocikli', 'procijenjena_potrošena_masa_benzina(t)'] = petrol_spent
-
-    # group heat to fit 2019 format
-    heat['kategorija'] = heat['kategorija'].replace('objekti i uredi gradskih tvrtki', 'uprava i uredi gradskih tvrtki')
-    heat['kategorija'] = heat['kategorija'].replace('uprava', 'uprava i uredi gradskih tvrtki')
-    heat = heat.groupby(['nadkategorija', 'kategorija', 'energent'], as_index=False).sum()
-
-    # group electricity to fit 2019 format
-    ele['kategorija'] = ele['kategorija'].replace('objekti i uredi gradskih tvrtki', 'uprava i uredi gradskih tvrtki')
-    ele['kategorija'] = ele['kategorija'].replace('uprava', 'uprava i uredi gradskih tvrtki')
-    ele = ele.groupby(['nadkategorija', 'kategorija'], as_index=False).sum()
-
-    base_inventory_2011 = Inventory(constants, 2011)
-    inventory_2011 = base_inventory_2011.base_inventory(output_dir, heat, ele, trans, light)
+    if 'total_2011' in values:
+        results_2011 = values['total_2011']
+        inventory_2011 = {key: results_2011[key] for key in INVENTORY_KEYS}
+        chart_jobs += Inventory(constants, 2011).chart_jobs(results_2011, output / '2011')
 
     # 2019
-    output_dir = root_dir / 'output/2019/'
-    output_dir.mkdir(exist_ok=True, parents=True)
-
-    heat_2019 = pd.read_csv(root_dir / 'data/2019/vinkovci_grijanje_2019.csv')
-    ele_2019 = pd.read_csv(root_dir / 'data/2019/vinkovci_struja_2019.csv')
-    trans_2019 = pd.read_csv(root_dir / 'data/2019/privatna_vozila_2019.csv')
-    light_2019_mwh = 2008.656
-    light_2019_co2 = light_2019_mwh * constants.co2_electricity_mwh_ton_2019
-    light_2019 = ['električna energija', light_2019_mwh, light_2019_co2, 'javna rasvjeta']
-
     base_inventory_2019 = Inventory(constants, 2019)
-    inventory_2019 = base_inventory_2019.base_inventory(output_dir, heat_2019, ele_2019, trans_2019, light_2019)
+    if 'total_2019' in values:
+        results_2019 = values['total_2019']
+        inventory_2019 = {key: results_2019[key] for key in INVENTORY_KEYS}
+        chart_jobs += base_inventory_2019.chart_jobs(results_2019, output / '2019')
 
     # 2011 vs 2019
-    output_dir = root_dir / 'output/2011v2019/'
-    output_dir.mkdir(exist_ok=True, parents=True)
-
-    co2_keys = [key for key in inventory_2019.keys() if key.endswith('co2')]
-    mwh_keys = [key for key in inventory_2019.keys() if not key.endswith('co2')]
-    for key in co2_keys:
-        comparison_fig = base_inventory_2019.compare_stacked_bar(
-            inventory_2011[key],
-            inventory_2019[key],
-            '2011',
-            '2019',
-            'Emisije CO2 (t)',
-        )
-        comparison_fig.savefig(output_dir / '{}_comparison.png'.format(key), dpi=300, bbox_inches='tight')
-
-    for key in mwh_keys:
-        comparison_fig = base_inventory_2019.compare_stacked_bar(
-            inventory_2011[key],
-            inventory_2019[key],
-            '2011',
-            '2019',
-            'Potrošnja energije (MWh)',
-        )
-        comparison_fig.savefig(output_dir / '{}_comparison.png'.format(key), dpi=300, bbox_inches='tight')
+    output_dir = output / '2011v2019'
+    if 'total_2011' in values and 'total_2019' in values:
+        co2_keys = [key for key in inventory_2019.keys() if key.endswith('co2')]
+        mwh_keys = [key for key in inventory_2019.keys() if not key.endswith('co2')]
+        for key in co2_keys:
+            chart_jobs.append(ChartJob(
+                base_inventory_2019.compare_stacked_bar,
+                (inventory_2011[key], inventory_2019[key], '2011', '2019', 'Emisije CO2 (t)'),
+                output_dir / '{}_comparison.png'.format(key),
+            ))
+
+        for key in mwh_keys:
+            chart_jobs.append(ChartJob(
+                base_inventory_2019.compare_stacked_bar,
+                (inventory_2011[key], inventory_2019[key], '2011', '2019', 'Potrošnja energije (MWh)'),
+                output_dir / '{}_comparison.png'.format(key),
+            ))
 
     # compare javna rasvjeta across 2011 and 2019
-    rasvjeta_2011 = inventory_2011['total'].drop(['promet', 'zgradarstvo']).drop(
-        columns=['Dizel', 'UNP', 'Benzin', 'lož ulje', 'ogrjevno drvo', 'prirodni plin'])
-    rasvjeta_2019 = inventory_2019['total'].drop(['promet', 'zgradarstvo']).drop(
-        columns=['Dizel', 'UNP', 'Benzin', 'lož ulje', 'ogrjevno drvo', 'prirodni plin'])
-
-    rasvjeta_2019['godina'] = 2019
-    rasvjeta_2011['godina'] = 2011
-
-    rasvjeta_2019 = rasvjeta_2019.set_index('godina')
-    rasvjeta_2011 = rasvjeta_2011.set_index('godina')
-
-    comparison_fig_rasvjeta = base_inventory_2019.rasvjeta_bar(
-        rasvjeta_2011,
-        rasvjeta_2019,
-        2011,
-        2019,
-        title='Potrošnja energije (MWh)',
-    )
-    comparison_fig_rasvjeta.savefig(output_dir / 'rasvjeta_comparison.png', dpi=300, bbox_inches='tight')
-
-    # javna rasvjeta co2 emissions
-    rasvjeta_2011_co2 = inventory_2011['total_co2'].drop(['promet', 'zgradarstvo']).drop(
-        columns=['Dizel', 'UNP', 'Benzin', 'lož ulje', 'prirodni plin'])
-    rasvjeta_2019_co2 = inventory_2019['total_co2'].drop(['promet', 'zgradarstvo']).drop(
-        columns=['Dizel', 'UNP', 'Benzin', 'lož ulje', 'prirodni plin'])
-
-    rasvjeta_2019_co2['godina'] = 2019
-    rasvjeta_2011_co2['godina'] = 2011
-
-    rasvjeta_2019_co2 = rasvjeta_2019_co2.set_index('godina')
-    rasvjeta_2011_co2 = rasvjeta_2011_co2.set_index('godina')
-
-    comparison_fig_rasvjeta_co2 = base_inventory_2019.rasvjeta_bar(
-        rasvjeta_2011_co2,
-        rasvjeta_2019_co2,
-        2011,
-        2019,
-        title='Emisije CO2 (t)',
-    )
-    comparison_fig_rasvjeta_co2.savefig(output_dir / 'rasvjeta_co2_comparison.png', dpi=300, bbox_inches='tight')
-
-    """ create supplementary output dir """
-    supplementary_output = root_dir / 'output/supplementary_plots/'
-    supplementary_output.mkdir(exist_ok=True, parents=True)
-
-    """ mitigation measures effect business as usual"""
-    # electricity 2030 emission index
-    # from strategija prilagodbe
-    ele_2030_index = constants.co2_electricity_mwh_ton_2030
-    #ele_2030_index, ele_figure = electricity_emission_factor_2030()
-    #ele_figure.savefig(supplementary_output / 'electricity_2030_emission_factor.png', dpi=300, bbox_inches='tight')
+    if 'street_lighting' in values:
+        rasvjeta = values['street_lighting']
+        chart_jobs.append(ChartJob(
+            base_inventory_2019.rasvjeta_bar,
+            (rasvjeta['total', 2011], rasvjeta['total', 2019], 2011, 2019),
+            output_dir / 'rasvjeta_comparison.png',
+            {'title': 'Potrošnja energije (MWh)'},
+        ))
+        chart_jobs.append(ChartJob(
+            base_inventory_2019.rasvjeta_bar,
+            (rasvjeta['total_co2', 2011], rasvjeta['total_co2', 2019], 2011, 2019),
+            output_dir / 'rasvjeta_co2_comparison.png',
+            {'title': 'Emisije CO2 (t)'},
+        ))
+
+    """ mitigation measures effect, 2030 scenarios from data/scenarios/2030.json """
+    supplementary_output = output / 'supplementary_plots'
 
     # calculate increase in energy efficiency
-    engine_efficiency_2030, engine_figure = engine_efficiency_projection()
-    engine_figure.savefig(supplementary_output / 'engine_efficiency_2030.png', dpi=300, bbox_inches='tight')
-
-    # business as usual scenario
-    change_per_year = percent_difference(
-        inventory_2011['total'].sum(axis=1),
-        inventory_2019['total'].sum(axis=1)
-    ) / 8
-
-    change_until_2030 = change_per_year * 11 / 100
-    change_inventory_2030 = inventory_2019['total'].sum(axis=1) * change_until_2030
-    inventory_2030 = inventory_2019['total'].sum(axis=1) + change_inventory_2030
-
-    # use 0.025 share of electric cars from Offical strategy (NN 25/2020)
-    n_electric_cars_2030 = int(trans_2019.sum()['broj'] - (trans_2019.sum()['broj'] * 0.025))
-
-    # approximate as energy consumption per car
-    energy_per_car = inventory_2019['total'].sum(axis=1)['promet'] / trans_2019.sum()['broj']
-    energy_trans_2030 = energy_per_car * n_electric_cars_2030
-    # add savings from increased engine efficiency
-    engine_efficiency_factor = engine_efficiency_2030 / constants.specific_consumption_total_2005
-    energy_trans_2030 = energy_trans_2030 * engine_efficiency_factor
-    inventory_2030['promet'] = energy_trans_2030
-
-
-    # co2 change to 2030
-    electricity_co2_2019 = inventory_2019['total_co2']['električna energija'].sum()
-    dif_ele_emission_factor = ele_2030_index / constants.co2_electricity_mwh_ton_2019
-    electricity_co2_2030_saved_light = (1 - dif_ele_emission_factor) * \
-                                       inventory_2019['total_co2'].loc['javna rasvjeta']['električna energija']
-    electricity_co2_2030_saved_buildings = (1 - dif_ele_emission_factor) * \
-                                           inventory_2019['total_co2'].loc['zgradarstvo']['električna energija']
-
-    inventory_2030_co2 = inventory_2019['total_co2'].copy()
-    inventory_2030_co2.loc['javna rasvjeta']['električna energija'] = inventory_2030_co2.loc['javna rasvjeta'][
-                                                                          'električna energija'] - electricity_co2_2030_saved_light
-    inventory_2030_co2.loc['zgradarstvo']['električna energija'] = inventory_2030_co2.loc['zgradarstvo'][
-                                                                       'električna energija'] - electricity_co2_2030_saved_buildings
-    co2_2030_sector_scaling = inventory_2030_co2.sum(axis=1) / inventory_2019['total'].sum(axis=1)
-    inventory_2030_co2 = inventory_2030 * co2_2030_sector_scaling
-
-    # format data for projection chart
-    inventory_2030 = inventory_2030.reset_index()
-    inventory_2019_total = inventory_2019['total'].sum(axis=1).reset_index()
-    inventory_2019_total['Godina'] = 2019
-    inventory_2030['Godina'] = 2030
-    projection_total = pd.concat([inventory_2019_total, inventory_2030])
-    energy_projection_2030 = base_inventory_2019.projection_bar(projection_total, 'Potrošnja energije (MWh)')
-    energy_projection_2030.savefig(
-        supplementary_output / 'energy_2030_projection_as_usual.png', dpi=300, bbox_inches='tight'
-    )
-
-    inventory_2030_co2 = inventory_2030_co2.reset_index()
-    inventory_2019_total_co2 = inventory_2019['total_co2'].sum(axis=1).reset_index()
-    inventory_2019_total_co2['Godina'] = 2019
-    inventory_2030_co2['Godina'] = 2030
-    projection_total = pd.concat([inventory_2019_total_co2, inventory_2030_co2])
-    co2_projection_2030 = base_inventory_2019.projection_bar(projection_total, 'Emisije CO2 (t)')
-    co2_projection_2030.savefig(
-        supplementary_output / 'co2_2030_projection_as_usual.png', dpi=300, bbox_inches='tight'
-    )
-
-    """scenario 2 COM"""
-    # co2 scenario COM - share of electric cars S1 - "Scenarij ubrzane energetske tranzicije"
-    # savings of 10% total energy and CO2 for eco-driving
-    # savings of 10% total energy and CO2 for bikes
-    # savings of 5% total energy for electromobility
-    # 15% of electric cars
-    eco_driving = inventory_2019['total'].sum(axis=1)['promet'] * 0.1
-    bike_mobility = inventory_2019['total'].sum(axis=1)['promet'] * 0.1
-    electromobility = inventory_2019['total'].sum(axis=1)['promet'] * 0.075
-    city_vehicles_savings = 23.47
-
-    energy_per_car_s2 = inventory_2019['total'].sum(axis=1)['promet'] / trans_2019.sum()['broj']
-
-    eco_driving_co2 = eco_driving * co2_2030_sector_scaling['promet']
-    bike_mobility_co2 = bike_mobility * co2_2030_sector_scaling['promet']
-    electromobility_co2 = electromobility * co2_2030_sector_scaling['promet']
-    cars_2030_s2_co2 = (trans_2019.sum()['broj'] * 0.15) * energy_per_car_s2 * co2_2030_sector_scaling['promet']
-
-    n_electric_cars_2030_s2 = int(trans_2019.sum()['broj'] - (trans_2019.sum()['broj'] * 0.15))
-    energy_trans_2030_s2 = (
-                                       energy_per_car_s2 * n_electric_cars_2030_s2 * engine_efficiency_factor) - electromobility - city_vehicles_savings - eco_driving - bike_mobility
-    inventory_2030_s2 = inventory_2030.copy()
-    promet_loc = inventory_2030_s2['sektor'] == 'promet'
-    inventory_2030_s2.loc[promet_loc, 0] = energy_trans_2030_s2
-
-    zgradarstvo_loc = inventory_2030_s2['sektor'] == 'zgradarstvo'
-    inventory_2030_s2.loc[zgradarstvo_loc, 0] = inventory_2030_s2.loc[zgradarstvo_loc][0] - 107595.73
-
-    rasvjeta_loc = inventory_2030_s2['sektor'] == 'javna rasvjeta'
-    inventory_2030_s2.loc[rasvjeta_loc, 0] = inventory_2030_s2.loc[rasvjeta_loc][0] - 365.568
-
-    projection_total = pd.concat([inventory_2019_total, inventory_2030_s2])
-    com_projection_bar = base_inventory_2019.projection_bar(projection_total, 'Potrošnja energije (MWh)')
-    com_projection_bar.savefig(
-        supplementary_output / 'energy_2030_projection_COM_expedited.png', dpi=300, bbox_inches='tight'
-    )
-
-    inventory_2030_co2_s2 = inventory_2030_co2.copy() # start from 2030 first scenario and add additional measures
-    inventory_2030_co2_s2.loc[inventory_2030_co2_s2['sektor'] == 'promet', 0] = \
-    inventory_2030_co2_s2.loc[inventory_2030_co2_s2['sektor'] == 'promet'][0] - 18865.09
-    inventory_2030_co2_s2.loc[inventory_2030_co2_s2['sektor'] == 'zgradarstvo', 0][0] = \
-    inventory_2030_co2_s2.loc[inventory_2030_co2_s2['sektor'] == 'zgradarstvo'][0] - 22293, 78
-    inventory_2030_co2_s2 = pd.Series(inventory_2030_s2[0].values,
-                                      inventory_2030_s2['sektor']) * co2_2030_sector_scaling.values
-    inventory_2030_co2_s2 = inventory_2030_co2_s2.reset_index()
-    inventory_2030_co2_s2['Godina'] = 2030
-    projection_total = pd.concat([inventory_2019_total_co2, inventory_2030_co2_s2])
-    emission_com_bar = base_inventory_2019.projection_bar(projection_total, 'Emisije CO2 (t)')
-    emission_com_bar.savefig(
-        supplementary_output / 'emission_2030_projection_COM_expedited.png', dpi=300, bbox_inches='tight'
-    )
+    if 'engine_efficiency' in values:
+        engine_efficiency_2030 = values['engine_efficiency']
+        # the interval of the projection, none without resamples
+        chart_jobs.append(ChartJob(engine_efficiency_figure,
+                                   (*engine_efficiency_fit(args.trend_model), values.get('engine_efficiency_interval')),
+                                   supplementary_output / 'engine_efficiency_2030.png',
+                                   code=(SupplementaryData, select_models)))
+
+    if 'projection' in values:
+        projection_baseline, scenarios_2030 = values['projection']
+        for scenario, energy_name, co2_name in [
+            ('as_usual', 'energy_2030_projection_as_usual.png', 'co2_2030_projection_as_usual.png'),
+            ('COM_expedited', 'energy_2030_projection_COM_expedited.png',
+             'emission_2030_projection_COM_expedited.png'),
+        ]:
+            chart_jobs.append(ChartJob(
+                base_inventory_2019.projection_bar,
+                (scenarios_2030.projection_frame(scenario, 'energy'), 'Potrošnja energije (MWh)'),
+                supplementary_output / energy_name,
+            ))
+            chart_jobs.append(ChartJob(
+                base_inventory_2019.projection_bar,
+                (scenarios_2030.projection_frame(scenario, 'co2'), 'Emisije CO2 (t)'),
+                supplementary_output / co2_name,
+            ))
+
+    rendered = []
+    if not args.no_plots:
+        for job in chart_jobs:
+            job.dpi = args.dpi
+        rendered = render_jobs(chart_jobs, args.jobs, force=args.force)
+
+    if args.profile is not None:
+        profiler = profiling.disable()
+        profiler.write(args.profile)
+        print(profiler.summary())
+
+    sys.stdout = stdout
+    summary = run_summary(values, plan, pipeline.timings, output, rendered, 0 if args.no_plots else len(chart_jobs),
+                          time.perf_counter() - start)
+    if args.profile is not None:
+        summary['profile'] = str(args.profile)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
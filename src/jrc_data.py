@@ -0,0 +1,220 @@
+import os
+import argparse
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from profiling import profiled
+
+root_dir = Path(__file__).parents[1]
+
+JRC_WORKBOOK = root_dir / "data" / "public_data" / "JRC-COM-NEEFE_1990-2020.xlsx"
+# parsed sheets are stored here as npz files named after the workbook, sheet and workbook hash
+CACHE_DIR = root_dir / "data" / "cache"
+
+# workbooks already loaded by this process, keyed by path, sheet, size and mtime
+_loaded = {}
+
+
+@dataclass(frozen=True, eq=False)
+class EmissionFactorTable:
+    """Emission factors (t CO2 / MWh) of one JRC sheet as a countries × years matrix."""
+    countries: np.ndarray
+    years: np.ndarray
+    values: np.ndarray
+
+    def country_index(self, country: str) -> int:
+        matches = np.flatnonzero(self.countries == country)
+        if len(matches) == 0:
+            raise KeyError(f"Country '{country}' is not in the emission factor table")
+        return int(matches[0])
+
+    def year_index(self, year: int) -> int:
+        matches = np.flatnonzero(self.years == year)
+        if len(matches) == 0:
+            raise KeyError(f"Year {year} is not in the emission factor table")
+        return int(matches[0])
+
+    def factor(self, country: str, year: int) -> float:
+        return float(self.values[self.country_index(country), self.year_index(year)])
+
+    def series(self, country: str) -> np.ndarray:
+        return self.values[self.country_index(country)]
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.values, index=pd.Index(self.countries, name='country'), columns=self.years)
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+@profiled(category='input')
+def _parse_sheet(path, sheet_name):
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=sheet_name, skiprows=1, engine='openpyxl')
+    countries = df['Unnamed: 0'].to_numpy(dtype=str)
+    years = df.columns[1:].astype(int).to_numpy()
+    # missing years are marked with '-' in the workbook
+    values = df.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return EmissionFactorTable(countries, years, values)
+
+
+@profiled(category='input')
+def load_emission_factors(path=JRC_WORKBOOK, sheet_name=1, cache_dir=CACHE_DIR):
+    """Emission factor sheet of the JRC workbook, parsed once and cached in a compact npz keyed by the file hash."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), sheet_name, stat.st_size, stat.st_mtime_ns)
+    if memo_key in _loaded:
+        return _loaded[memo_key]
+
+    cache_dir = Path(cache_dir)
+    cache_path = cache_dir / f"{path.stem}-sheet{sheet_name}-{file_hash(path)[:16]}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            table = EmissionFactorTable(cached['countries'], cached['years'], cached['values'])
+    else:
+        table = _parse_sheet(path, sheet_name)
+        cache_dir.mkdir(exist_ok=True, parents=True)
+        # drop caches of older versions of the workbook before writing the new one
+        for stale in cache_dir.glob(f"{path.stem}-sheet{sheet_name}-*.npz"):
+            stale.unlink()
+        tmp_path = cache_path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, countries=table.countries, years=table.years, values=table.values)
+        os.replace(tmp_path, cache_path)
+
+    _loaded[memo_key] = table
+    return table
+
+
+@dataclass(frozen=True, eq=False)
+class TrendFits:
+    """Polynomial trends of every country of an emission factor table, fitted over the years of the table.
+
+    coefficients are (countries, degree + 1) in the window [-1, 1] the domain of years is mapped to, like
+    numpy.polynomial.Polynomial.fit; countries with too few values have NaN coefficients.
+    """
+    countries: np.ndarray
+    coefficients: np.ndarray
+    domain: np.ndarray
+    r2: np.ndarray
+    n_points: np.ndarray
+
+    def country_index(self, country: str) -> int:
+        matches = np.flatnonzero(self.countries == country)
+        if len(matches) == 0:
+            raise KeyError(f"Country '{country}' is not in the trend fits")
+        return int(matches[0])
+
+    def _window(self, years):
+        start, end = self.domain
+        return (2 * np.asarray(years, dtype=float) - (start + end)) / (end - start)
+
+    def predict_all(self, years) -> np.ndarray:
+        """(countries, years) trend values."""
+        return self.coefficients @ np.polynomial.polynomial.polyvander(self._window(years), self.degree).T
+
+    def predict(self, country: str, years) -> np.ndarray:
+        return np.polynomial.polynomial.polyval(self._window(years), self.coefficients[self.country_index(country)])
+
+    def polynomial(self, country: str):
+        return np.polynomial.Polynomial(self.coefficients[self.country_index(country)], domain=self.domain)
+
+    @property
+    def degree(self) -> int:
+        return self.coefficients.shape[1] - 1
+
+    def to_frame(self, years=(2030, 2040, 2050)):
+        """Predictions of the given years and R² of every country."""
+        import pandas as pd
+
+        frame = pd.DataFrame(self.predict_all(years), index=pd.Index(self.countries, name='country'),
+                             columns=list(years))
+        frame['R2'] = self.r2
+        return frame
+
+
+def fit_trends(table, degree=3):
+    """Least-squares polynomial trend of every country, solved for all of them against one Vandermonde matrix.
+
+    Countries with missing years are solved together with the others that miss the same years.
+    """
+    years = table.years.astype(float)
+    domain = np.array([years.min(), years.max()])
+    vander = np.polynomial.polynomial.polyvander((2 * years - domain.sum()) / (domain[1] - domain[0]), degree)
+    values = table.values.astype(float)
+    observed = ~np.isnan(values)
+
+    coefficients = np.full((len(values), degree + 1), np.nan)
+    patterns, rows = np.unique(observed, axis=0, return_inverse=True)
+    for p, pattern in enumerate(patterns):
+        if pattern.sum() <= degree:
+            continue
+        countries = np.flatnonzero(rows.ravel() == p)
+        solution = np.linalg.lstsq(vander[pattern], values[np.ix_(countries, pattern)].T, rcond=None)[0]
+        coefficients[countries] = solution.T
+
+    fitted = coefficients @ vander.T
+    mean = np.nanmean(np.where(observed, values, np.nan), axis=1, keepdims=True)
+    ss_res = np.nansum(np.where(observed, (values - fitted) ** 2, np.nan), axis=1)
+    ss_tot = np.nansum(np.where(observed, (values - mean) ** 2, np.nan), axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+    r2[np.isnan(coefficients[:, 0])] = np.nan
+    return TrendFits(table.countries, coefficients, domain, r2, observed.sum(axis=1))
+
+
+def load_trend_fits(path=JRC_WORKBOOK, sheet_name=1, degree=3, cache_dir=CACHE_DIR):
+    """Trend fits of a JRC sheet, cached next to the parsed sheet and keyed by the same workbook hash."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), sheet_name, stat.st_size, stat.st_mtime_ns, 'trend', degree)
+    if memo_key in _loaded:
+        return _loaded[memo_key]
+
+    cache_dir = Path(cache_dir)
+    cache_path = cache_dir / f"{path.stem}-sheet{sheet_name}-{file_hash(path)[:16]}-trend{degree}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            fits = TrendFits(cached['countries'], cached['coefficients'], cached['domain'], cached['r2'],
+                             cached['n_points'])
+    else:
+        fits = fit_trends(load_emission_factors(path, sheet_name, cache_dir), degree)
+        cache_dir.mkdir(exist_ok=True, parents=True)
+        for stale in cache_dir.glob(f"{path.stem}-sheet{sheet_name}-*-trend{degree}.npz"):
+            stale.unlink()
+        tmp_path = cache_path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, countries=fits.countries, coefficients=fits.coefficients, domain=fits.domain,
+                            r2=fits.r2, n_points=fits.n_points)
+        os.replace(tmp_path, cache_path)
+
+    _loaded[memo_key] = fits
+    return fits
+
+
+def predict(country, years, degree=3):
+    """Electricity emission factor trend (t CO2 / MWh) of a country of the JRC workbook for the given years."""
+    return load_trend_fits(degree=degree).predict(country, years)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Polynomial trends of the JRC electricity emission factors.')
+    parser.add_argument('--countries', nargs='+', default=None, help='Countries to print, all by default.')
+    parser.add_argument('--years', type=int, nargs='+', default=[2030, 2040, 2050])
+    parser.add_argument('--degree', type=int, default=3)
+    args = parser.parse_args()
+
+    frame = load_trend_fits(degree=args.degree).to_frame(args.years)
+    if args.countries is not None:
+        frame = frame.loc[args.countries]
+    print(frame.to_string(float_format='{:.4f}'.format))
@@ -0,0 +1,156 @@
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+
+HOURS_PER_YEAR = 366 * 24
+
+
+@dataclass
+class MeterSchema:
+    """Column names of the interval readings and of the metering point lookup table."""
+    point_column: str = 'mjerno_mjesto'
+    time_column: str = 'vrijeme'
+    energy_column: str = 'kwh'
+    sep: str = ','
+
+
+def load_lookup(path, schema=None):
+    """Metering point -> nadkategorija / kategorija table, one row per metering point."""
+    schema = schema or MeterSchema()
+    lookup = pd.read_csv(path, sep=schema.sep)
+    duplicated = lookup[schema.point_column].duplicated()
+    if duplicated.any():
+        raise ValueError(f'Metering points listed more than once: {list(lookup.loc[duplicated, schema.point_column])}')
+    return lookup
+
+
+@dataclass
+class MeterTotals:
+    """Consumption accumulated over the chunks of an interval file, memory does not grow with the file.
+
+    Arrays are indexed by the categories (and metering points) of the lookup table, the hourly profile is an
+    (categories, hours of the year) array that is only kept when asked for.
+    """
+    categories: pd.DataFrame
+    point_category: np.ndarray
+    energy: np.ndarray
+    points_reporting: np.ndarray
+    profile: np.ndarray = None
+    year: int = None
+    rows_read: int = 0
+    rows_unmapped: int = 0
+    energy_unmapped: float = 0.0
+    rows_outside_year: int = 0
+
+    @classmethod
+    def from_lookup(cls, lookup, schema, year=None, profile=False):
+        categories = lookup[['nadkategorija', 'kategorija']].drop_duplicates().reset_index(drop=True)
+        point_category = lookup.merge(categories.reset_index(), on=['nadkategorija', 'kategorija'], how='left')
+        point_category = point_category['index']
+        return cls(
+            categories=categories,
+            point_category=point_category.to_numpy(),
+            energy=np.zeros(len(categories)),
+            points_reporting=np.zeros(len(lookup), dtype=bool),
+            profile=np.zeros((len(categories), HOURS_PER_YEAR)) if profile else None,
+            year=year,
+        )
+
+    def add(self, chunk, points, schema):
+        self.rows_read += len(chunk)
+        energy = chunk[schema.energy_column].to_numpy(dtype=float)
+        point = points.get_indexer(chunk[schema.point_column])
+
+        if self.year is not None or self.profile is not None:
+            times = pd.to_datetime(chunk[schema.time_column])
+            year = self.year if self.year is not None else times.iloc[0].year
+            self.year = year
+            hour = ((times - pd.Timestamp(year, 1, 1)) // pd.Timedelta(hours=1)).to_numpy()
+            in_year = (times.dt.year == year).to_numpy()
+            self.rows_outside_year += int((~in_year).sum())
+            point = np.where(in_year, point, -2)
+        else:
+            hour = None
+
+        mapped = point >= 0
+        self.rows_unmapped += int((point == -1).sum())
+        self.energy_unmapped += float(energy[point == -1].sum())
+        category = self.point_category[point[mapped]]
+        self.energy += np.bincount(category, weights=energy[mapped], minlength=len(self.energy))
+        self.points_reporting[point[mapped]] = True
+        if self.profile is not None:
+            cells = category * HOURS_PER_YEAR + hour[mapped]
+            self.profile += np.bincount(cells, weights=energy[mapped], minlength=self.profile.size).reshape(
+                self.profile.shape)
+
+    def to_frame(self, source='brojila'):
+        """Annual table in the vinkovci_struja format, broj zgrada counts the metering points with readings."""
+        frame = self.categories.copy()
+        frame['broj zgrada'] = np.bincount(self.point_category[self.points_reporting], minlength=len(frame))
+        frame['energent'] = 'električna energija'
+        frame['potrošnja_energije(kWh)'] = self.energy
+        frame['izvor'] = source
+        return frame
+
+    def profile_frame(self):
+        """Hourly kWh per kategorija of the year."""
+        hours = pd.date_range(pd.Timestamp(self.year, 1, 1), pd.Timestamp(self.year + 1, 1, 1), freq='h',
+                              inclusive='left')
+        return pd.DataFrame(self.profile[:, :len(hours)].T, index=pd.Index(hours, name='sat'),
+                            columns=self.categories['kategorija'])
+
+
+def aggregate_meters(path, lookup, schema=None, year=None, profile=False, chunksize=1_000_000):
+    """Streams interval readings in chunks and sums them per category of the metering point lookup.
+
+    With a year, readings of other years are skipped; with profile, hourly kWh per category are kept as well.
+    """
+    schema = schema or MeterSchema()
+    totals = MeterTotals.from_lookup(lookup, schema, year, profile)
+    points = pd.Index(lookup[schema.point_column])
+    columns = [schema.point_column, schema.energy_column]
+    if year is not None or profile:
+        columns.append(schema.time_column)
+    reader = pd.read_csv(path, sep=schema.sep, usecols=columns, chunksize=chunksize,
+                         dtype={schema.point_column: points.dtype, schema.energy_column: float})
+    for chunk in reader:
+        totals.add(chunk, points, schema)
+    return totals
+
+
+def main(path, lookup_path, schema, year, profile_path, chunksize, output):
+    lookup = load_lookup(lookup_path, schema)
+    totals = aggregate_meters(path, lookup, schema, year, profile_path is not None, chunksize)
+    print(f'{totals.rows_read} readings, {totals.rows_unmapped} of unknown metering points '
+          f'({totals.energy_unmapped:.1f} kWh), {totals.rows_outside_year} outside {totals.year}')
+
+    table = totals.to_frame()
+    if output is not None:
+        Path(output).parent.mkdir(exist_ok=True, parents=True)
+        table.to_csv(output, index=False)
+    if profile_path is not None:
+        Path(profile_path).parent.mkdir(exist_ok=True, parents=True)
+        totals.profile_frame().to_csv(profile_path, float_format='%.3f')
+    print(table.to_string(index=False, float_format='{:.1f}'.format))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aggregate smart meter interval readings to a vinkovci_struja table.')
+    parser.add_argument('readings', type=Path, help='CSV of readings, one row per metering point and interval.')
+    parser.add_argument('lookup', type=Path, help='CSV mapping metering points to nadkategorija and kategorija.')
+    parser.add_argument('--year', type=int, default=None, help='Keep only the readings of this year.')
+    parser.add_argument('--profile', type=Path, default=None, help='CSV file for the hourly profile per kategorija.')
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help='Rows read at a time.')
+    parser.add_argument('--point-column', default='mjerno_mjesto')
+    parser.add_argument('--time-column', default='vrijeme')
+    parser.add_argument('--energy-column', default='kwh')
+    parser.add_argument('--sep', default=',')
+    parser.add_argument('-o', '--output', type=Path, default=None, help='CSV file for the annual table.')
+    args = parser.parse_args()
+    main(args.readings, args.lookup, MeterSchema(args.point_column, args.time_column, args.energy_column, args.sep),
+         args.year, args.profile, args.chunksize, args.output)
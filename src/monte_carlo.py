@@ -0,0 +1,328 @@
+import json
+import time
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Constants import Constants, ELECTRICITY_FACTOR_PREFIX
+from fleet import FLEET_2011, MASS_COLUMNS, TON_MWH
+from inventory import load_inputs
+
+root_dir = Path(__file__).parents[1]
+
+DISTRIBUTIONS = root_dir / 'data' / 'monte_carlo' / 'distributions.json'
+
+# constants holding the emission factor (t CO2 / MWh) of every energent, electricity is looked up per year
+FACTOR_PARAMETERS = {
+    'Dizel': 'co2_diesel_mwh_ton',
+    'Benzin': 'co2_petrol_mwh_ton',
+    'UNP': 'co2_lpg_mwh_ton',
+    'prirodni plin': 'co2_natgas_mwh_ton',
+    'ogrjevno drvo': 'co2_wood_mwh_ton',
+    'lož ulje': 'co2_heatoil_mwh_ton',
+}
+
+# fuel mass column and calorific value constant of every transport fuel
+TRANSPORT_FUELS = {fuel: (MASS_COLUMNS[fuel], TON_MWH[fuel]) for fuel in ('Dizel', 'Benzin', 'UNP')}
+
+# heat rows estimated from the heating structure scale with the fuel share of their building category
+ESTIMATED_HEAT = 'procjena iz strukture grijanja'
+HEAT_SHARE_PREFIX = {
+    'stambeni objekti': 'hh_heat',
+    'zgrade komercijalnog i uslužnog karaktera': 'commercial_heat',
+}
+HEAT_SHARE_FUEL = {
+    'prirodni plin': 'natgas',
+    'lož ulje': 'heatoil',
+    'ogrjevno drvo': 'wood',
+    'električna energija': 'electricity',
+}
+
+# constants the recalculated 2011 fuel masses are proportional to, see inventory.correct_transport_2011
+TRANSPORT_PARAMETERS = {2011: FLEET_2011}
+
+
+def factor_parameter(energent, year):
+    if energent == 'električna energija':
+        return f'{ELECTRICITY_FACTOR_PREFIX}{year}'
+    return FACTOR_PARAMETERS[energent]
+
+
+@dataclass
+class Distribution:
+    """Distribution of one constant, kind is a numpy Generator method (normal, uniform, triangular, lognormal, ...).
+
+    With relative set the distribution is of multiples of the nominal value of the constant, its draws are scaled by
+    the nominal value, e.g. a relative normal distribution with loc 1 and scale 0.1 has a standard deviation of 10 %
+    of the nominal value and a relative lognormal with mean 0 and sigma 0.1 a median of the nominal value.
+    """
+    kind: str
+    params: dict
+    relative: bool = False
+
+    def sample(self, rng, size, nominal):
+        draws = getattr(rng, self.kind)(size=size, **self.params)
+        return draws * nominal if self.relative else draws
+
+
+def load_distributions(path=DISTRIBUTIONS):
+    """Distributions from a JSON file, {constant: {"kind": ..., "relative": ..., <generator arguments>}}."""
+    with open(path) as f:
+        definitions = json.load(f)
+
+    distributions = {}
+    for name, definition in definitions.items():
+        definition = dict(definition)
+        kind = definition.pop('kind')
+        relative = definition.pop('relative', False)
+        distributions[name] = Distribution(kind, definition, relative)
+    return distributions
+
+
+def sample_parameters(distributions, n_samples, constants, seed=None):
+    """N samples of every constant with a distribution, {constant: array of shape (N,)}."""
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, distribution in distributions.items():
+        try:
+            nominal = getattr(constants, name)
+        except AttributeError as e:
+            raise KeyError(f"Distribution given for unknown constant '{name}'") from e
+        samples[name] = np.asarray(distribution.sample(rng, n_samples, nominal), dtype=float)
+    return samples
+
+
+@dataclass
+class InventoryModel:
+    """Inventory of one year as a sum of terms that NumPy can evaluate for many parameter samples at once.
+
+    The energy of a term is base * prod((value / nominal) ** exponent) over the constants it depends on and its
+    CO2 is that energy times the sampled emission factor of its fuel and the term's intensity (1 unless the inventory
+    gives the emissions directly, like 2011 public lighting). Fleet shares of the recalculated 2011 vehicles are
+    kept at their nominal value.
+    """
+    year: int
+    sectors: list
+    fuels: list
+    parameters: list
+    nominal: np.ndarray
+    cell: np.ndarray
+    base: np.ndarray
+    exponents: np.ndarray
+    # index of the emission factor parameter of every fuel
+    factor: np.ndarray
+    intensity: np.ndarray
+
+    @classmethod
+    def from_inputs(cls, constants, year, heat, ele, trans, light, level='sektor', transport_parameters=None):
+        """Model of the inventory Inventory.compute_inventory builds from the same inputs.
+
+        level 'sektor' gives the sectors of the total inventory, 'kategorija' splits buildings by category and
+        transport by vehicle type.
+        """
+        if transport_parameters is None:
+            transport_parameters = TRANSPORT_PARAMETERS.get(year, {})
+        detailed = level == 'kategorija'
+        terms = []
+
+        # electricity used for heating is part of the electricity inventory
+        heat = heat.loc[heat['energent'] != 'električna energija']
+        estimated = heat['izvor'] == ESTIMATED_HEAT if 'izvor' in heat else pd.Series(False, index=heat.index)
+        for (_, row), is_estimated in zip(heat.iterrows(), estimated):
+            parameters = {}
+            if is_estimated:
+                share = f"{HEAT_SHARE_PREFIX[row['nadkategorija']]}_{HEAT_SHARE_FUEL[row['energent']]}_share"
+                parameters[share] = 1
+            sector = row['kategorija'] if detailed else 'zgradarstvo'
+            terms.append((sector, row['energent'], row['potrošnja_energije(kWh)'] / 1000, parameters, 1.0))
+
+        for _, row in ele.iterrows():
+            sector = row['kategorija'] if detailed else 'zgradarstvo'
+            terms.append((sector, 'električna energija', row['potrošnja_energije(kWh)'] / 1000, {}, 1.0))
+
+        trans = trans.loc[trans['vrsta_prijevoza'] != 'taxi'].fillna(0)
+        for _, row in trans.iterrows():
+            sector = row['vrsta_prijevoza'] if detailed else 'promet'
+            vehicle_parameters = transport_parameters.get(row['vrsta_prijevoza'], {})
+            for fuel, (mass_column, ton_mwh) in TRANSPORT_FUELS.items():
+                parameters = {ton_mwh: 1}
+                for name in vehicle_parameters.get(fuel, {}).values():
+                    parameters[name] = parameters.get(name, 0) + 1
+                terms.append((sector, fuel, row[mass_column] * getattr(constants, ton_mwh), parameters, 1.0))
+
+        energent, light_mwh, light_co2, sector = light
+        light_factor = getattr(constants, factor_parameter(energent, year))
+        intensity = light_co2 / (light_mwh * light_factor) if light_mwh * light_factor else 1.0
+        terms.append((sector, energent, light_mwh, {}, intensity))
+
+        return cls.from_terms(constants, year, terms)
+
+    @classmethod
+    def from_terms(cls, constants, year, terms):
+        """Model from (sector, fuel, energy MWh, {constant: exponent}, intensity) terms, equal terms are merged."""
+        sectors = sorted({term[0] for term in terms})
+        fuels = sorted({term[1] for term in terms})
+        parameters = sorted({name for term in terms for name in term[3]} |
+                            {factor_parameter(fuel, year) for fuel in fuels})
+        nominal = np.array([getattr(constants, name) for name in parameters], dtype=float)
+
+        index = {name: i for i, name in enumerate(parameters)}
+        merged = {}
+        for sector, fuel, energy, exponents, intensity in terms:
+            cell = sectors.index(sector) * len(fuels) + fuels.index(fuel)
+            key = (cell, intensity, tuple(sorted(exponents.items())))
+            merged[key] = merged.get(key, 0.0) + energy
+        # terms of a cell are kept next to each other so evaluate can sum each cell's block of terms
+        merged = dict(sorted(merged.items(), key=lambda item: item[0][0]))
+
+        exponent_matrix = np.zeros((len(merged), len(parameters)))
+        for t, (_, _, exponents) in enumerate(merged):
+            for name, exponent in exponents:
+                if nominal[index[name]] == 0:
+                    raise ValueError(f"Energy can not be scaled by '{name}', its nominal value is 0")
+                exponent_matrix[t, index[name]] = exponent
+
+        cell = np.array([key[0] for key in merged], dtype=int)
+        return cls(
+            year=year,
+            sectors=sectors,
+            fuels=fuels,
+            parameters=parameters,
+            nominal=nominal,
+            cell=cell,
+            base=np.array(list(merged.values()), dtype=float),
+            exponents=exponent_matrix,
+            factor=np.array([index[factor_parameter(fuel, year)] for fuel in fuels], dtype=int),
+            intensity=np.array([key[1] for key in merged], dtype=float),
+        )
+
+    def parameter_matrix(self, samples):
+        """(N, parameters) matrix of sampled values, constants without samples stay at their nominal value.
+
+        Samples of constants the model does not depend on are ignored.
+        """
+        sizes = {len(np.atleast_1d(values)) for name, values in samples.items() if name in self.parameters}
+        if len(sizes) > 1:
+            raise ValueError(f"All samples must have the same length, got {sorted(sizes)}")
+        n_samples = sizes.pop() if sizes else 1
+
+        # filled one constant at a time, the transposed matrix keeps every constant's samples contiguous
+        values = np.empty((len(self.parameters), n_samples))
+        for k, name in enumerate(self.parameters):
+            values[k] = samples.get(name, self.nominal[k])
+        return values.T
+
+    def scaling(self, values):
+        """(terms, N) products of (value / nominal) ** exponent, computed as one matrix product in log space."""
+        used = self.exponents.any(axis=0)
+        exponents = self.exponents[:, used]
+        ratio = values[:, used] / self.nominal[used]
+        if (ratio > 0).all():
+            return np.exp(exponents @ np.log(ratio).T)
+
+        # sign of odd powers of negative values and terms that depend on a constant sampled as 0
+        magnitude = np.abs(ratio)
+        scaling = np.exp(exponents @ np.log(np.where(magnitude > 0, magnitude, 1.0)).T)
+        negative = (exponents % 2 == 1).astype(float) @ (ratio < 0).T.astype(float)
+        zero = (exponents != 0).astype(float) @ (magnitude == 0).T.astype(float)
+        scaling = np.where(negative % 2 == 1, -scaling, scaling)
+        return np.where(zero > 0, 0.0, scaling)
+
+    def evaluate(self, samples):
+        """Energy (MWh) and CO2 (t) arrays of shape (N, sectors, fuels) for N parameter samples."""
+        values = self.parameter_matrix(samples)
+        n_samples = len(values)
+        scaling = self.scaling(values)
+
+        # terms are sorted by cell, each run of terms is summed into its (sector, fuel) cell. All terms of a cell share
+        # the emission factor of its fuel so it is applied to the summed cells
+        cells, starts = np.unique(self.cell, return_index=True)
+        ends = np.append(starts[1:], len(self.cell))
+        weights = np.stack([self.base, self.base * self.intensity])
+        energy = np.zeros((len(self.sectors) * len(self.fuels), n_samples))
+        co2 = np.zeros_like(energy)
+        for cell, start, end in zip(cells, starts, ends):
+            energy[cell], co2[cell] = weights[:, start:end] @ scaling[start:end]
+
+        shape = (len(self.sectors), len(self.fuels), n_samples)
+        energy = energy.reshape(shape).transpose(2, 0, 1)
+        co2 = co2.reshape(shape).transpose(2, 0, 1) * values[:, None, self.factor]
+        return energy, co2
+
+    def nominal_inventory(self):
+        energy, co2 = self.evaluate({})
+        return self.to_frame(energy[0]), self.to_frame(co2[0])
+
+    def to_frame(self, values):
+        return pd.DataFrame(values, index=pd.Index(self.sectors, name='sektor'),
+                            columns=pd.Index(self.fuels, name='energent'))
+
+
+@dataclass
+class MonteCarloResult:
+    model: InventoryModel
+    energy: np.ndarray
+    co2: np.ndarray
+
+    def summary(self, kind='energy', percentiles=(5, 50, 95)):
+        """Mean and percentiles of every sector and fuel, with 'Ukupno' rows for sector and inventory totals."""
+        values = self.energy if kind == 'energy' else self.co2
+        sectors = self.model.sectors + ['Ukupno']
+        fuels = self.model.fuels + ['Ukupno']
+
+        # append fuel totals per sector and sector totals, then the grand total
+        values = np.concatenate([values, values.sum(axis=2, keepdims=True)], axis=2)
+        values = np.concatenate([values, values.sum(axis=1, keepdims=True)], axis=1)
+
+        stats = np.concatenate([
+            values.mean(axis=0)[None],
+            values.std(axis=0)[None],
+            np.percentile(values, percentiles, axis=0),
+        ])
+        columns = ['mean', 'std'] + [f'p{q:g}' for q in percentiles]
+        index = pd.MultiIndex.from_product([sectors, fuels], names=['sektor', 'energent'])
+        summary = pd.DataFrame(stats.reshape(len(columns), -1).T, index=index, columns=columns)
+        # cells that are zero in every sample are not part of the inventory
+        return summary.loc[(values != 0).any(axis=0).ravel()]
+
+
+def run_monte_carlo(model, distributions, n_samples, constants, seed=None):
+    samples = sample_parameters(distributions, n_samples, constants, seed)
+    energy, co2 = model.evaluate(samples)
+    return MonteCarloResult(model, energy, co2)
+
+
+def main(year, n_samples, distributions_path, level, seed, output_dir):
+    constants = Constants()
+    model = InventoryModel.from_inputs(constants, year, *load_inputs(constants, year), level=level)
+    distributions = load_distributions(distributions_path)
+
+    start = time.perf_counter()
+    result = run_monte_carlo(model, distributions, n_samples, constants, seed)
+    elapsed = time.perf_counter() - start
+    print(f'{n_samples} samples of {len(model.parameters)} constants in {elapsed:.2f} s')
+
+    output_dir.mkdir(exist_ok=True, parents=True)
+    for kind, unit in [('energy', 'MWh'), ('co2', 't CO2')]:
+        summary = result.summary(kind)
+        summary.to_csv(output_dir / f'monte_carlo_{kind}.csv')
+        print(f'\n{unit}')
+        print(summary.round(1).to_string())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monte Carlo uncertainty of the inventory over Constants.')
+    parser.add_argument('--year', type=int, default=2019, choices=[2011, 2019])
+    parser.add_argument('-n', '--samples', type=int, default=100_000)
+    parser.add_argument('-d', '--distributions', type=Path, default=DISTRIBUTIONS,
+                        help='JSON file with a distribution per constant.')
+    parser.add_argument('--level', choices=['sektor', 'kategorija'], default='sektor')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='Directory for the summary CSVs, output/<year>/ by default.')
+    args = parser.parse_args()
+    main(args.year, args.samples, args.distributions, args.level, args.seed,
+         args.output or root_dir / 'output' / str(args.year))
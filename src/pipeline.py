@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import inspect
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import profiling
+
+# name of the stage fingerprint manifest kept next to the stage pickles
+MANIFEST_NAME = 'manifest.json'
+
+
+@dataclass
+class Stage:
+    """A named step of a pipeline, called as function(**inputs, **params).
+
+    inputs maps an argument of the function to the stage whose value it receives, files are the input files the stage
+    reads and code lists the functions, classes or modules besides function the result depends on. The whole source
+    of the modules defining them is part of the stage key.
+    A stage with cache False always runs and is never stored.
+    """
+    name: str
+    function: object
+    inputs: dict = field(default_factory=dict)
+    files: tuple = ()
+    params: dict = field(default_factory=dict)
+    code: tuple = ()
+    cache: bool = True
+
+
+def code_digest(objects):
+    """Hash of the source of the modules defining the objects, so module level constants and helpers are covered."""
+    h = hashlib.sha256()
+    modules = []
+    for obj in objects:
+        obj = getattr(obj, '__func__', obj)
+        module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+        if module is None:
+            h.update(obj.__code__.co_code.hex().encode())
+        elif module not in modules:
+            modules.append(module)
+    for module in modules:
+        try:
+            source = inspect.getsource(module)
+        except (OSError, TypeError):
+            # built in or compiled modules, their version stands in for the source
+            source = str(getattr(module, '__version__', ''))
+        h.update(module.__name__.encode())
+        h.update(source.encode())
+    return h.hexdigest()
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Pipeline:
+    """Stages with explicit inputs, memoized on disk by content hash.
+
+    The key of a stage hashes its code, the content of its files, its params and the keys of its inputs, so a change
+    anywhere upstream reaches every stage below it, while stages whose key is recorded in the cache directory are
+    loaded instead of run.
+    """
+
+    def __init__(self, stages, cache_dir):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = Path(cache_dir)
+        self._fingerprints = {}
+        self._file_digests = {}
+        # seconds of the stages the last run executed
+        self.timings = {}
+
+    def _order(self, targets):
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f'Stage {name} depends on itself')
+            if name not in self.stages:
+                raise KeyError(f'No stage {name}')
+            visiting.add(name)
+            for upstream in self.stages[name].inputs.values():
+                visit(upstream)
+            order.append(name)
+
+        for name in targets:
+            visit(name)
+        return order
+
+    def fingerprint(self, name):
+        """Parts of the stage key, code / files / params / inputs digests, and the key itself."""
+        if name not in self._fingerprints:
+            stage = self.stages[name]
+            for path in stage.files:
+                if path not in self._file_digests:
+                    self._file_digests[path] = file_digest(path)
+            parts = {
+                'code': code_digest((stage.function, *stage.code)),
+                'files': {str(path): self._file_digests[path] for path in stage.files},
+                'params': json.dumps(stage.params, sort_keys=True, default=str),
+                'inputs': {argument: self.fingerprint(upstream)['key'] for argument, upstream in stage.inputs.items()},
+            }
+            parts['key'] = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+            self._fingerprints[name] = parts
+        return self._fingerprints[name]
+
+    def load_manifest(self):
+        manifest_path = self.cache_dir / MANIFEST_NAME
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        self.cache_dir.mkdir(exist_ok=True, parents=True)
+        manifest_path = self.cache_dir / MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def _reason(self, name, recorded):
+        """Why a stage has to run, None when its cached value is up to date."""
+        stage = self.stages[name]
+        parts = self.fingerprint(name)
+        if not stage.cache:
+            return 'not memoized'
+        if recorded is None or not (self.cache_dir / f'{name}.pkl').exists():
+            return 'not cached'
+        if recorded['key'] == parts['key']:
+            return None
+        if recorded['code'] != parts['code']:
+            return 'code changed'
+        changed = [path for path, digest in parts['files'].items() if recorded['files'].get(path) != digest]
+        if changed:
+            return 'file changed: ' + ', '.join(Path(path).name for path in changed)
+        if recorded['params'] != parts['params']:
+            return 'params changed'
+        changed = [self.stages[name].inputs[argument] for argument, key in parts['inputs'].items()
+                   if recorded['inputs'].get(argument) != key]
+        return 'input changed: ' + ', '.join(changed)
+
+    def plan(self, targets=None):
+        """(stage, reason) of every stage the targets need, in run order, reason is None for cached stages."""
+        manifest = self.load_manifest()
+        order = self._order(targets or list(self.stages))
+        return [(name, self._reason(name, manifest.get(name))) for name in order]
+
+    def explain(self, targets=None):
+        lines = []
+        for name, reason in self.plan(targets):
+            lines.append(f"{'run' if reason else 'cached':<7} {name:<24} {reason or ''}".rstrip())
+        return '\n'.join(lines)
+
+    def run(self, targets=None):
+        """Values of the target stages, all by default; stages are run or loaded from the cache."""
+        targets = targets or list(self.stages)
+        plan = self.plan(targets)
+        manifest = self.load_manifest()
+        values = {}
+        self.timings = {}
+
+        def value(name):
+            if name not in values:
+                with profiling.span(name, 'cache load'), open(self.cache_dir / f'{name}.pkl', 'rb') as f:
+                    values[name] = pickle.load(f)
+            return values[name]
+
+        for name, reason in plan:
+            if reason is None:
+                continue
+            stage = self.stages[name]
+            inputs = {argument: value(upstream) for argument, upstream in stage.inputs.items()}
+            start = time.perf_counter()
+            with profiling.span(name, 'stage', reason=reason) as record:
+                values[name] = stage.function(**inputs, **stage.params)
+            self.timings[name] = time.perf_counter() - start
+            if record is not None:
+                record['rows'] = profiling.row_count(values[name])
+            if stage.cache:
+                self.cache_dir.mkdir(exist_ok=True, parents=True)
+                with open(self.cache_dir / f'{name}.pkl', 'wb') as f:
+                    pickle.dump(values[name], f, protocol=pickle.HIGHEST_PROTOCOL)
+                manifest[name] = self.fingerprint(name)
+                self.save_manifest(manifest)
+
+        return {name: value(name) for name in targets}
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import resource
+import functools
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# profiler of the process, None when profiling is off; span and profiled then cost one global lookup
+_profiler = None
+
+
+def row_count(value):
+    """Rows of the frames in a stage value, frames inside tuples, lists and dicts are added up."""
+    if hasattr(value, 'shape') and type(value).__module__.startswith('pandas'):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        counts = [row_count(item) for item in value]
+    elif isinstance(value, dict):
+        counts = [row_count(item) for item in value.values()]
+    else:
+        return None
+    counts = [count for count in counts if count is not None]
+    return sum(counts) if counts else None
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Profiler:
+    """Wall time, CPU time, peak RSS and, with trace_memory, the tracemalloc peak of nested spans."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.spans = []
+        self._peaks = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name, category='stage', **args):
+        """Records the enclosed block, the yielded dict takes more args such as rows."""
+        record = dict(args)
+        if self.trace_memory:
+            # the peak so far belongs to the enclosing span, reset it so this span gets its own
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        rss_start = _max_rss_mb()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            rss = _max_rss_mb()
+            record.update(cpu_s=cpu, max_rss_mb=rss, rss_growth_mb=rss - rss_start)
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_traced_mb'] = peak / 2 ** 20
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                tracemalloc.reset_peak()
+            # the record itself is kept, args added after the block still reach the span
+            record.update(name=name, category=category, start=start, wall_s=wall, pid=os.getpid())
+            self.spans.append(record)
+
+    def to_chrome_trace(self):
+        """Spans as complete events of the Chrome trace format, open in chrome://tracing or ui.perfetto.dev."""
+        origin = min((span['start'] for span in self.spans), default=0.0)
+        events = []
+        for span in sorted(self.spans, key=lambda span: span['start']):
+            args = {key: value for key, value in span.items()
+                    if key not in ('name', 'category', 'start', 'wall_s', 'pid')}
+            events.append({'name': span['name'], 'cat': span['category'], 'ph': 'X', 'pid': span['pid'],
+                           'tid': span['pid'], 'ts': (span['start'] - origin) * 1e6, 'dur': span['wall_s'] * 1e6,
+                           'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'spans': self.spans}}
+
+    def write(self, path):
+        Path(path).parent.mkdir(exist_ok=True, parents=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, indent=1, ensure_ascii=False, default=str)
+
+    def summary(self, limit=30):
+        """The limit longest spans, as printable rows."""
+        lines = [f"{'span':<44} {'wall (s)':>9} {'cpu (s)':>9} {'rows':>9} {'peak (MB)':>10}"]
+        for span in sorted(self.spans, key=lambda span: -span['wall_s'])[:limit]:
+            rows = '' if span.get('rows') is None else span['rows']
+            peak = span.get('peak_traced_mb', span['max_rss_mb'])
+            lines.append(f"{span['category'] + ':' + span['name']:<44.44} {span['wall_s']:>9.4f} "
+                         f"{span['cpu_s']:>9.4f} {rows:>9} {peak:>10.2f}")
+        return '\n'.join(lines)
+
+
+def enable(trace_memory=True):
+    global _profiler
+    _profiler = Profiler(trace_memory)
+    return _profiler
+
+
+def disable():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None and profiler.trace_memory:
+        tracemalloc.stop()
+    return profiler
+
+
+def active():
+    return _profiler
+
+
+def span(name, category='stage', **args):
+    """Profiler span when profiling is on, a no-op context yielding None otherwise."""
+    if _profiler is None:
+        return nullcontext()
+    return _profiler.span(name, category, **args)
+
+
+def add_spans(spans):
+    """Adds spans recorded in another process, e.g. a figure rendering worker."""
+    if _profiler is not None:
+        _profiler.spans.extend(spans)
+
+
+def profiled(name=None, category='function'):
+    """Decorator recording every call of a function as a span."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with _profiler.span(span_name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+
+# vrsta_prijevoza of the EU vehicle categories (L mopeds and motorcycles, M1 cars, M2/M3 buses, N trucks)
+VEHICLE_TYPES = {
+    'L1': 'mopedi i motocikli', 'L2': 'mopedi i motocikli', 'L3': 'mopedi i motocikli', 'L4': 'mopedi i motocikli',
+    'L5': 'mopedi i motocikli', 'L6': 'mopedi i motocikli', 'L7': 'mopedi i motocikli',
+    'M1': 'osobna vozila',
+    'M2': 'autobusni', 'M3': 'autobusni',
+    'N1': 'teretna i radna vozila', 'N2': 'teretna i radna vozila', 'N3': 'teretna i radna vozila',
+}
+
+# fuel count column of the registry fuel names, compared in lower case like the vehicle categories
+FUELS = {
+    'benzin': 'benzin',
+    'benzin-plin': 'benzin-lpg', 'benzin-lpg': 'benzin-lpg', 'benzin/unp': 'benzin-lpg',
+    'dizel': 'dizel',
+    'električni': 'električni', 'elektro': 'električni',
+    'hibrid': 'hibridni', 'hibridni': 'hibridni',
+    'plug-in hibrid': 'hibridni s vanjskim punjenjem',
+    'hibridni s vanjskim punjenjem': 'hibridni s vanjskim punjenjem',
+}
+
+# columns of the privatna_vozila tables, in order
+TYPE_COLUMNS = ['mopedi i motocikli', 'osobna vozila', 'teretna i radna vozila', 'autobusni']
+FUEL_COLUMNS = ['benzin', 'benzin-lpg', 'dizel', 'električni', 'hibridni', 'hibridni s vanjskim punjenjem']
+
+
+@dataclass
+class RegistrySchema:
+    """Column names of a per vehicle registry file, km_column is the yearly km of a vehicle if the file has it."""
+    municipality_column: str = 'opcina'
+    type_column: str = 'kategorija'
+    fuel_column: str = 'gorivo'
+    km_column: str = None
+    sep: str = ','
+
+    def columns(self):
+        return [column for column in (self.municipality_column, self.type_column, self.fuel_column, self.km_column)
+                if column is not None]
+
+
+def _normalized(category):
+    return str(category).strip().lower()
+
+
+def _codes(values, mapping, labels):
+    # categorical values -> position of their mapped label, -1 for values without one; only the categories go
+    # through the string mapping, not every row
+    mapping = {key.lower(): value for key, value in mapping.items()}
+    category_codes = [labels.index(mapping[_normalized(category)]) if _normalized(category) in mapping else -1
+                      for category in values.cat.categories]
+    # code -1 of missing values picks the appended -1
+    return np.array(category_codes + [-1])[values.cat.codes.to_numpy()]
+
+
+@dataclass
+class RegistryCounts:
+    """Vehicle counts accumulated over the chunks of a registry file, memory does not grow with the file."""
+    counts: np.ndarray
+    km: np.ndarray
+    km_vehicles: np.ndarray
+    other_fuel: np.ndarray
+    rows_read: int = 0
+    rows_kept: int = 0
+    unknown_type: int = 0
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((len(TYPE_COLUMNS), len(FUEL_COLUMNS)), dtype=np.int64),
+                   np.zeros(len(TYPE_COLUMNS)), np.zeros(len(TYPE_COLUMNS), dtype=np.int64),
+                   np.zeros(len(TYPE_COLUMNS), dtype=np.int64))
+
+    def add(self, chunk, municipality, schema):
+        self.rows_read += len(chunk)
+        if municipality is not None:
+            municipalities = chunk[schema.municipality_column]
+            matching = [category for category in municipalities.cat.categories
+                        if _normalized(category) == municipality.lower()]
+            chunk = chunk.loc[municipalities.isin(matching)]
+        self.rows_kept += len(chunk)
+
+        types = _codes(chunk[schema.type_column], VEHICLE_TYPES, TYPE_COLUMNS)
+        fuels = _codes(chunk[schema.fuel_column], FUELS, FUEL_COLUMNS)
+        known = types >= 0
+        self.unknown_type += int((~known).sum())
+
+        counted = known & (fuels >= 0)
+        self.counts += np.bincount(types[counted] * len(FUEL_COLUMNS) + fuels[counted],
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+        self.other_fuel += np.bincount(types[known & (fuels < 0)], minlength=len(TYPE_COLUMNS))
+        if schema.km_column is not None:
+            km = pd.to_numeric(chunk[schema.km_column], errors='coerce').to_numpy(dtype=float)
+            reported = known & ~np.isnan(km)
+            self.km += np.bincount(types[reported], weights=km[reported], minlength=len(TYPE_COLUMNS))
+            self.km_vehicles += np.bincount(types[reported], minlength=len(TYPE_COLUMNS))
+
+    def to_frame(self):
+        """Table in the privatna_vozila format, vehicles of an unknown fuel only count in broj."""
+        frame = pd.DataFrame(self.counts, columns=FUEL_COLUMNS)
+        frame.insert(0, 'broj', self.counts.sum(axis=1) + self.other_fuel)
+        frame.insert(0, 'vrsta_prijevoza', TYPE_COLUMNS)
+        if self.km_vehicles.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                frame['prosjek_km_po_vozilu'] = self.km / self.km_vehicles
+        # empty cells like in the hand made tables
+        frame[FUEL_COLUMNS] = frame[FUEL_COLUMNS].where(frame[FUEL_COLUMNS] > 0)
+        return frame.loc[frame['broj'] > 0].reset_index(drop=True)
+
+
+def ingest_registry(path, municipality=None, schema=None, chunksize=500_000):
+    """Streams a per vehicle registry CSV in chunks and counts the vehicles of a municipality by type and fuel."""
+    schema = schema or RegistrySchema()
+    counts = RegistryCounts.empty()
+    reader = pd.read_csv(path, sep=schema.sep, usecols=schema.columns(), chunksize=chunksize,
+                         dtype={column: 'category' for column in schema.columns() if column != schema.km_column})
+    for chunk in reader:
+        counts.add(chunk, municipality, schema)
+    return counts
+
+
+def main(path, municipality, schema, chunksize, output):
+    counts = ingest_registry(path, municipality, schema, chunksize)
+    print(f'{counts.rows_read} vehicles read, {counts.rows_kept} in {municipality or "all municipalities"}, '
+          f'{counts.unknown_type} of an unknown type, {int(counts.other_fuel.sum())} of an unknown fuel')
+    table = counts.to_frame()
+    if output is not None:
+        Path(output).parent.mkdir(exist_ok=True, parents=True)
+        table.to_csv(output, index=False)
+    print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aggregate a per vehicle registry file to the privatna_vozila format.')
+    parser.add_argument('registry', type=Path)
+    parser.add_argument('-m', '--municipality', default=None, help='Municipality to keep, e.g. VINKOVCI.')
+    parser.add_argument('--chunksize', type=int, default=500_000, help='Rows read at a time.')
+    parser.add_argument('--municipality-column', default='opcina')
+    parser.add_argument('--type-column', default='kategorija')
+    parser.add_argument('--fuel-column', default='gorivo')
+    parser.add_argument('--km-column', default=None)
+    parser.add_argument('--sep', default=',')
+    parser.add_argument('-o', '--output', type=Path, default=None, help='CSV file for the aggregated table.')
+    args = parser.parse_args()
+    main(args.registry, args.municipality,
+         RegistrySchema(args.municipality_column, args.type_column, args.fuel_column, args.km_column, args.sep),
+         args.chunksize, args.output)
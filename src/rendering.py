@@ -0,0 +1,196 @@
+import os
+import json
+import pickle
+import hashlib
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+
+import profiling
+from pipeline import code_digest
+
+# name of the figure cache manifest kept in every output directory
+MANIFEST_NAME = '.figure_cache.json'
+
+
+@dataclass
+class ChartJob:
+    # plot is a picklable callable returning a matplotlib figure, e.g. a bound Inventory or PlottingUtility method,
+    # code lists modules besides the plot's own that the figure reads, e.g. the data module of a trend
+    plot: object
+    args: tuple
+    output_path: Path
+    kwargs: dict = field(default_factory=dict)
+    dpi: int = 300
+    code: tuple = ()
+
+
+def render_chart(job):
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    # start every chart from the default style so the file does not depend on what the worker rendered before
+    name = '/'.join(Path(job.output_path).parts[-2:])
+    with profiling.span(name, 'figure', dpi=job.dpi), matplotlib.rc_context():
+        matplotlib.rcdefaults()
+        with profiling.span(name, 'plot'):
+            fig = job.plot(*job.args, **job.kwargs)
+        with profiling.span(name, 'savefig'):
+            fig.savefig(job.output_path, dpi=job.dpi, bbox_inches='tight')
+        plt.close(fig)
+
+    return job.output_path
+
+
+def _render_chart_profiled(job, trace_memory):
+    # workers profile on their own, the spans go back to the parent with the path
+    profiler = profiling.enable(trace_memory)
+    output_path = render_chart(job)
+    profiling.disable()
+    return output_path, profiler.spans
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _package_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return ''
+
+
+def _update_hash(h, value):
+    if type(value).__module__.startswith('pandas'):
+        import pandas as pd
+
+        h.update(repr((type(value).__name__, getattr(value, 'name', None), value.shape)).encode())
+        if isinstance(value, pd.DataFrame):
+            h.update(repr((list(value.columns), [str(dtype) for dtype in value.dtypes])).encode())
+        else:
+            h.update(str(value.dtype).encode())
+        h.update(repr(list(value.index.names)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif type(value).__module__ == 'numpy':
+        h.update(repr((value.dtype, getattr(value, 'shape', ()))).encode())
+        h.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        h.update(f'dict{len(value)}'.encode())
+        for key, item in value.items():
+            _update_hash(h, key)
+            _update_hash(h, item)
+    elif value is None or isinstance(value, (str, int, float, bool, Path)):
+        h.update(repr(value).encode())
+    else:
+        h.update(pickle.dumps(value))
+
+
+def chart_key(job):
+    """Content hash of a chart job: its input data, chart code, style library versions and dpi.
+
+    The chart code is the source of the whole module of the plot, so style helpers and formatters next to it are
+    covered, and the modules in the job's code. Of the instance a bound plot method belongs to only its chart_state()
+    is hashed, a fixed description of its style, as plot methods and lazily resolved constants change the instance.
+    """
+    plot = getattr(job.plot, '__func__', job.plot)
+
+    h = hashlib.sha256()
+    h.update(f'{plot.__module__}.{plot.__qualname__}'.encode())
+    h.update(code_digest((plot, *job.code)).encode())
+    instance = getattr(job.plot, '__self__', None)
+    if hasattr(instance, 'chart_state'):
+        _update_hash(h, instance.chart_state())
+    h.update(repr((job.dpi, _package_version('matplotlib'), _package_version('seaborn'))).encode())
+    _update_hash(h, job.args)
+    _update_hash(h, job.kwargs)
+    return h.hexdigest()
+
+
+def load_manifest(directory):
+    manifest_path = Path(directory) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(directory, manifest):
+    manifest_path = Path(directory) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def clear_figure_cache(directory):
+    """Invalidates the figure cache of an output directory so every chart in it is rendered again."""
+    manifest_path = Path(directory) / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+
+def available_cpus():
+    """Cores this process may run on, which can be fewer than os.cpu_count() under an affinity mask or cpuset."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+def render_jobs(jobs, n_jobs=1, cache=True, force=False):
+    """Renders chart jobs, in a process pool with the Agg backend when n_jobs > 1 (0 uses every core).
+
+    With cache enabled a chart is only rendered when its key differs from the one recorded in the output directory's
+    manifest or the PNG is missing, force renders every chart and refreshes the manifest.
+    Returns the paths of the charts that were rendered.
+    """
+    jobs = list(jobs)
+    if n_jobs == 0:
+        n_jobs = available_cpus()
+
+    manifests = {}
+    keys = {}
+    for job in jobs:
+        directory = Path(job.output_path).parent
+        directory.mkdir(exist_ok=True, parents=True)
+        if cache and directory not in manifests:
+            manifests[directory] = load_manifest(directory)
+
+    if cache:
+        pending = []
+        for job in jobs:
+            output_path = Path(job.output_path)
+            keys[output_path] = chart_key(job)
+            cached_key = manifests[output_path.parent].get(output_path.name)
+            if force or cached_key != keys[output_path] or not output_path.exists():
+                pending.append(job)
+    else:
+        pending = jobs
+
+    if n_jobs == 1 or len(pending) <= 1:
+        rendered = [render_chart(job) for job in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(pending)), initializer=_init_worker) as pool:
+            if profiling.active() is None:
+                rendered = list(pool.map(render_chart, pending))
+            else:
+                rendered = []
+                for output_path, spans in pool.map(partial(_render_chart_profiled,
+                                                           trace_memory=profiling.active().trace_memory), pending):
+                    rendered.append(output_path)
+                    profiling.add_spans(spans)
+
+    if cache:
+        for output_path in map(Path, rendered):
+            manifests[output_path.parent][output_path.name] = keys[output_path]
+        for directory, manifest in manifests.items():
+            save_manifest(directory, manifest)
+
+    return rendered
@@ -0,0 +1,182 @@
+import json
+import uuid
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+
+RESULTS = root_dir / 'output' / 'results'
+
+# hive partitions of both datasets, e.g. tidy/opcina=Vinkovci/godina=2019/scenarij=inventar/
+PARTITION_COLUMNS = ('opcina', 'godina', 'scenarij')
+INVENTORY_SCENARIO = 'inventar'
+
+# keyword of the readers -> partition column
+PARTITION_KEYWORDS = {'municipality': 'opcina', 'year': 'godina', 'scenario': 'scenarij'}
+
+
+def _schemas():
+    import pyarrow as pa
+
+    partitions = [pa.field('opcina', pa.string()), pa.field('godina', pa.int32()), pa.field('scenarij', pa.string())]
+    tidy = pa.schema([
+        pa.field('energent', pa.string()),
+        pa.field('potrošnja_energije(MWh)', pa.float64()),
+        pa.field('Emisije CO2 (t)', pa.float64()),
+        pa.field('sektor', pa.string()),
+        pa.field('run_id', pa.string()),
+        *partitions,
+    ])
+    # pivots in long form, one row per cell, the order columns keep the row and column order of the pivot
+    pivots = pa.schema([
+        pa.field('tablica', pa.string()),
+        pa.field('redak', pa.string()),
+        pa.field('stupac', pa.string()),
+        pa.field('vrijednost', pa.float64()),
+        pa.field('redak_red', pa.int32()),
+        pa.field('stupac_red', pa.int32()),
+        pa.field('redak_naziv', pa.string()),
+        pa.field('stupac_naziv', pa.string()),
+        pa.field('serija', pa.bool_()),
+        pa.field('run_id', pa.string()),
+        *partitions,
+    ])
+    return {'tidy': tidy, 'pivots': pivots}, pa.schema(partitions)
+
+
+def pivot_rows(key, table):
+    """Long form rows of an inventory pivot, a DataFrame or a named Series."""
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    values = frame.to_numpy(dtype=float)
+    n_rows, n_columns = values.shape
+    return pd.DataFrame({
+        'tablica': key,
+        'redak': [str(label) for label in frame.index for _ in range(n_columns)],
+        'stupac': [str(label) for label in frame.columns] * n_rows,
+        'vrijednost': values.ravel(),
+        'redak_red': [i for i in range(n_rows) for _ in range(n_columns)],
+        'stupac_red': list(range(n_columns)) * n_rows,
+        'redak_naziv': frame.index.name,
+        'stupac_naziv': None if isinstance(table, pd.Series) else frame.columns.name,
+        'serija': isinstance(table, pd.Series),
+    })
+
+
+def _write(root, name, frame, schemas, partitioning, run):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = schemas[name].with_metadata({'secap_run': json.dumps(run, ensure_ascii=False)})
+    frame = frame.assign(run_id=run['run_id'], opcina=run['municipality'], godina=run['year'],
+                         scenarij=run['scenario'])
+    table = pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False)
+    # a new run of a municipality / year / scenario replaces the files of the previous one
+    ds.write_dataset(table, Path(root) / name, format='parquet', partitioning=partitioning,
+                     basename_template=f"{run['run_id']}-{{i}}.parquet", existing_data_behavior='delete_matching')
+
+
+def write_results(results, municipality, year, scenario=INVENTORY_SCENARIO, root=RESULTS, metadata=None):
+    """Stores the tidy total frame and the pivots of an inventory run, returns the run record.
+
+    results is the dict of Inventory.compute_inventory or base_inventory; the tidy frame is stored when the dict has
+    one. metadata is added to the run record, which is kept in the Parquet schema and appended to runs.jsonl.
+    """
+    import pyarrow.dataset as ds
+
+    schemas, partition_schema = _schemas()
+    partitioning = ds.partitioning(partition_schema, flavor='hive')
+    run = {
+        'run_id': uuid.uuid4().hex,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'municipality': municipality,
+        'year': int(year),
+        'scenario': scenario,
+        **(metadata or {}),
+    }
+
+    pivots = [key for key, table in results.items() if key != 'tidy' and isinstance(table, (pd.DataFrame, pd.Series))
+              and not key.endswith('_data')]
+    _write(root, 'pivots', pd.concat([pivot_rows(key, results[key]) for key in pivots]), schemas, partitioning, run)
+    if 'tidy' in results:
+        _write(root, 'tidy', results['tidy'], schemas, partitioning, run)
+
+    run['tables'] = pivots + (['tidy'] if 'tidy' in results else [])
+    with open(Path(root) / 'runs.jsonl', 'a') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + '\n')
+    return run
+
+
+def _filter(conditions):
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, value in conditions.items():
+        if value is None:
+            continue
+        condition = ds.field(column).isin(list(value)) if isinstance(value, (list, tuple, set)) \
+            else ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def load_table(name, root=RESULTS, columns=None, **conditions):
+    """Slice of the tidy or pivots dataset, only the matching partitions and row groups are read.
+
+    Conditions are column=value or column=(values, ...), municipality, year and scenario name the partitions, e.g.
+    load_table('tidy', year=(2011, 2019), sektor='promet').
+    """
+    import pyarrow.dataset as ds
+
+    schemas, partition_schema = _schemas()
+    conditions = {PARTITION_KEYWORDS.get(key, key): value for key, value in conditions.items()}
+    dataset = ds.dataset(Path(root) / name, schema=schemas[name], format='parquet',
+                         partitioning=ds.partitioning(partition_schema, flavor='hive'))
+    return dataset.to_table(columns=columns, filter=_filter(conditions)).to_pandas()
+
+
+def load_pivot(key, municipality, year, scenario=INVENTORY_SCENARIO, root=RESULTS):
+    """An inventory pivot as it was computed, a DataFrame or for the electricity tables a Series."""
+    rows = load_table('pivots', root, tablica=key, municipality=municipality, year=year, scenario=scenario)
+    if rows.empty:
+        raise KeyError(f"No pivot '{key}' stored for {municipality} {year} {scenario}")
+    rows = rows.sort_values(['redak_red', 'stupac_red'])
+    frame = rows.pivot(index='redak_red', columns='stupac_red', values='vrijednost')
+    frame.index = pd.Index(rows.drop_duplicates('redak_red')['redak'].to_numpy(), name=rows['redak_naziv'].iloc[0])
+    frame.columns = pd.Index(rows.drop_duplicates('stupac_red')['stupac'].to_numpy(), name=rows['stupac_naziv'].iloc[0])
+    if rows['serija'].iloc[0]:
+        return frame.iloc[:, 0].rename(frame.columns[0])
+    return frame
+
+
+def load_runs(root=RESULTS):
+    """Run records of the store, oldest first."""
+    path = Path(root) / 'runs.jsonl'
+    if not path.exists():
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the partitioned inventory result store.')
+    parser.add_argument('table', choices=['tidy', 'pivots', 'runs'])
+    parser.add_argument('--root', type=Path, default=RESULTS)
+    parser.add_argument('--municipality', default=None)
+    parser.add_argument('--years', type=int, nargs='+', default=None)
+    parser.add_argument('--scenario', default=None)
+    parser.add_argument('--sector', default=None, help='sektor of the tidy table.')
+    parser.add_argument('--pivot', default=None, help='tablica of the pivots table, e.g. total_co2.')
+    args = parser.parse_args()
+
+    if args.table == 'runs':
+        print(load_runs(args.root).to_string(index=False))
+    else:
+        conditions = {'municipality': args.municipality, 'year': args.years, 'scenario': args.scenario}
+        if args.table == 'tidy':
+            conditions['sektor'] = args.sector
+        else:
+            conditions['tablica'] = args.pivot
+        print(load_table(args.table, args.root, **conditions).to_string(index=False, float_format='{:.1f}'.format))
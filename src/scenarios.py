@@ -0,0 +1,324 @@
+import json
+import itertools
+import argparse
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+
+SCENARIOS_2030 = root_dir / 'data' / 'scenarios' / '2030.json'
+
+
+@dataclass
+class Measure:
+    """Mitigation measure saving a share of the sector's base year energy and/or a fixed amount of MWh."""
+    name: str
+    sector: str
+    share: float = 0.0
+    mwh: float = 0.0
+
+
+@dataclass
+class Scenario:
+    """Projection of the base year inventory, values left as None are taken from the projection baseline."""
+    name: str
+    ev_share: float
+    measures: list = field(default_factory=list)
+    co2_electricity_mwh_ton: float = None
+    engine_efficiency: float = None
+    description: str = ''
+
+    @classmethod
+    def from_dict(cls, definition):
+        definition = dict(definition)
+        measures = [Measure(**measure) for measure in definition.pop('measures', [])]
+        # the electricity factor can be given with the target year like the Constants attribute
+        for key in list(definition):
+            if key.startswith('co2_electricity_mwh_ton_'):
+                definition['co2_electricity_mwh_ton'] = definition.pop(key)
+        return cls(measures=measures, **definition)
+
+
+def expand_grid(base, grid):
+    """Variants of a scenario for every combination of the grid values.
+
+    Grid keys are Scenario fields or '<measure name>.<share|mwh>', variants are named after the base and the values.
+    """
+    keys = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        scenario = replace(base, measures=[replace(measure) for measure in base.measures])
+        for key, value in zip(keys, values):
+            if '.' in key:
+                measure_name, attribute = key.split('.')
+                measures = [measure for measure in scenario.measures if measure.name == measure_name]
+                if not measures:
+                    raise KeyError(f"Scenario '{base.name}' has no measure '{measure_name}'")
+                setattr(measures[0], attribute, value)
+            else:
+                if key.startswith('co2_electricity_mwh_ton_'):
+                    key = 'co2_electricity_mwh_ton'
+                setattr(scenario, key, value)
+        scenario.name = base.name + ''.join(f'|{key}={value}' for key, value in zip(keys, values))
+        variants.append(scenario)
+    return variants
+
+
+def scenario_files(path=SCENARIOS_2030):
+    """A scenario file and the files it includes, see load_scenarios."""
+    with open(path) as f:
+        include = json.load(f).get('include')
+    return [Path(path)] + ([] if include is None else scenario_files(Path(path).parent / include))
+
+
+def load_scenarios(path=SCENARIOS_2030):
+    """Scenarios of a JSON definition file, grid variants follow the scenarios they are based on.
+
+    "include" names another scenario file, relative to this one, whose scenarios come first, e.g. to expand grids of
+    the published scenarios in a separate file.
+    """
+    with open(path) as f:
+        definitions = json.load(f)
+
+    scenarios = [] if 'include' not in definitions else load_scenarios(Path(path).parent / definitions['include'])
+    scenarios += [Scenario.from_dict(definition) for definition in definitions.get('scenarios', [])]
+    by_name = {scenario.name: scenario for scenario in scenarios}
+    for grid in definitions.get('grids', []):
+        scenarios += expand_grid(by_name[grid['base']], grid['grid'])
+    return scenarios
+
+
+@dataclass
+class ProjectionBaseline:
+    """Inputs every scenario of a target year shares.
+
+    Sector energy is extrapolated with the yearly change between the reference and base year, transport is
+    replaced by the energy per car of the base year times the cars that are not electric and the engine efficiency
+    gain. CO2 per MWh of a sector follows the base year with electricity scaled to the target year emission factor.
+    engine_efficiency_interval is the (low, high) prediction interval of the engine efficiency gain, scenarios
+    without their own engine efficiency are also projected at both ends of it.
+    """
+    sectors: list
+    fuels: list
+    reference_year: int
+    base_year: int
+    target_year: int
+    reference_energy: np.ndarray
+    base_energy: np.ndarray
+    base_co2: np.ndarray
+    base_electricity_factor: float
+    co2_electricity_mwh_ton: float
+    n_cars: float
+    engine_efficiency: float
+    transport_sector: str = 'promet'
+    energy_fuels: list = None
+    base_fuel_energy: np.ndarray = None
+    engine_efficiency_interval: tuple = None
+
+    @classmethod
+    def from_inventories(cls, reference_inventory, base_inventory, base_trans, constants, engine_efficiency_2030,
+                         reference_year=2011, base_year=2019, target_year=2030, engine_efficiency_interval=None):
+        base_total = base_inventory['total'].sum(axis=1)
+        sectors = list(base_total.index)
+        reference_total = reference_inventory['total'].sum(axis=1).reindex(sectors)
+        base_co2 = base_inventory['total_co2'].reindex(sectors)
+        base_fuel_energy = base_inventory['total'].reindex(sectors)
+
+        return cls(
+            sectors=sectors,
+            fuels=list(base_co2.columns),
+            reference_year=reference_year,
+            base_year=base_year,
+            target_year=target_year,
+            reference_energy=reference_total.to_numpy(dtype=float),
+            base_energy=base_total.to_numpy(dtype=float),
+            base_co2=base_co2.to_numpy(dtype=float),
+            base_electricity_factor=getattr(constants, f'co2_electricity_mwh_ton_{base_year}'),
+            co2_electricity_mwh_ton=getattr(constants, f'co2_electricity_mwh_ton_{target_year}'),
+            n_cars=base_trans.sum()['broj'],
+            engine_efficiency=engine_efficiency_2030 / constants.specific_consumption_total_2005,
+            energy_fuels=list(base_fuel_energy.columns),
+            base_fuel_energy=base_fuel_energy.to_numpy(dtype=float),
+            engine_efficiency_interval=None if engine_efficiency_interval is None else tuple(
+                bound / constants.specific_consumption_total_2005 for bound in engine_efficiency_interval),
+        )
+
+    def project(self, ev_share, co2_electricity_mwh_ton, engine_efficiency, measure_shares, measure_mwh,
+                target_year=None):
+        """Target year energy and CO2 of a batch of scenarios.
+
+        ev_share, co2_electricity_mwh_ton and engine_efficiency have shape (scenarios,), measure_shares and
+        measure_mwh (measures, scenarios, sectors), measures are subtracted in order. The energy, CO2 and electricity
+        factor arrays of the baseline may have a leading (scenarios,) dimension, e.g. for sampled inventories.
+        target_year defaults to the baseline's and can be a (scenarios,) array, one year per row.
+        Returns two (scenarios, sectors) arrays.
+        """
+        ev_share = np.asarray(ev_share, dtype=float)
+        co2_electricity_mwh_ton = np.asarray(co2_electricity_mwh_ton, dtype=float)
+        engine_efficiency = np.asarray(engine_efficiency, dtype=float)
+        n_scenarios = len(ev_share)
+        shape = (n_scenarios, len(self.sectors))
+        reference_energy = np.broadcast_to(self.reference_energy, shape)
+        base_energy = np.broadcast_to(self.base_energy, shape)
+        transport = self.sectors.index(self.transport_sector)
+
+        change_per_year = ((base_energy - reference_energy) / reference_energy) * 100 / (
+                self.base_year - self.reference_year)
+        if target_year is None:
+            years_until_target = self.target_year - self.base_year
+        else:
+            years_until_target = (np.asarray(target_year) - self.base_year)[:, None]
+        change_until_target = change_per_year * years_until_target / 100
+        energy = base_energy + base_energy * change_until_target
+
+        # cars that are not electric are counted in whole cars
+        n_cars = np.trunc(self.n_cars - (self.n_cars * ev_share))
+        energy_per_car = base_energy[:, transport] / self.n_cars
+        energy[:, transport] = energy_per_car * n_cars * engine_efficiency
+
+        for shares, mwh in zip(measure_shares, measure_mwh):
+            energy = energy - (base_energy * shares + mwh)
+
+        sector_scaling = self.target_co2(co2_electricity_mwh_ton, n_scenarios).sum(axis=2) / base_energy
+        return energy, energy * sector_scaling
+
+    def target_co2(self, co2_electricity_mwh_ton, n_scenarios):
+        """(scenarios, sectors, fuels) base year CO2 with electricity scaled to the target emission factor."""
+        base_co2 = np.broadcast_to(self.base_co2, (n_scenarios, len(self.sectors), len(self.fuels)))
+        electricity = self.fuels.index('električna energija')
+        electricity_factor = np.broadcast_to(co2_electricity_mwh_ton / self.base_electricity_factor, (n_scenarios,))
+        electricity_co2_saved = (1 - electricity_factor[:, None]) * base_co2[:, :, electricity]
+        target_co2 = base_co2.copy()
+        target_co2[:, :, electricity] = target_co2[:, :, electricity] - electricity_co2_saved
+        return target_co2
+
+    def measure_arrays(self, scenarios):
+        """(measures, scenarios, sectors) shares of the base year energy and MWh saved by every scenario's measures.
+
+        Scenarios with fewer measures are padded with measures that save nothing.
+        """
+        n_measures = max((len(scenario.measures) for scenario in scenarios), default=0)
+        shares = np.zeros((n_measures, len(scenarios), len(self.sectors)))
+        mwh = np.zeros_like(shares)
+        for s, scenario in enumerate(scenarios):
+            for m, measure in enumerate(scenario.measures):
+                sector = self.sectors.index(measure.sector)
+                shares[m, s, sector] = measure.share
+                mwh[m, s, sector] = measure.mwh
+        return shares, mwh
+
+
+# columns of the prediction interval bounds in the result frames
+INTERVAL_COLUMNS = ('donja granica', 'gornja granica')
+
+
+@dataclass
+class ScenarioResults:
+    """Energy and CO2 (scenarios, sectors) of the scenarios, the intervals are (2, scenarios, sectors) low / high."""
+    baseline: ProjectionBaseline
+    names: list
+    energy: np.ndarray
+    co2: np.ndarray
+    energy_interval: np.ndarray = None
+    co2_interval: np.ndarray = None
+
+    def values(self, name, kind='energy'):
+        values = self.energy if kind == 'energy' else self.co2
+        return pd.Series(values[self.names.index(name)], index=pd.Index(self.baseline.sectors, name='sektor'))
+
+    def interval(self, name, kind='energy'):
+        """(sectors, 2) low and high bounds of a scenario, None without an interval."""
+        interval = self.energy_interval if kind == 'energy' else self.co2_interval
+        if interval is None:
+            return None
+        return pd.DataFrame(interval[:, self.names.index(name)].T, columns=list(INTERVAL_COLUMNS),
+                            index=pd.Index(self.baseline.sectors, name='sektor'))
+
+    def target_frame(self, name, kind='energy'):
+        """Target year values of a scenario in the sektor / 0 / Godina format of the projection charts."""
+        frame = self.values(name, kind).reset_index()
+        frame['Godina'] = self.baseline.target_year
+        return frame
+
+    def projection_frame(self, name, kind='energy'):
+        """Base and target year totals per sector, the input of Inventory.projection_bar.
+
+        With an interval the target year rows also have its bounds, the base year ones are NaN.
+        """
+        base = self.baseline.base_energy if kind == 'energy' else self.baseline.base_co2.sum(axis=1)
+        base_frame = pd.Series(base, index=pd.Index(self.baseline.sectors, name='sektor')).reset_index()
+        base_frame['Godina'] = self.baseline.base_year
+        target_frame = self.target_frame(name, kind)
+        interval = self.interval(name, kind)
+        if interval is not None:
+            target_frame = target_frame.join(interval, on='sektor')
+        return pd.concat([base_frame, target_frame])
+
+    def to_frame(self):
+        """Long table of every scenario and sector with energy (MWh) and CO2 (t)."""
+        index = pd.MultiIndex.from_product([self.names, self.baseline.sectors], names=['scenarij', 'sektor'])
+        frame = pd.DataFrame({
+            'potrošnja_energije(MWh)': self.energy.ravel(),
+            'Emisije CO2 (t)': self.co2.ravel(),
+        }, index=index)
+        for column, interval in (('potrošnja_energije(MWh)', self.energy_interval),
+                                 ('Emisije CO2 (t)', self.co2_interval)):
+            if interval is not None:
+                for bound, values in zip(INTERVAL_COLUMNS, interval):
+                    frame[f'{column} {bound}'] = values.ravel()
+        return frame
+
+
+def evaluate_scenarios(baseline, scenarios):
+    """Evaluates all scenarios as one vectorized batch."""
+    ev_share = [scenario.ev_share for scenario in scenarios]
+    co2_electricity = [baseline.co2_electricity_mwh_ton if scenario.co2_electricity_mwh_ton is None
+                       else scenario.co2_electricity_mwh_ton for scenario in scenarios]
+    engine_efficiency = [baseline.engine_efficiency if scenario.engine_efficiency is None
+                         else scenario.engine_efficiency for scenario in scenarios]
+
+    measures = baseline.measure_arrays(scenarios)
+    energy, co2 = baseline.project(ev_share, co2_electricity, engine_efficiency, *measures)
+    results = ScenarioResults(baseline, [scenario.name for scenario in scenarios], energy, co2)
+    if baseline.engine_efficiency_interval is not None:
+        # both ends of the interval in one batch, scenarios with their own engine efficiency keep it
+        bounds = [bound if scenario.engine_efficiency is None else scenario.engine_efficiency
+                  for bound in baseline.engine_efficiency_interval for scenario in scenarios]
+        shares, mwh = (np.concatenate([array, array], axis=1) for array in measures)
+        energy, co2 = baseline.project(ev_share * 2, co2_electricity * 2, bounds, shares, mwh)
+        results.energy_interval = np.sort(energy.reshape(2, len(scenarios), -1), axis=0)
+        results.co2_interval = np.sort(co2.reshape(2, len(scenarios), -1), axis=0)
+    return results
+
+
+def main(path, output):
+    from Constants import Constants
+    from inventory import Inventory, load_inputs, engine_efficiency_fit
+
+    constants = Constants()
+    inventories = {}
+    for year in (2011, 2019):
+        inputs = load_inputs(constants, year)
+        inventories[year] = Inventory(constants, year).compute_inventory(*inputs)
+    trans_2019 = load_inputs(constants, 2019)[2]
+
+    baseline = ProjectionBaseline.from_inventories(inventories[2011], inventories[2019], trans_2019, constants,
+                                                   engine_efficiency_fit()[2](2030))
+    results = evaluate_scenarios(baseline, load_scenarios(path))
+
+    table = results.to_frame()
+    if output is not None:
+        Path(output).parent.mkdir(exist_ok=True, parents=True)
+        table.to_csv(output)
+    print(table.groupby(level='scenarij', sort=False).sum().round(1).to_string())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate 2030 scenario definitions as one batch.')
+    parser.add_argument('scenarios', nargs='?', type=Path, default=SCENARIOS_2030)
+    parser.add_argument('-o', '--output', type=Path, default=None, help='CSV file for the per sector results.')
+    args = parser.parse_args()
+    main(args.scenarios, args.output)
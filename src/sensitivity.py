@@ -0,0 +1,212 @@
+import time
+import argparse
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Constants import Constants
+from monte_carlo import InventoryModel, DISTRIBUTIONS, load_distributions, sample_parameters
+from scenarios import SCENARIOS_2030, ProjectionBaseline, load_scenarios
+
+root_dir = Path(__file__).parents[1]
+
+# constants of the 2030 projection that are not part of the 2011 and 2019 inventories
+PROJECTION_PARAMETERS = ('co2_electricity_mwh_ton_2030', 'specific_consumption_total_2005')
+
+
+@dataclass
+class OutputModel:
+    """Batched model of named outputs, function maps {constant: (N,) array} to an (N, outputs) array."""
+    parameters: list
+    nominal: np.ndarray
+    outputs: list
+    function: object
+
+    def evaluate(self, values, chunk_size=200_000):
+        """Outputs for an (N, parameters) matrix of values, evaluated in chunks of rows to bound memory."""
+        results = []
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            results.append(self.function({name: chunk[:, k] for k, name in enumerate(self.parameters)}))
+        return np.concatenate(results)
+
+
+def output_names(sectors):
+    return [f'{unit}|{sector}' for unit in ('MWh', 't CO2') for sector in sectors + ['Ukupno']]
+
+
+def _totals(energy, co2):
+    # (N, sectors) energy and CO2 -> (N, outputs) with the inventory totals after the sectors
+    return np.concatenate([energy, energy.sum(axis=1, keepdims=True), co2, co2.sum(axis=1, keepdims=True)], axis=1)
+
+
+def inventory_output_model(model):
+    """Energy and CO2 totals per sector of an inventory year."""
+    def function(samples):
+        energy, co2 = model.evaluate(samples)
+        return _totals(energy.sum(axis=2), co2.sum(axis=2))
+
+    return OutputModel(model.parameters, model.nominal, output_names(model.sectors), function)
+
+
+def projection_output_model(reference_model, base_model, baseline, scenario, constants):
+    """Target year energy and CO2 totals per sector of a scenario, with both inventories evaluated per sample."""
+    if reference_model.sectors != baseline.sectors or base_model.sectors != baseline.sectors:
+        raise ValueError("Inventory models and the projection baseline must have the same sectors")
+
+    parameters = sorted(set(reference_model.parameters) | set(base_model.parameters) | set(PROJECTION_PARAMETERS))
+    nominal = np.array([getattr(constants, name) for name in parameters], dtype=float)
+    base_factor = f'co2_electricity_mwh_ton_{baseline.base_year}'
+    target_factor = f'co2_electricity_mwh_ton_{baseline.target_year}'
+    engine_efficiency_2030 = baseline.engine_efficiency * constants.specific_consumption_total_2005
+    shares, mwh = baseline.measure_arrays([scenario])
+
+    def function(samples):
+        reference_energy, _ = reference_model.evaluate(samples)
+        base_energy, base_co2 = base_model.evaluate(samples)
+        n_samples = len(base_energy)
+        sampled = replace(
+            baseline,
+            fuels=base_model.fuels,
+            reference_energy=reference_energy.sum(axis=2),
+            base_energy=base_energy.sum(axis=2),
+            base_co2=base_co2,
+            base_electricity_factor=samples[base_factor],
+        )
+        co2_electricity = samples[target_factor] if scenario.co2_electricity_mwh_ton is None \
+            else scenario.co2_electricity_mwh_ton
+        engine_efficiency = engine_efficiency_2030 / samples['specific_consumption_total_2005'] \
+            if scenario.engine_efficiency is None else scenario.engine_efficiency
+        energy, co2 = sampled.project(np.full(n_samples, scenario.ev_share), co2_electricity, engine_efficiency,
+                                      shares, mwh)
+        return _totals(energy, co2)
+
+    return OutputModel(parameters, nominal, output_names(baseline.sectors), function)
+
+
+def tornado(model, relative_change=0.1, low=None, high=None):
+    """One-at-a-time sensitivity, every parameter moved to its low and high value with the others at nominal.
+
+    Low and high values default to the nominal value -/+ relative_change and can be given per parameter. All 2 *
+    parameters evaluations run as one batch. Returns a frame indexed by output and parameter sorted by swing.
+    """
+    low = low or {}
+    high = high or {}
+    n_parameters = len(model.parameters)
+    low_values = np.array([low.get(name, value * (1 - relative_change))
+                           for name, value in zip(model.parameters, model.nominal)])
+    high_values = np.array([high.get(name, value * (1 + relative_change))
+                            for name, value in zip(model.parameters, model.nominal)])
+
+    # rows: nominal, then parameter k low, then parameter k high
+    values = np.tile(model.nominal, (2 * n_parameters + 1, 1))
+    values[1 + np.arange(n_parameters), np.arange(n_parameters)] = low_values
+    values[1 + n_parameters + np.arange(n_parameters), np.arange(n_parameters)] = high_values
+    results = model.evaluate(values)
+    nominal, output_low, output_high = results[0], results[1:n_parameters + 1], results[n_parameters + 1:]
+
+    index = pd.MultiIndex.from_product([model.outputs, model.parameters], names=['output', 'parameter'])
+    frame = pd.DataFrame({
+        'low': np.tile(low_values, len(model.outputs)),
+        'high': np.tile(high_values, len(model.outputs)),
+        'nominal_output': np.repeat(nominal, n_parameters),
+        'delta_low': (output_low - nominal).T.ravel(),
+        'delta_high': (output_high - nominal).T.ravel(),
+    }, index=index)
+    frame['swing'] = (frame['delta_high'] - frame['delta_low']).abs()
+    return frame.sort_values(['output', 'swing'], ascending=[True, False])
+
+
+def sobol(model, distributions, n_samples, constants, seed=None):
+    """First order and total Sobol indices of every parameter that has a distribution.
+
+    Uses Saltelli's sampling scheme, the two base matrices A and B and one matrix per parameter with that column
+    taken from B, N * (parameters + 2) model evaluations in one batch. First order indices use the Saltelli (2010)
+    estimator and total indices Jansen's.
+    """
+    varied = [name for name in model.parameters if name in distributions]
+    if not varied:
+        raise ValueError("None of the model parameters has a distribution")
+    columns = [model.parameters.index(name) for name in varied]
+
+    samples = sample_parameters({name: distributions[name] for name in varied}, 2 * n_samples, constants, seed)
+    a = np.tile(model.nominal, (n_samples, 1))
+    b = a.copy()
+    for name, column in zip(varied, columns):
+        a[:, column] = samples[name][:n_samples]
+        b[:, column] = samples[name][n_samples:]
+
+    blocks = [a, b]
+    for column in columns:
+        ab = a.copy()
+        ab[:, column] = b[:, column]
+        blocks.append(ab)
+    results = model.evaluate(np.concatenate(blocks)).reshape(len(blocks), n_samples, -1)
+    # centering the outputs does not change the indices but lowers the variance of the first order estimator
+    results = results - np.concatenate([results[0], results[1]]).mean(axis=0)
+    f_a, f_b, f_ab = results[0], results[1], results[2:]
+
+    variance = np.concatenate([f_a, f_b]).var(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_order = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+        total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance
+
+    index = pd.MultiIndex.from_product([model.outputs, varied], names=['output', 'parameter'])
+    frame = pd.DataFrame({'S1': first_order.T.ravel(), 'ST': total.T.ravel()}, index=index)
+    return frame.sort_values(['output', 'ST'], ascending=[True, False])
+
+
+def build_output_model(year, constants, scenario_name='as_usual'):
+    from inventory import Inventory, load_inputs, engine_efficiency_fit
+
+    if year in (2011, 2019):
+        return inventory_output_model(InventoryModel.from_inputs(constants, year, *load_inputs(constants, year)))
+
+    inputs = {inventory_year: load_inputs(constants, inventory_year) for inventory_year in (2011, 2019)}
+    models = {inventory_year: InventoryModel.from_inputs(constants, inventory_year, *inputs[inventory_year])
+              for inventory_year in inputs}
+    inventories = {inventory_year: Inventory(constants, inventory_year).compute_inventory(*inputs[inventory_year])
+                   for inventory_year in inputs}
+    baseline = ProjectionBaseline.from_inventories(inventories[2011], inventories[2019], inputs[2019][2], constants,
+                                                   engine_efficiency_fit()[2](year), target_year=year)
+    scenario = {scenario.name: scenario for scenario in load_scenarios(SCENARIOS_2030)}[scenario_name]
+    return projection_output_model(models[2011], models[2019], baseline, scenario, constants)
+
+
+def main(year, scenario, methods, n_samples, relative_change, distributions_path, seed, output_dir):
+    constants = Constants()
+    model = build_output_model(year, constants, scenario)
+    output_dir.mkdir(exist_ok=True, parents=True)
+    total_outputs = ['MWh|Ukupno', 't CO2|Ukupno']
+
+    if 'tornado' in methods:
+        start = time.perf_counter()
+        result = tornado(model, relative_change)
+        print(f'tornado, {len(model.parameters)} parameters in {time.perf_counter() - start:.2f} s')
+        result.to_csv(output_dir / f'tornado_{year}.csv')
+        print(result.loc[total_outputs].groupby(level='output').head(10).to_string(float_format='{:.3f}'.format))
+
+    if 'sobol' in methods:
+        start = time.perf_counter()
+        result = sobol(model, load_distributions(distributions_path), n_samples, constants, seed)
+        print(f'\nsobol, {n_samples} samples in {time.perf_counter() - start:.2f} s')
+        result.to_csv(output_dir / f'sobol_{year}.csv')
+        print(result.loc[total_outputs].groupby(level='output').head(10).to_string(float_format='{:.3f}'.format))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tornado and Sobol sensitivity of the inventory totals.')
+    parser.add_argument('--year', type=int, default=2019, choices=[2011, 2019, 2030])
+    parser.add_argument('--scenario', default='as_usual', help='Scenario of data/scenarios/2030.json for 2030.')
+    parser.add_argument('--methods', nargs='+', choices=['tornado', 'sobol'], default=['tornado', 'sobol'])
+    parser.add_argument('-n', '--samples', type=int, default=10_000, help='Base samples of the Sobol analysis.')
+    parser.add_argument('--relative-change', type=float, default=0.1, help='Tornado change of every parameter.')
+    parser.add_argument('-d', '--distributions', type=Path, default=DISTRIBUTIONS)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='Directory for the result CSVs, output/sensitivity/ by default.')
+    args = parser.parse_args()
+    main(args.year, args.scenario, args.methods, args.samples, args.relative_change, args.distributions, args.seed,
+         args.output or root_dir / 'output' / 'sensitivity')
@@ -1,10 +1,8 @@
 from pathlib import Path
-import seaborn as sns
 import os
 import argparse
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FuncFormatter
 from SupplementaryData import SupplementaryDataConverted
+from rendering import ChartJob, render_jobs
 
 
 def custom_formatter(x, pos):
@@ -13,10 +11,36 @@ def custom_formatter(x, pos):
 
 class PlottingUtility:
     def __init__(self):
+        import seaborn as sns
+
         sns.set_theme()
         self.colors = sns.color_palette()
 
+    def chart_state(self):
+        return {'colors': [tuple(color) for color in self.colors]}
+
+    def new_figure(self):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        # theme and font sizes are set before the figure exists so every chart is styled the same
+        SMALL_SIZE = 10
+        MEDIUM_SIZE = 14
+
+        sns.set_theme()
+        plt.rc('font', size=MEDIUM_SIZE)
+        plt.rc('axes', titlesize=SMALL_SIZE)
+        plt.rc('axes', labelsize=MEDIUM_SIZE)
+        plt.rc('xtick', labelsize=MEDIUM_SIZE)
+        plt.rc('ytick', labelsize=MEDIUM_SIZE)
+        plt.rc('legend', fontsize=MEDIUM_SIZE)
+
+        return plt.subplots(figsize=(10, 6))
+
     def apply_style(self, ax, y_label, x_label, legend, fix_labels=False):
+        import matplotlib.pyplot as plt
+        from matplotlib.ticker import FuncFormatter
+
         SMALL_SIZE = 10
         MEDIUM_SIZE = 14
 
@@ -48,8 +72,8 @@ class PlottingUtility:
         if not legend:
             ax.legend().set_visible(False)
 
-    def plot_simple_bar(self, data, x_label, y_label, title, legend, output_folder, fix_labels=False):
-        fig, ax = plt.subplots(figsize=(10, 6))
+    def plot_simple_bar(self, data, x_label, y_label, legend, fix_labels=False):
+        fig, ax = self.new_figure()
         colors = [self.colors[5] if idx == "Vukovarsko-srijemska" else self.colors[0] for idx in data.index]
         bars = data.plot(kind='barh', ax=ax, width=0.5, color=colors)
         self.apply_style(ax, x_label, y_label, legend, fix_labels)
@@ -71,18 +95,22 @@ class PlottingUtility:
                     or ytick.get_text() == "Zelena površina"):
                 bar.set_color(self.colors[2])
 
-        plt.savefig(f"{output_folder}/{title}.png", dpi=300, bbox_inches='tight')
+        return fig
+
+    def plot_stacked_bar(self, data, x_label, y_label, stacked=True):
+        import matplotlib.pyplot as plt
 
-    def plot_stacked_bar(self, data, x_label, y_label, title, output_folder, stacked=True):
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = self.new_figure()
         data.plot(kind='barh', stacked=stacked, ax=ax, width=0.5, color=self.colors)
         legend = ax.legend(fontsize=14, loc='upper left', bbox_to_anchor=(1, 1))
         plt.setp(legend.get_title(), fontsize='small')
         self.apply_style(ax, x_label, y_label, True)
-        plt.savefig(f"{output_folder}/{title}.png", dpi=300, bbox_inches='tight')
+        return fig
 
-    def plot_stacked_bar_overlay(self, data, x_label, y_label, title, output_folder):
-        fig, ax = plt.subplots(figsize=(10, 6))
+    def plot_stacked_bar_overlay(self, data, x_label, y_label):
+        import matplotlib.pyplot as plt
+
+        fig, ax = self.new_figure()
 
         data = data.iloc[::-1]
         col_order = data.sum().sort_values(ascending=False).index
@@ -97,10 +125,14 @@ class PlottingUtility:
         legend = ax.legend(fontsize=14, loc='upper left', bbox_to_anchor=(1, 1))
         plt.setp(legend.get_title(), fontsize='small')
         self.apply_style(ax, x_label, y_label, True)
-        plt.savefig(f"{output_folder}/{title}.png", dpi=300, bbox_inches='tight')
+        return fig
+
+    def plot_scatter(self, data, x_label, y_label):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from matplotlib.ticker import FuncFormatter
 
-    def plot_scatter(self, data, x_label, y_label, title, output_folder):
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = self.new_figure()
 
         sns.lineplot(data=data, x='Mjesec', y='Value', hue='Godina', marker='o', ax=ax)
         ax.yaxis.set_major_formatter(FuncFormatter(custom_formatter))
@@ -108,64 +140,73 @@ class PlottingUtility:
         ax.set_xlabel('')
         ax.set_ylabel(y_label)
 
-        plt.savefig(f"{output_folder}/{title}.png", dpi=300, bbox_inches='tight')
+        return fig
 
 
-def main(output_folder):
+def main(output_folder, n_jobs=1, force=False):
     print('Creating supplementary plots')
     if not os.path.exists(output_folder):
         Path(output_folder).mkdir(exist_ok=True, parents=True)
+    output_folder = Path(output_folder)
 
     data = SupplementaryDataConverted()
     plot_util = PlottingUtility()
 
-    plot_util.plot_simple_bar(
-        data.land_structure.set_index('Područje').sort_values(by='Value'), "", "Udio (%)",
-        "Struktura zemlje", False, output_folder
+    jobs = []
+
+    def add_job(plot, title, *args):
+        jobs.append(ChartJob(plot, args, output_folder / f"{title}.png"))
+
+    add_job(
+        plot_util.plot_simple_bar, "Struktura zemlje",
+        data.land_structure.set_index('Područje').sort_values(by='Value'), "", "Udio (%)", False
     )
 
-    plot_util.plot_simple_bar(
-        data.land_building_share.set_index('Područje').sort_values(by='Value'), "", "Udio (%)",
-        "Struktura građevinskog područja naselja", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Struktura građevinskog područja naselja",
+        data.land_building_share.set_index('Područje').sort_values(by='Value'), "", "Udio (%)", False
     )
     data.water_shortages['sum'] = data.water_shortages['Prosječna godina'] + data.water_shortages['Sušna godina']
-    plot_util.plot_stacked_bar(
-        data.water_shortages.sort_values(by='sum').drop(columns='sum'), "", "Nedostatak vode (mm)",
-        "Nestašice vode", output_folder
+    add_job(
+        plot_util.plot_stacked_bar, "Nestašice vode",
+        data.water_shortages.sort_values(by='sum').drop(columns='sum'), "", "Nedostatak vode (mm)"
     )
 
-    plot_util.plot_simple_bar(
+    add_job(
+        plot_util.plot_simple_bar, "Struktura poljoprivredne površine",
         data.arable_land_structure.set_index('Vrsta građevinskog područja').sort_values(by="Value"), "", "Udio (%)",
-        "Struktura poljoprivredne površine", False, output_folder
+        False
     )
 
-    plot_util.plot_simple_bar(
-        data.arable_land_use.set_index('Vrsta uporabe').sort_values(by='Value'), "",
-        "Udio (%)", "Struktura poljoprviredne površine prema vrsti uporabe", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Struktura poljoprviredne površine prema vrsti uporabe",
+        data.arable_land_use.set_index('Vrsta uporabe').sort_values(by='Value'), "", "Udio (%)", False
     )
 
-    plot_util.plot_simple_bar(
-        data.hummus_per_county.set_index('Županija').sort_values(by='Value'), "", "Zastupljenost (%)",
-        "Udio humusa po županiji", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Udio humusa po županiji",
+        data.hummus_per_county.set_index('Županija').sort_values(by='Value'), "", "Zastupljenost (%)", False
     )
 
-    plot_util.plot_stacked_bar(
-        data.agri_employment_age, "", "Udio (%)", 'Godište zaposlenih u poljoprivredi',
-        output_folder, False
+    add_job(
+        plot_util.plot_stacked_bar, 'Godište zaposlenih u poljoprivredi',
+        data.agri_employment_age, "", "Udio (%)", False
     )
 
-    plot_util.plot_simple_bar(
-        data.employment_vinkovci.set_index('Employment Type').sort_values(by='Value'), "",
-        "Udio (%)", "Zaposleni po industriji", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Zaposleni po industriji",
+        data.employment_vinkovci.set_index('Employment Type').sort_values(by='Value'), "", "Udio (%)", False
     )
 
-    plot_util.plot_simple_bar(
-        data.bdp_index_region.set_index('Region').sort_values(by='Value'), "",
-        "Indeks po glavi stanovnika", "BDP indeks po regiji", False, output_folder, True
+    add_job(
+        plot_util.plot_simple_bar, "BDP indeks po regiji",
+        data.bdp_index_region.set_index('Region').sort_values(by='Value'), "", "Indeks po glavi stanovnika", False,
+        True
     )
 
-    plot_util.plot_stacked_bar(
-        data.agri_education, "", "Udio (%)", "Obrazovanje u poljoprivredi", output_folder, False
+    add_job(
+        plot_util.plot_stacked_bar, "Obrazovanje u poljoprivredi",
+        data.agri_education, "", "Udio (%)", False
     )
     data.turism_seasonality = data.turism_seasonality.rename(columns={
         0: '2019.',
@@ -177,8 +218,9 @@ def main(output_folder):
         id_vars="index", value_vars=data.turism_seasonality.columns
     )
     data.turism_seasonality.columns = ['Mjesec', 'Godina', 'Value']
-    plot_util.plot_scatter(
-        data.turism_seasonality, "", "Broj dolazaka", "Sezonalnost turizma", output_folder
+    add_job(
+        plot_util.plot_scatter, "Sezonalnost turizma",
+        data.turism_seasonality, "", "Broj dolazaka"
     )
 
     data.precipitation = data.precipitation.rename(columns={
@@ -192,43 +234,45 @@ def main(output_folder):
         id_vars="index", value_vars=data.precipitation.columns
     )
     data.precipitation.columns = ['Mjesec', 'Godina', 'Value']
-    plot_util.plot_scatter(
-        data.precipitation, "", "Količina oborina (mm)", "Godišnja količina oborina", output_folder
+    add_job(
+        plot_util.plot_scatter, "Godišnja količina oborina",
+        data.precipitation, "", "Količina oborina (mm)"
     )
 
-    plot_util.plot_stacked_bar(
-        data.arrivals_sleepovers, "", "Broj",
-        "Broj dolazaka i broj noćenja", output_folder, False
+    add_job(
+        plot_util.plot_stacked_bar, "Broj dolazaka i broj noćenja",
+        data.arrivals_sleepovers, "", "Broj", False
     )
 
-    plot_util.plot_simple_bar(
-        data.employment_tourism.set_index('Year'), "", "Indeks udjela zaposlenih u turizmu",
-        "Udio zaposlenih u turizmu", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Udio zaposlenih u turizmu",
+        data.employment_tourism.set_index('Year'), "", "Indeks udjela zaposlenih u turizmu", False
     )
 
-    plot_util.plot_stacked_bar(
-        data.tourists_per_capita, "", "Indeks, broj po glavi stanovnika",
-        "Indeks broja turista i noćenja per capita", output_folder, False
+    add_job(
+        plot_util.plot_stacked_bar, "Indeks broja turista i noćenja per capita",
+        data.tourists_per_capita, "", "Indeks, broj po glavi stanovnika", False
     )
 
-    plot_util.plot_simple_bar(
-        data.water_requirements.set_index('Month').iloc[::-1], "", "Zahvat količine vode (m3)",
-        "Potreba za vodom 2021", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Potreba za vodom 2021",
+        data.water_requirements.set_index('Month').iloc[::-1], "", "Zahvat količine vode (m3)", False
     )
 
-    plot_util.plot_stacked_bar(
-        data.damages_plumbing, "", "Broj kvarova",
-        "Broj kvarova po godinama", output_folder, True
+    add_job(
+        plot_util.plot_stacked_bar, "Broj kvarova po godinama",
+        data.damages_plumbing, "", "Broj kvarova", True
     )
 
-    plot_util.plot_simple_bar(
-        data.water_loss.set_index('Year'), "", "Udio gubitaka u vodoopskrbi (%)",
-        "Gubici vode po godinama", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Gubici vode po godinama",
+        data.water_loss.set_index('Year'), "", "Udio gubitaka u vodoopskrbi (%)", False
     )
 
     data.water_capacity.columns = ["Zahvaćeni kapacitet vode 'Sikirevci'", 'Raspoloživi kapacitet']
-    plot_util.plot_stacked_bar_overlay(
-        data.water_capacity, "", "Kapacitet (l/s)", "Raspoloživi kapacitet vode", output_folder
+    add_job(
+        plot_util.plot_stacked_bar_overlay, "Raspoloživi kapacitet vode",
+        data.water_capacity, "", "Kapacitet (l/s)"
     )
 
     data.water_samples.columns = [
@@ -237,15 +281,18 @@ def main(output_folder):
         'Uzorci mikrobiološki',
         'Nesukladni uzorci mikrobiološki'
     ]
-    plot_util.plot_stacked_bar(
-        data.water_samples, "", "Broj uzoraka", "Analize uzoraka vode", output_folder, False
+    add_job(
+        plot_util.plot_stacked_bar, "Analize uzoraka vode",
+        data.water_samples, "", "Broj uzoraka", False
     )
 
-    plot_util.plot_simple_bar(
-        data.use_of_land.set_index('Namjena površine').sort_values(by='Value'), "",
-        "Udio (%)", "Namjena površine", False, output_folder
+    add_job(
+        plot_util.plot_simple_bar, "Namjena površine",
+        data.use_of_land.set_index('Namjena površine').sort_values(by='Value'), "", "Udio (%)", False
     )
 
+    render_jobs(jobs, n_jobs, force=force)
+
     print('Finished creating supplementary plots')
 
 
@@ -253,5 +300,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate plots for the provided datasets.')
     parser.add_argument('-o', '--output_folder', type=str, required=True,
                         help='Path to the output folder where plots will be saved.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes used to render figures, 0 uses every core.')
+    parser.add_argument('--force', action='store_true',
+                        help='Render every figure even if the figure cache says it is up to date.')
     args = parser.parse_args()
-    main(args.output_folder)
+    main(args.output_folder, args.jobs, args.force)
@@ -0,0 +1,182 @@
+import json
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scenarios import SCENARIOS_2030, ProjectionBaseline, load_scenarios
+
+root_dir = Path(__file__).parents[1]
+
+TRAJECTORIES_2050 = root_dir / 'data' / 'scenarios' / 'trajectory_2050.json'
+
+# drivers of the projection that change from year to year
+DRIVERS = ('ev_share', 'co2_electricity_mwh_ton', 'engine_efficiency', 'measures')
+
+
+@dataclass
+class Ramp:
+    """Value of a driver as a function of year, linear between the anchor years and constant outside them."""
+    anchors: dict
+
+    def __call__(self, years):
+        anchor_years = sorted(self.anchors)
+        return np.interp(years, anchor_years, [self.anchors[year] for year in anchor_years])
+
+
+def scenario_ramps(baseline, scenario, anchors=None):
+    """Ramps of every driver from its base year value to the scenario's target year value.
+
+    At the base year nothing has changed yet, no electric cars, the base year electricity factor and engines and no
+    measures implemented, at the target year the drivers take the values the scenario projection uses. Further
+    anchors, e.g. for 2040 and 2050, are given as {driver: {year: value}}; measures are the implemented fraction of
+    the scenario's measures.
+    """
+    target = {
+        'ev_share': scenario.ev_share,
+        'co2_electricity_mwh_ton': baseline.co2_electricity_mwh_ton if scenario.co2_electricity_mwh_ton is None
+        else scenario.co2_electricity_mwh_ton,
+        'engine_efficiency': baseline.engine_efficiency if scenario.engine_efficiency is None
+        else scenario.engine_efficiency,
+        'measures': 1.0,
+    }
+    base = {'ev_share': 0.0, 'co2_electricity_mwh_ton': baseline.base_electricity_factor, 'engine_efficiency': 1.0,
+            'measures': 0.0}
+
+    ramps = {}
+    for driver in DRIVERS:
+        driver_anchors = {baseline.base_year: base[driver], baseline.target_year: target[driver]}
+        driver_anchors.update({int(year): value for year, value in (anchors or {}).get(driver, {}).items()})
+        ramps[driver] = Ramp(driver_anchors)
+    return ramps
+
+
+@dataclass
+class Trajectory:
+    """Energy (MWh) and CO2 (t) of every year, sector and fuel as (years, sectors, fuels) arrays."""
+    scenario: str
+    years: np.ndarray
+    sectors: list
+    fuels: list
+    energy: np.ndarray
+    co2: np.ndarray
+
+    def totals(self, kind='energy'):
+        """Years x sectors totals."""
+        values = self.energy if kind == 'energy' else self.co2
+        return pd.DataFrame(values.sum(axis=2), index=pd.Index(self.years, name='Godina'), columns=self.sectors)
+
+    def year_frame(self, year, kind='energy'):
+        """Sector totals of a year in the sektor / 0 / Godina format of the projection charts."""
+        values = self.energy if kind == 'energy' else self.co2
+        position = np.flatnonzero(self.years == year)
+        if not len(position):
+            raise KeyError(f'Year {year} is not part of the {self.years[0]}-{self.years[-1]} trajectory')
+        frame = pd.Series(values[position[0]].sum(axis=1), index=pd.Index(self.sectors, name='sektor')).reset_index()
+        frame['Godina'] = year
+        return frame
+
+    def projection_frame(self, year, kind='energy', base_year=None):
+        """Base and given year totals per sector, the input of Inventory.projection_bar."""
+        base_year = self.years[0] if base_year is None else base_year
+        return pd.concat([self.year_frame(base_year, kind), self.year_frame(year, kind)])
+
+    def to_frame(self):
+        """Long table of every year, sector and fuel with energy (MWh) and CO2 (t)."""
+        index = pd.MultiIndex.from_product([self.years, self.sectors, self.fuels],
+                                           names=['Godina', 'sektor', 'energent'])
+        return pd.DataFrame({
+            'potrošnja_energije(MWh)': self.energy.ravel(),
+            'Emisije CO2 (t)': self.co2.ravel(),
+        }, index=index)
+
+
+def build_trajectory(baseline, scenario, years, anchors=None):
+    """Trajectory of a scenario over the given years in one vectorized pass.
+
+    Every year is a row of the baseline projection, with its own target year and the drivers read off their ramps.
+    Sector energy is split into fuels with the base year shares and floored at zero, where the linear trend or the
+    measures would take a sector below it. CO2 per MWh of every fuel follows ProjectionBaseline.target_co2, so the
+    sector totals of the scenario's target year are the ones of evaluate_scenarios.
+    """
+    years = np.asarray(years)
+    drivers = {driver: ramp(years) for driver, ramp in scenario_ramps(baseline, scenario, anchors).items()}
+    shares, mwh = baseline.measure_arrays([scenario])
+    implemented = drivers['measures'][:, None]
+
+    sector_energy, _ = baseline.project(drivers['ev_share'], drivers['co2_electricity_mwh_ton'],
+                                        drivers['engine_efficiency'], shares * implemented, mwh * implemented,
+                                        target_year=years)
+    sector_energy = np.maximum(sector_energy, 0)
+
+    fuel_shares = baseline.base_fuel_energy / baseline.base_energy[:, None]
+    energy = sector_energy[:, :, None] * fuel_shares
+
+    co2_per_mwh = baseline.target_co2(drivers['co2_electricity_mwh_ton'], len(years)) / baseline.base_energy[:, None]
+    co2 = np.zeros_like(energy)
+    co2[:, :, [baseline.energy_fuels.index(fuel) for fuel in baseline.fuels]] = sector_energy[:, :, None] * co2_per_mwh
+    return Trajectory(scenario.name, years, baseline.sectors, baseline.energy_fuels, energy, co2)
+
+
+def load_trajectories(path=TRAJECTORIES_2050):
+    """End year and {scenario name: {driver: {year: value}}} anchors of a JSON definition file."""
+    with open(path) as f:
+        definitions = json.load(f)
+    return definitions['end_year'], definitions.get('trajectories', {})
+
+
+def main(scenario_names, path, end_year, render_years, output_dir, n_jobs):
+    from Constants import Constants
+    from inventory import Inventory, load_inputs, engine_efficiency_fit
+    from rendering import ChartJob, render_jobs
+
+    constants = Constants()
+    inputs = {year: load_inputs(constants, year) for year in (2011, 2019)}
+    inventories = {year: Inventory(constants, year).compute_inventory(*inputs[year]) for year in inputs}
+    baseline = ProjectionBaseline.from_inventories(inventories[2011], inventories[2019], inputs[2019][2], constants,
+                                                   engine_efficiency_fit()[2](2030))
+
+    default_end_year, anchors = load_trajectories(path)
+    years = np.arange(baseline.base_year, (end_year or default_end_year) + 1)
+    scenarios = {scenario.name: scenario for scenario in load_scenarios(SCENARIOS_2030)}
+    output_dir.mkdir(exist_ok=True, parents=True)
+
+    base_inventory = Inventory(constants, baseline.base_year)
+    chart_jobs = []
+    for name in scenario_names:
+        trajectory = build_trajectory(baseline, scenarios[name], years, anchors.get(name))
+        trajectory.to_frame().to_csv(output_dir / f'trajectory_{name}.csv')
+        print(f'{name}, energy (MWh)')
+        print(trajectory.totals('energy').iloc[::5].to_string(float_format='{:.1f}'.format))
+
+        for year in render_years:
+            chart_jobs.append(ChartJob(
+                base_inventory.projection_bar,
+                (trajectory.projection_frame(year, 'energy'), 'Potrošnja energije (MWh)'),
+                output_dir / f'energy_{year}_projection_{name}.png',
+            ))
+            chart_jobs.append(ChartJob(
+                base_inventory.projection_bar,
+                (trajectory.projection_frame(year, 'co2'), 'Emisije CO2 (t)'),
+                output_dir / f'co2_{year}_projection_{name}.png',
+            ))
+    render_jobs(chart_jobs, n_jobs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Year by year projection of the 2019 inventory per sector and fuel.')
+    parser.add_argument('--scenarios', nargs='+', default=['as_usual', 'COM_expedited'],
+                        help='Scenarios of data/scenarios/2030.json.')
+    parser.add_argument('-t', '--trajectories', type=Path, default=TRAJECTORIES_2050,
+                        help='JSON file with the end year and the driver anchors after the 2030 target year.')
+    parser.add_argument('--end-year', type=int, default=None, help='Last year, from the trajectory file by default.')
+    parser.add_argument('--render', nargs='*', type=int, default=[],
+                        help='Years to render a projection chart against the base year for.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Processes rendering the charts, 0 uses every core.')
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='Directory for the CSVs and charts, output/trajectory/ by default.')
+    args = parser.parse_args()
+    main(args.scenarios, args.trajectories, args.end_year, args.render,
+         args.output or root_dir / 'output' / 'trajectory', args.jobs)
@@ -0,0 +1,96 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = Path(__file__).parents[1]
+
+# Eurostat heating degree days, 18 °C minus the daily mean temperature on days with a mean of at most 15 °C
+HDD_BASE = 18.0
+HDD_THRESHOLD = 15.0
+
+# columns of the heat tables that scale with the heating demand
+HEAT_COLUMNS = ['potrošnja_plina_m3/lož_ulja_l', 'potrošnja_energije(kWh)']
+
+
+def load_temperatures(path):
+    """Daily mean temperatures, one row per station (postaja), day (datum) and temperature (temperatura) in °C."""
+    temperatures = pd.read_csv(path, parse_dates=['datum'], dtype={'postaja': str})
+    missing = {'datum', 'postaja', 'temperatura'} - set(temperatures.columns)
+    if missing:
+        raise ValueError(f'Temperature file {path} has no {", ".join(sorted(missing))} column')
+    return temperatures
+
+
+def degree_days(temperatures, base=HDD_BASE, threshold=HDD_THRESHOLD, min_coverage=0.9):
+    """Heating degree days of every station and year, stations x years, computed for all of them in one pass.
+
+    Years with missing days are scaled up to the whole year, years with less than min_coverage of their days are NaN.
+    """
+    # hash based codes, sorting millions of station names would dominate
+    station_codes, stations = pd.factorize(temperatures['postaja'], sort=True)
+    year_codes, years = pd.factorize(pd.DatetimeIndex(temperatures['datum']).year, sort=True)
+    years = np.asarray(years)
+    values = temperatures['temperatura'].to_numpy(dtype=float)
+
+    valid = ~np.isnan(values)
+    cells = (station_codes * len(years) + year_codes)[valid]
+    daily = np.where(values[valid] <= threshold, base - values[valid], 0.0)
+    shape = (len(stations), len(years))
+    total = np.bincount(cells, weights=daily, minlength=shape[0] * shape[1]).reshape(shape)
+    days = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    days_in_year = np.where(leap, 366, 365)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hdd = np.where(days >= min_coverage * days_in_year, total / days * days_in_year, np.nan)
+    return pd.DataFrame(hdd, index=pd.Index(stations, name='postaja'), columns=pd.Index(years, name='Godina'))
+
+
+def normalization_factors(hdd, years, reference_years=(1991, 2020), stations=None):
+    """Heat scaling of every year to the mean climate of the reference years, reference HDD / year HDD.
+
+    The degree days of the given stations, all by default, are averaged per year first.
+    """
+    if stations is not None:
+        hdd = hdd.loc[list(stations)]
+    climate = hdd.mean(axis=0)
+    start, end = reference_years
+    reference = climate.loc[(climate.index >= start) & (climate.index <= end)].mean()
+    if np.isnan(reference):
+        raise ValueError(f'No degree days for the reference years {start}-{end}')
+
+    factors = {}
+    for year in years:
+        if year not in climate.index or np.isnan(climate[year]):
+            raise ValueError(f'No degree days for {year}')
+        factors[year] = reference / climate[year]
+    return factors
+
+
+def normalize_heat(heat, factor):
+    """Heat table with the consumption columns scaled to the reference climate."""
+    heat = heat.copy()
+    for column in HEAT_COLUMNS:
+        if column in heat:
+            heat[column] = heat[column] * factor
+    return heat
+
+
+def main(path, years, reference_years, stations):
+    hdd = degree_days(load_temperatures(path))
+    selected = hdd if stations is None else hdd.loc[list(stations)]
+    print(selected.mean(axis=0).round(0).to_string())
+    for year, factor in normalization_factors(hdd, years, reference_years, stations).items():
+        print(f'{year}: heat x {factor:.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Heating degree days and heat normalization factors.')
+    parser.add_argument('temperatures', type=Path, help='CSV with datum, postaja and temperatura columns.')
+    parser.add_argument('--years', type=int, nargs='+', default=[2011, 2019])
+    parser.add_argument('--reference-years', type=int, nargs=2, default=[1991, 2020])
+    parser.add_argument('--stations', nargs='+', default=None, help='Stations to average, all by default.')
+    args = parser.parse_args()
+    main(args.temperatures, args.years, args.reference_years, args.stations)
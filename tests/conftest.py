@@ -0,0 +1,25 @@
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'src'))
+
+
+@pytest.fixture
+def write_module(tmp_path, monkeypatch):
+    """Writes a module that can be edited and imported again, returns the function writing and importing it."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = set()
+
+    def write(name, source):
+        (tmp_path / f'{name}.py').write_text(source)
+        names.add(name)
+        sys.modules.pop(name, None)
+        importlib.invalidate_caches()
+        return importlib.import_module(name)
+
+    yield write
+    for name in names:
+        sys.modules.pop(name, None)
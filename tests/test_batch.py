@@ -0,0 +1,40 @@
+import os
+import time
+
+import batch
+
+
+def _run_or_die(job):
+    if job == 'dies':
+        time.sleep(0.2)
+        os._exit(1)
+    if job == 'slow':
+        time.sleep(1)
+    return {'job': job, 'results': job, 'error': None, 'seconds': 0.0}
+
+
+def test_worker_that_dies_only_fails_its_own_job(monkeypatch):
+    monkeypatch.setattr(batch, 'run_job', _run_or_die)
+    jobs = ['a', 'b', 'dies', 'c', 'd', 'e']
+    outcomes = batch.run_batch(jobs, n_jobs=2)
+
+    assert [outcome['job'] for outcome in outcomes] == jobs
+    assert [outcome['error'] is None for outcome in outcomes] == [True, True, False, True, True, True]
+    assert 'BrokenProcessPool' in outcomes[2]['error']
+
+
+def test_jobs_lost_to_a_dead_worker_are_resubmitted_to_a_full_pool(monkeypatch):
+    monkeypatch.setattr(batch, 'run_job', _run_or_die)
+    pools = []
+    run_pool = batch._run_pool
+
+    def recorded(jobs, n_jobs):
+        pools.append((list(jobs), n_jobs))
+        return run_pool(jobs, n_jobs)
+
+    monkeypatch.setattr(batch, '_run_pool', recorded)
+    jobs = ['dies', 'a', 'slow', 'b', 'c', 'd']
+    outcomes = batch.run_batch(jobs, n_jobs=2)
+
+    assert [outcome['error'] is None for outcome in outcomes] == [False, True, True, True, True, True]
+    assert 'a' not in pools[1][0] and len(pools[1][0]) > 1 and pools[1][1] == 2
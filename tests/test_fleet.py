@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Constants import Constants
+from fleet import aggregate_masses, counts_to_cohorts, fleet_energy
+from inventory import root_dir, correct_transport_2011
+
+# fuel masses (t) of the 2011 table as recalculated before the fleet model
+BASELINE_2011 = {
+    'autobusni': (np.nan, 13.9, np.nan),
+    'taxi': (np.nan, 1.6, np.nan),
+    'osobna vozila': (3486.8559081973126, 3365.157416858321, 105.43912830294654),
+    'teretna i radna vozila': (217.55898227283996, 3762.8397223530205, np.nan),
+    'mopedi i motocikli': (163.576413, np.nan, np.nan),
+}
+COLUMNS = ['procijenjena_potrošena_masa_benzina(t)', 'procijenjena_potrošena_masa_dizela(t)',
+           'procijenjena_potrošena_masa_unp(t)']
+
+
+def test_correct_transport_2011_matches_the_baseline_masses():
+    trans = pd.read_csv(root_dir / 'data' / '2011' / 'privatna_vozila_2011.csv')
+    corrected = correct_transport_2011(trans, Constants()).set_index('vrsta_prijevoza')
+
+    assert list(corrected.index) == list(BASELINE_2011)
+    expected = pd.DataFrame.from_dict(BASELINE_2011, orient='index', columns=COLUMNS)
+    pd.testing.assert_frame_equal(corrected[COLUMNS], expected, check_names=False, rtol=0, atol=0)
+    assert list(corrected['broj']) == list(trans['broj'])
+
+
+def test_own_parameter_columns_override_the_fleet():
+    constants = Constants()
+    cohorts = pd.DataFrame({'vrsta_prijevoza': ['osobna vozila'] * 2, 'gorivo': ['Dizel'] * 2, 'broj': [10, 10],
+                            'km_per_year': [1000.0, 2000.0]})
+    result = fleet_energy(cohorts, constants)
+
+    per_km = constants.specific_consumption_diesel_2000 * constants.diesel_litre_to_ton
+    assert result['masa(t)'].tolist() == pytest.approx([10 * 1000 * per_km, 10 * 2000 * per_km])
+    assert result['MWh'].tolist() == pytest.approx((result['masa(t)'] * constants.diesel_ton_mwh).tolist())
+
+
+def test_cohorts_without_a_fleet_entry_get_nan():
+    cohorts = pd.DataFrame({'vrsta_prijevoza': ['autobusni', 'mopedi i motocikli'], 'gorivo': ['Dizel', 'Dizel'],
+                            'broj': [5, 5]})
+    assert fleet_energy(cohorts, Constants())['masa(t)'].isna().all()
+
+
+def test_counts_to_cohorts_skips_empty_and_fuelless_columns():
+    table = pd.DataFrame({'vrsta_prijevoza': ['osobna vozila', 'mopedi i motocikli'], 'benzin': [3, np.nan],
+                          'dizel': [0, 2], 'električni': [7, 1]})
+    cohorts = counts_to_cohorts(table)
+    assert list(map(tuple, cohorts.to_numpy())) == [('osobna vozila', 'Benzin', 3.0),
+                                                    ('mopedi i motocikli', 'Dizel', 2.0)]
+    masses = aggregate_masses(fleet_energy(cohorts, Constants()))
+    assert set(masses.columns) == {'procijenjena_potrošena_masa_benzina(t)', 'procijenjena_potrošena_masa_dizela(t)'}
@@ -0,0 +1,38 @@
+import numpy as np
+
+from forecast import select_models
+from jrc_data import load_emission_factors
+
+
+def test_croatian_electricity_factor_is_not_predicted_below_zero():
+    table = load_emission_factors()
+    trend = select_models(table.years, table.series('Croatia'), ['Croatia'], until=2030).trend('Croatia')
+    assert trend.name != 'piecewise linear'
+    assert np.all(trend(np.arange(table.years.min(), 2031)) >= 0)
+
+
+def test_families_going_below_zero_are_left_out_of_nonnegative_series():
+    years = np.arange(2000, 2021)
+    values = np.r_[np.full(10, 1.0), np.linspace(1.0, 0.2, 11)]
+    selection = select_models(years, values, until=2030)
+    families = [family for family in selection.families
+                if selection.predict(np.arange(2000, 2031), family, clip=False).min() < 0]
+
+    assert families and all(np.isnan(selection.scores[0, selection.families.index(f)]) for f in families)
+    assert selection.families[selection.best[0]] not in families
+    assert not selection.to_frame([2030])['clipped'].iloc[0]
+
+
+def test_series_with_negative_values_are_not_constrained():
+    years = np.arange(2000, 2021)
+    values = np.linspace(1.0, -0.5, len(years))
+    selection = select_models(years, values, until=2030)
+    assert not np.isnan(selection.scores).any()
+    assert selection.predict([2030])[0, 0] < 0
+
+
+def test_prediction_is_floored_when_every_family_goes_below_zero():
+    years = np.arange(2000, 2021)
+    values = np.linspace(1.0, 0.05, len(years))
+    frame = select_models(years, values, until=2030).to_frame([2030])
+    assert frame[2030].iloc[0] == 0 and frame['clipped'].iloc[0]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meters import MeterSchema, MeterTotals, aggregate_meters, load_lookup
+
+LOOKUP = pd.DataFrame({
+    'mjerno_mjesto': ['p1', 'p2', 'p3'],
+    'nadkategorija': ['Zgradarstvo', 'Zgradarstvo', 'Zgradarstvo'],
+    'kategorija': ['kućanstva', 'kućanstva', 'usluge'],
+})
+
+
+def readings(rows):
+    return pd.DataFrame(rows, columns=['mjerno_mjesto', 'vrijeme', 'kwh'])
+
+
+def totals(rows, year=None, profile=False):
+    schema = MeterSchema()
+    result = MeterTotals.from_lookup(LOOKUP, schema, year, profile)
+    result.add(readings(rows), pd.Index(LOOKUP['mjerno_mjesto']), schema)
+    return result
+
+
+def test_energy_is_summed_per_category_of_the_lookup():
+    result = totals([('p1', '2019-01-01 00:00', 1.0), ('p2', '2019-01-01 00:00', 2.0), ('p3', '2019-06-01 12:00', 4.0),
+                     ('p1', '2019-01-01 01:00', 0.5)])
+    frame = result.to_frame()
+    assert frame['potrošnja_energije(kWh)'].tolist() == [3.5, 4.0]
+    assert frame['broj zgrada'].tolist() == [2, 1]
+
+
+def test_unknown_metering_points_are_counted_apart():
+    result = totals([('p1', '2019-01-01 00:00', 1.0), ('x9', '2019-01-01 00:00', 7.0)])
+    assert (result.rows_unmapped, result.energy_unmapped) == (1, 7.0)
+    assert result.energy.tolist() == [1.0, 0.0]
+    assert result.to_frame()['broj zgrada'].tolist() == [1, 0]
+
+
+def test_readings_outside_the_year_are_skipped():
+    result = totals([('p1', '2018-12-31 23:00', 5.0), ('p1', '2019-01-01 00:00', 1.0), ('p3', '2020-01-01 00:00', 3.0),
+                     ('x9', '2020-01-01 00:00', 2.0)], year=2019)
+    assert result.rows_outside_year == 3
+    assert result.rows_unmapped == 0
+    assert result.energy.tolist() == [1.0, 0.0]
+
+
+def test_hourly_profile():
+    result = totals([('p1', '2019-01-01 00:15', 1.0), ('p2', '2019-01-01 00:45', 2.0), ('p3', '2019-12-31 23:00', 4.0)],
+                    profile=True)
+    profile = result.profile_frame()
+    assert len(profile) == 365 * 24
+    assert profile.iloc[0].tolist() == [3.0, 0.0]
+    assert profile.iloc[-1].tolist() == [0.0, 4.0]
+    assert profile.to_numpy().sum() == result.energy.sum()
+
+
+def test_chunks_add_up_to_the_whole_file(tmp_path):
+    rows = [('p1', f'2019-03-0{day} 10:00', float(day)) for day in range(1, 8)] + [('p3', '2019-05-01 00:00', 9.0)]
+    path = tmp_path / 'readings.csv'
+    readings(rows).to_csv(path, index=False)
+
+    whole = aggregate_meters(path, LOOKUP, year=2019)
+    chunked = aggregate_meters(path, LOOKUP, year=2019, chunksize=3)
+    np.testing.assert_array_equal(chunked.energy, whole.energy)
+    assert chunked.energy.tolist() == [28.0, 9.0]
+
+
+def test_duplicated_metering_points_are_rejected(tmp_path):
+    path = tmp_path / 'lookup.csv'
+    pd.concat([LOOKUP, LOOKUP.iloc[[0]]]).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='p1'):
+        load_lookup(path)
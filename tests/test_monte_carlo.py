@@ -0,0 +1,23 @@
+import numpy as np
+
+from monte_carlo import Distribution
+
+
+def test_relative_lognormal_is_scaled_after_sampling():
+    rng = np.random.default_rng(0)
+    draws = Distribution('lognormal', {'mean': 0.0, 'sigma': 0.1}, relative=True).sample(rng, 100_000, 50.0)
+    assert abs(np.median(draws) / 50.0 - 1) < 0.01
+    assert abs(np.std(np.log(draws)) - 0.1) < 0.005
+
+
+def test_relative_normal_scales_location_and_spread():
+    rng = np.random.default_rng(0)
+    draws = Distribution('normal', {'loc': 1.0, 'scale': 0.1}, relative=True).sample(rng, 100_000, 200.0)
+    assert abs(draws.mean() / 200.0 - 1) < 0.01
+    assert abs(draws.std() / 20.0 - 1) < 0.02
+
+
+def test_absolute_parameters_are_used_as_given():
+    rng = np.random.default_rng(0)
+    draws = Distribution('uniform', {'low': 2.0, 'high': 3.0}).sample(rng, 1_000, 100.0)
+    assert draws.min() >= 2.0 and draws.max() < 3.0
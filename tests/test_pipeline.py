@@ -0,0 +1,66 @@
+import pytest
+
+from pipeline import Pipeline, Stage
+
+MODULE = '''
+LIGHTING_MWH = {lighting}
+
+
+def _scale(value):
+    return value * {scale}
+
+
+def load(year):
+    return LIGHTING_MWH * year
+
+
+def total(lighting):
+    return _scale(lighting)
+'''
+
+
+@pytest.fixture
+def stage_module(write_module):
+    """Writes a stage module whose constant and helper can be edited, returns the function rewriting it."""
+    def write(lighting=2008.656, scale=1):
+        return write_module('stage_module', MODULE.format(lighting=lighting, scale=scale))
+
+    return write
+
+
+def pipeline(module, cache_dir):
+    return Pipeline([
+        Stage('lighting', module.load, params={'year': 1}),
+        Stage('total', module.total, {'lighting': 'lighting'}),
+    ], cache_dir)
+
+
+def test_unchanged_stages_are_loaded(stage_module, tmp_path):
+    module = stage_module()
+    assert pipeline(module, tmp_path / 'cache').run()['total'] == 2008.656
+    assert pipeline(module, tmp_path / 'cache').plan() == [('lighting', None), ('total', None)]
+
+
+def test_changed_constant_reruns_downstream_stages(stage_module, tmp_path):
+    pipeline(stage_module(), tmp_path / 'cache').run()
+
+    changed = pipeline(stage_module(lighting=9999.0), tmp_path / 'cache')
+    assert [reason for _, reason in changed.plan()] == ['code changed', 'code changed']
+    assert changed.run()['total'] == 9999.0
+
+
+def test_changed_helper_outside_code_list_reruns_stage(stage_module, tmp_path):
+    pipeline(stage_module(), tmp_path / 'cache').run()
+
+    changed = pipeline(stage_module(scale=2), tmp_path / 'cache')
+    assert all(reason is not None for _, reason in changed.plan())
+    assert changed.run()['total'] == 2 * 2008.656
+
+
+def test_changed_upstream_param_reruns_downstream(stage_module, tmp_path):
+    module = stage_module()
+    pipeline(module, tmp_path / 'cache').run()
+
+    stages = [Stage('lighting', module.load, params={'year': 2}), Stage('total', module.total, {'lighting': 'lighting'})]
+    plan = dict(Pipeline(stages, tmp_path / 'cache').plan())
+    assert plan == {'lighting': 'params changed', 'total': 'input changed: lighting'}
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from registry import FUEL_COLUMNS, TYPE_COLUMNS, RegistryCounts, RegistrySchema, ingest_registry
+
+
+def chunk(rows, km=None):
+    frame = pd.DataFrame(rows, columns=['opcina', 'kategorija', 'gorivo']).astype('category')
+    if km is not None:
+        frame['km'] = km
+    return frame
+
+
+def count(counts, vehicle, fuel):
+    return counts.counts[TYPE_COLUMNS.index(vehicle), FUEL_COLUMNS.index(fuel)]
+
+
+def test_only_the_municipality_is_counted():
+    counts = RegistryCounts.empty()
+    counts.add(chunk([('VINKOVCI', 'M1', 'Dizel'), (' vinkovci ', 'M1', 'dizel'), ('OSIJEK', 'M1', 'Dizel')]),
+               'Vinkovci', RegistrySchema())
+
+    assert (counts.rows_read, counts.rows_kept) == (3, 2)
+    assert count(counts, 'osobna vozila', 'dizel') == 2
+    assert counts.counts.sum() == 2
+
+
+def test_unknown_types_and_fuels():
+    counts = RegistryCounts.empty()
+    counts.add(chunk([('A', 'M1', 'Benzin'), ('A', 'T1', 'Benzin'), ('A', None, 'Dizel'), ('A', 'N1', 'vodik'),
+                      ('A', 'L3', None), ('A', 'M1', 'Benzin-plin')]), None, RegistrySchema())
+
+    assert counts.unknown_type == 2
+    assert counts.other_fuel.tolist() == [1, 0, 1, 0]
+    assert count(counts, 'osobna vozila', 'benzin') == 1 and count(counts, 'osobna vozila', 'benzin-lpg') == 1
+    frame = counts.to_frame().set_index('vrsta_prijevoza')
+    assert frame['broj'].to_dict() == {'mopedi i motocikli': 1, 'osobna vozila': 2, 'teretna i radna vozila': 1}
+    assert np.isnan(frame.loc['teretna i radna vozila', 'dizel'])
+
+
+def test_km_average_skips_missing_readings():
+    counts = RegistryCounts.empty()
+    counts.add(chunk([('A', 'M1', 'Dizel'), ('A', 'M1', 'Dizel'), ('A', 'M1', 'Dizel')], km=['10000', 'x', 20000]),
+               None, RegistrySchema(km_column='km'))
+    assert counts.to_frame()['prosjek_km_po_vozilu'].tolist() == [15000.0]
+
+
+def test_chunks_add_up_to_the_whole_file(tmp_path):
+    rows = [('VINKOVCI', 'M1', 'Dizel'), ('VINKOVCI', 'N2', 'Dizel'), ('OSIJEK', 'M1', 'Benzin'),
+            ('VINKOVCI', 'L1', 'Benzin'), ('VINKOVCI', 'M1', 'Električni')] * 3
+    path = tmp_path / 'registry.csv'
+    pd.DataFrame(rows, columns=['opcina', 'kategorija', 'gorivo']).to_csv(path, index=False)
+
+    whole = ingest_registry(path, 'VINKOVCI', chunksize=len(rows))
+    chunked = ingest_registry(path, 'VINKOVCI', chunksize=2)
+    assert chunked.rows_read == 15 and chunked.rows_kept == 12
+    np.testing.assert_array_equal(chunked.counts, whole.counts)
+    pd.testing.assert_frame_equal(chunked.to_frame(), whole.to_frame())
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from Constants import Constants
+from inventory import Inventory
+from rendering import ChartJob, chart_key
+
+MODULE = '''
+def formatter(x, pos):
+    return '{format}'.format(x)
+
+
+class Plots:
+    def __init__(self, palette):
+        self.palette = palette
+
+    def chart_state(self):
+        return {{'palette': self.palette}}
+
+    def bar(self, data):
+        self.colors = dict(zip(self.palette, range(len(self.palette))))
+        return formatter(data, 0)
+'''
+
+
+@pytest.fixture
+def plot_module(write_module):
+    return lambda format='{:.0f}': write_module('plot_module', MODULE.format(format=format))
+
+
+def key(module, palette=('blue',), data=1.0, **kwargs):
+    return chart_key(ChartJob(module.Plots(list(palette)).bar, (data,), 'chart.png', **kwargs))
+
+
+def test_key_is_stable(plot_module):
+    module = plot_module()
+    assert key(module) == key(module)
+
+
+def test_changed_helper_next_to_the_plot_changes_key(plot_module):
+    assert key(plot_module()) != key(plot_module(format='{:.2f}'))
+
+
+def test_changed_chart_state_changes_key(plot_module):
+    module = plot_module()
+    assert key(module) != key(module, palette=('red',))
+
+
+def test_state_set_while_plotting_keeps_key(plot_module):
+    plots = plot_module().Plots(['blue'])
+    job = ChartJob(plots.bar, (1.0,), 'chart.png')
+    before = chart_key(job)
+    plots.bar(1.0)
+    assert chart_key(job) == before
+
+
+def test_changed_data_and_dpi_change_key(plot_module):
+    module = plot_module()
+    assert key(module) != key(module, data=2.0)
+    assert key(module) != key(module, dpi=100)
+
+
+def test_resolving_another_year_keeps_inventory_chart_key():
+    constants = Constants()
+    inventory = Inventory(constants, 2019)
+    data = pd.DataFrame({'prirodni plin': [1.0, 2.0]}, index=['Kućanstva', 'Usluge'])
+    job = ChartJob(inventory.stacked_bar, (data, 'Potrošnja energije (MWh)'), 'chart.png')
+    before = chart_key(job)
+
+    constants.co2_electricity_mwh_ton_2011
+    inventory.colors = {'prirodni plin': 'red'}
+    assert chart_key(job) == before
+    assert chart_key(ChartJob(Inventory(Constants(), 2019).stacked_bar, job.args, 'chart.png')) == before
+
+
+def test_changed_constants_change_inventory_chart_key():
+    data = pd.DataFrame({'prirodni plin': [1.0]}, index=['Kućanstva'])
+    croatia = Inventory(Constants(), 2019)
+    slovenia = Inventory(Constants(country='Slovenia'), 2019)
+    assert chart_key(ChartJob(croatia.stacked_bar, (data, 't'), 'chart.png')) != \
+        chart_key(ChartJob(slovenia.stacked_bar, (data, 't'), 'chart.png'))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from weather import degree_days, normalization_factors, normalize_heat
+
+
+def temperatures(station, year, values):
+    days = pd.date_range(f'{year}-01-01', periods=len(values), freq='D')
+    return pd.DataFrame({'postaja': station, 'datum': days, 'temperatura': values})
+
+
+def test_degree_days_per_station_and_year():
+    frame = pd.concat([
+        temperatures('Osijek', 2019, np.r_[np.full(100, 5.0), np.full(265, 20.0)]),
+        temperatures('Osijek', 2020, np.full(366, 16.0)),
+        temperatures('Gradište', 2019, np.r_[np.full(364, 15.0), np.nan]),
+    ])
+    hdd = degree_days(frame)
+
+    assert hdd.loc['Osijek', 2019] == 100 * 13.0
+    # above the threshold no degree days are counted
+    assert hdd.loc['Osijek', 2020] == 0.0
+    # missing days are scaled up to the whole year
+    assert hdd.loc['Gradište', 2019] == pytest.approx(3.0 * 365)
+    assert np.isnan(hdd.loc['Gradište', 2020])
+
+
+def test_years_with_too_few_days_are_nan():
+    hdd = degree_days(temperatures('Osijek', 2019, np.full(300, 5.0)))
+    assert np.isnan(hdd.loc['Osijek', 2019])
+    assert degree_days(temperatures('Osijek', 2019, np.full(300, 5.0)), min_coverage=0.8).loc['Osijek', 2019] == \
+        pytest.approx(13.0 * 365)
+
+
+def test_normalization_factors_and_heat():
+    hdd = pd.DataFrame([[2000.0, 2500.0, 3000.0], [np.nan, 3500.0, 3000.0]], index=['a', 'b'],
+                       columns=[2010, 2011, 2019])
+    factors = normalization_factors(hdd, [2011, 2019], reference_years=(2010, 2019))
+    reference = np.mean([2000.0, 3000.0, 3000.0])
+    assert factors == pytest.approx({2011: reference / 3000.0, 2019: reference / 3000.0})
+    assert normalization_factors(hdd, [2011], (2010, 2019), stations=['a'])[2011] == pytest.approx(2500.0 / 2500.0)
+
+    with pytest.raises(ValueError, match='2030'):
+        normalization_factors(hdd, [2030], (2010, 2019))
+
+    heat = pd.DataFrame({'energent': ['plin'], 'potrošnja_energije(kWh)': [100.0]})
+    assert normalize_heat(heat, 1.1)['potrošnja_energije(kWh)'].tolist() == pytest.approx([110.0])